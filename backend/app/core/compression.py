@@ -0,0 +1,112 @@
+"""Response compression negotiated from Accept-Encoding (brotli or gzip).
+
+Starlette ships a gzip-only middleware; this one also offers brotli, which
+compresses our JSON payloads noticeably better. Responses are buffered
+whole, so anything streamed (more than one body chunk) is passed through
+untouched.
+"""
+
+import gzip
+from typing import Optional, Tuple
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Preference order when the client weights encodings equally.
+_SUPPORTED = ("br", "gzip")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported content-coding for an Accept-Encoding header, or None."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in _SUPPORTED:
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=6)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        streaming = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, streaming
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or streaming:
+                await send(message)
+                return
+            if message.get("more_body", False):
+                # Streaming response: send it as-is rather than buffering it all.
+                streaming = True
+                await send(start_message)
+                await send(message)
+                return
+            start, body = self._encode(start_message, message.get("body", b""), encoding)
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _encode(self, start: Message, body: bytes, encoding: str) -> Tuple[Message, bytes]:
+        headers = MutableHeaders(raw=list(start["headers"]))
+        headers.add_vary_header("Accept-Encoding")
+        if start["status"] == 304:
+            # Revalidation must echo the validator the compressed 200 carried.
+            _weaken_etag(headers)
+        if (
+            len(body) < self.minimum_size
+            or "content-encoding" in headers
+            or start["status"] in (204, 304)
+        ):
+            return {**start, "headers": headers.raw}, body
+        compressed = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(len(compressed))
+        _weaken_etag(headers)
+        return {**start, "headers": headers.raw}, compressed
+
+
+def _weaken_etag(headers: MutableHeaders) -> None:
+    """Mark a strong ETag weak: the encoded bytes differ from the identity ones.
+
+    Weak comparison (which If-None-Match uses) still matches the original tag.
+    """
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
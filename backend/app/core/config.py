@@ -1,6 +1,7 @@
 """Application configuration via pydantic-settings."""
 
 import os
+import tempfile
 from typing import List
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -25,9 +26,97 @@ class Settings(BaseSettings):
 
     rate_limit: str = "10/minute"
 
+    # LLM accounting. Prices are USD per million tokens (Groq's list price
+    # for llama-3.3-70b-versatile); set them to match GROQ_MODEL.
+    llm_prompt_cost_per_million: float = 0.59
+    llm_completion_cost_per_million: float = 0.79
+    # Per-worker ceiling on Groq tokens per rolling minute. Once reached,
+    # requests are served from the result store or the fallback list. 0 = off.
+    llm_tokens_per_minute: int = 0
+    # Return an X-LLM-Usage debug header (tokens, latency, cost) on /recommend.
+    llm_usage_header: bool = False
+    # Replace Groq with a deterministic local stub (for replay and load tests).
+    llm_stub: bool = False
+    llm_stub_latency_ms: float = 800
+    llm_stub_jitter_ms: float = 200
+
+    # Sampled capture of anonymized /recommend traffic (JSON lines) for
+    # replay.py. Disabled while the path is empty.
+    capture_path: str = ""
+    capture_sample_rate: float = 0.01
+
+    # Responses at least this large are brotli/gzip-compressed when the
+    # client accepts it.
+    compression_min_size: int = 1024
+    # Cache-Control max-age for the (per-model-load static) /segments API.
+    segments_max_age: int = 3600
+
+    # Persistent LLM result store (SQLite, shared by all workers on a host).
+    # Disabled while the path is empty.
+    result_store_path: str = ""
+    result_store_ttl_seconds: float = 86_400
+    result_store_max_entries: int = 100_000
+    result_store_memory_entries: int = 2048
+    # How many of the most-used keys each worker preloads on startup.
+    result_store_warm_keys: int = 512
+
+    # Per-worker thread topology. native_threads caps each BLAS/OpenMP pool
+    # (our predictions are single-row, so extra native threads only compete
+    # with the other workers); threadpool_tokens sizes the threadpool behind
+    # run_in_threadpool (anyio's default is 40). 0 leaves either unchanged.
+    native_threads: int = 1
+    threadpool_tokens: int = 0
+
+    # Ingress load shedding: /recommend and friends get 503 + Retry-After
+    # while any threshold is exceeded. 0 disables a threshold.
+    shed_max_in_flight: int = 0
+    shed_max_loop_lag_ms: float = 0
+    shed_max_threadpool_queue: int = 0
+    shed_retry_after_seconds: int = 5
+    # How often the event-loop lag probe wakes up.
+    loop_lag_interval_ms: float = 100
+
+    # Heavy-hitter sketch snapshots. Each worker writes its sketch here every
+    # heavy_hitters_flush_seconds so /admin/heavy-hitters can merge them all;
+    # while empty, the endpoint reports only the worker that answers.
+    heavy_hitters_dir: str = ""
+    heavy_hitters_flush_seconds: float = 30
+
+    # Speculative LLM calls from POST /recommend/prefetch: how long an
+    # unclaimed result is kept, how many each client may have in flight (the
+    # oldest is cancelled beyond that) and the endpoint's rate limit.
+    # prefetch_ttl_seconds = 0 disables the endpoint.
+    prefetch_ttl_seconds: float = 30
+    prefetch_max_per_client: int = 2
+    prefetch_rate_limit: str = "60/minute"
+
+    # Asynchronous /recommend/jobs: worker pool size (0 disables the
+    # endpoints), queue bound, how long finished jobs are kept, the long-poll
+    # cap, and the comma-separated hosts callback URLs may point at.
+    job_workers: int = 4
+    job_queue_depth: int = 100
+    job_retention_seconds: float = 600
+    job_max_wait_seconds: float = 30
+    job_callback_hosts: str = ""
+
+    # /ws/session connections with no message for this long are closed.
+    session_idle_timeout_seconds: float = 300
+
+    # Shared secret for the /admin endpoints (sent as X-Admin-Token). The
+    # admin surface is disabled entirely while this is empty.
+    admin_token: str = ""
+    # Where on-demand sampling profiles are written.
+    profile_dir: str = os.path.join(tempfile.gettempdir(), "podcast-profiles")
+    # A {"requests": N} capture ends after this long even if fewer arrive.
+    profile_max_seconds: float = 600
+
     @property
     def allowed_origins_list(self) -> List[str]:
         return [o.strip() for o in self.allowed_origins.split(",") if o.strip()]
 
+    @property
+    def job_callback_hosts_list(self) -> List[str]:
+        return [h.strip() for h in self.job_callback_hosts.split(",") if h.strip()]
+
 
 settings = Settings()
@@ -0,0 +1,30 @@
+"""Helpers for ETag-based conditional GETs."""
+
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 If-None-Match check (weak comparison, ``*`` matches anything)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.removeprefix("W/") == bare for tag in candidates)
+
+
+def conditional_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    cache_control: str,
+    media_type: str = "application/json",
+) -> Response:
+    """Return ``body`` with validators, or an empty 304 if the client's copy is current."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -0,0 +1,146 @@
+"""Ingress load shedding driven by event-loop lag, in-flight requests and
+threadpool queue depth.
+
+When a worker is saturated, accepting more work only makes every request
+slower until they all time out inside the Groq call. Instead we reject new
+work at the door with ``503`` + ``Retry-After`` while any configured
+threshold is exceeded, and report the same signals on ``/health`` so the
+load balancer can route around the hot instance. Cheap operational
+endpoints are never shed.
+
+Every threshold defaults to 0 (disabled).
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Optional
+
+from anyio.to_thread import current_default_thread_limiter
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.metrics import metrics
+
+# Always admitted: they're cheap, and operators need them most under load.
+PRIORITY_PATHS = frozenset({"/", "/health", "/metrics"})
+PRIORITY_PREFIXES = ("/admin/", "/metrics/")
+
+
+class SaturationMonitor:
+    def __init__(
+        self,
+        max_in_flight: int = 0,
+        max_loop_lag_ms: float = 0,
+        max_threadpool_queue: int = 0,
+        retry_after_seconds: int = 5,
+        lag_interval_ms: float = 100,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.max_threadpool_queue = max_threadpool_queue
+        self.retry_after_seconds = retry_after_seconds
+        self.lag_interval = lag_interval_ms / 1000
+        self.in_flight = 0
+        self.loop_lag_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    # --- event-loop lag probe -----------------------------------------------
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._probe_loop_lag())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _probe_loop_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            lag_ms = max(0.0, (loop.time() - scheduled) * 1000)
+            # Rise immediately, decay gradually, so one quiet tick doesn't
+            # reopen the gate under sustained load.
+            self.loop_lag_ms = max(lag_ms, self.loop_lag_ms * 0.5)
+            metrics.set_gauge("saturation.loop_lag_ms", round(self.loop_lag_ms, 2))
+
+    # --- signals ------------------------------------------------------------
+
+    @staticmethod
+    def threadpool_stats() -> Dict[str, int]:
+        stats = current_default_thread_limiter().statistics()
+        return {"busy": stats.borrowed_tokens, "queued": stats.tasks_waiting}
+
+    def overload_reason(self) -> Optional[str]:
+        """Why new work should be rejected right now, or None to admit it."""
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return "in_flight"
+        if self.max_loop_lag_ms and self.loop_lag_ms >= self.max_loop_lag_ms:
+            return "loop_lag"
+        if (
+            self.max_threadpool_queue
+            and self.threadpool_stats()["queued"] >= self.max_threadpool_queue
+        ):
+            return "threadpool_queue"
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        threadpool = self.threadpool_stats()
+        reason = self.overload_reason()
+        return {
+            "saturated": reason is not None,
+            "reason": reason,
+            "in_flight": self.in_flight,
+            "loop_lag_ms": round(self.loop_lag_ms, 2),
+            "threadpool_busy": threadpool["busy"],
+            "threadpool_queued": threadpool["queued"],
+        }
+
+
+class LoadSheddingMiddleware:
+    def __init__(self, app: ASGIApp, monitor: SaturationMonitor) -> None:
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if path in PRIORITY_PATHS or path.startswith(PRIORITY_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        reason = self.monitor.overload_reason()
+        if reason is not None:
+            metrics.incr(f"load_shedding.rejected.{reason}")
+            await self._reject(send)
+            return
+
+        self.monitor.in_flight += 1
+        metrics.set_gauge("saturation.in_flight", self.monitor.in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.in_flight -= 1
+            metrics.set_gauge("saturation.in_flight", self.monitor.in_flight)
+
+    async def _reject(self, send: Send) -> None:
+        body = json.dumps({"detail": "Server is overloaded; retry later."}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.monitor.retry_after_seconds).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,49 @@
+"""In-process counters and gauges, exposed on ``GET /metrics``.
+
+Each uvicorn worker keeps its own registry; scrape every worker (or sum the
+snapshots) to get instance-wide numbers.
+"""
+
+import threading
+from typing import Dict, Union
+
+Number = Union[int, float]
+
+
+class Metrics:
+    """A minimal thread-safe registry of named counters and gauges."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Number] = {}
+        self._gauges: Dict[str, Number] = {}
+
+    def incr(self, name: str, value: Number = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: Number) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def counter(self, name: str) -> Number:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def ratio(self, numerator: str, denominator: str) -> float:
+        """``numerator / denominator`` over two counters (0.0 when empty)."""
+        with self._lock:
+            total = self._counters.get(denominator, 0)
+            return self._counters.get(numerator, 0) / total if total else 0.0
+
+    def snapshot(self) -> Dict[str, Dict[str, Number]]:
+        with self._lock:
+            return {"counters": dict(self._counters), "gauges": dict(self._gauges)}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+
+
+metrics = Metrics()
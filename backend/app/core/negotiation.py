@@ -0,0 +1,91 @@
+"""Response media-type negotiation (JSON, MessagePack, CBOR) from Accept.
+
+JSON stays the default; clients that ask for ``application/msgpack`` or
+``application/cbor`` get the same structure in that encoding. Binary bodies
+are encoded directly from plain dicts/lists, bypassing pydantic's response
+serialization, and large static parts (such as a segment profile) can be
+encoded once and spliced in as bytes.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import cbor2
+import msgspec
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+BINARY_MEDIA_TYPES = (MSGPACK, CBOR)
+
+_ACCEPTED = {
+    JSON: JSON,
+    MSGPACK: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    CBOR: CBOR,
+}
+
+# OpenAPI ``responses`` entry for endpoints that negotiate their encoding.
+BINARY_RESPONSES: Dict[int, Dict[str, Any]] = {
+    200: {"content": {MSGPACK: {}, CBOR: {}}},
+}
+
+_msgpack_encoder = msgspec.msgpack.Encoder()
+
+
+def choose_media_type(accept: Optional[str]) -> str:
+    """Best of JSON / MessagePack / CBOR for an Accept header.
+
+    The highest q-value wins; ties go to whichever the client listed first.
+    Wildcards and unsupported types mean JSON.
+    """
+    best, best_q = JSON, 0.0
+    for part in (accept or "").split(","):
+        media_range, _, params = part.strip().partition(";")
+        media_type = _ACCEPTED.get(media_range.strip().lower())
+        if media_type is None:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def encode(media_type: str, obj: Any) -> bytes:
+    """Encode plain data (dicts, lists, strings, numbers) as ``media_type``."""
+    if media_type == MSGPACK:
+        return _msgpack_encoder.encode(obj)
+    if media_type == CBOR:
+        return cbor2.dumps(obj)
+    return msgspec.json.encode(obj)
+
+
+def _map_header(media_type: str, size: int) -> bytes:
+    if size > 15:
+        raise ValueError("encode_map supports at most 15 entries")
+    # fixmap (MessagePack) / map with inline length (CBOR).
+    return bytes([(0x80 if media_type == MSGPACK else 0xA0) + size])
+
+
+def encode_map(media_type: str, fields: Dict[str, Any], raw: Dict[str, bytes]) -> bytes:
+    """Encode a map of ``fields`` plus ``raw`` entries whose values are already
+    encoded in ``media_type``, without decoding or re-encoding them.
+
+    Only for the binary media types.
+    """
+    parts: List[bytes] = [_map_header(media_type, len(fields) + len(raw))]
+    for key, value in raw.items():
+        parts.append(encode(media_type, key))
+        parts.append(value)
+    for key, value in fields.items():
+        parts.append(encode(media_type, key))
+        parts.append(encode(media_type, value))
+    return b"".join(parts)
@@ -0,0 +1,178 @@
+"""On-demand sampling profiler for a running worker.
+
+An operator arms the profiler for either the next N ``/recommend`` requests
+(for at most ``max_seconds``, in case they never arrive) or a fixed time
+window. A daemon thread then snapshots every thread's stack
+(``sys._current_frames``) at a fixed interval, which covers both the event
+loop and the threadpool workers running ``kmeans_model.predict``. Stacks are
+written in the collapsed "folded" format (``frame;frame;frame count``) read by
+flamegraph.pl, inferno and speedscope.
+
+While disarmed the only cost on the request path is one attribute check.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Leaf frames of a thread that is parked waiting for work. Sampling those
+# would bury the interesting stacks under idle time.
+_IDLE_LEAVES = {("selectors.py", "select"), ("threading.py", "wait")}
+
+_NULL_CONTEXT = nullcontext()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.armed = False
+        self._thread: Optional[threading.Thread] = None
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._interval = 0.005
+        self._deadline: Optional[float] = None
+        self._cutoff: Optional[float] = None  # request mode's time limit
+        self._remaining: Optional[int] = None
+        self._in_flight = 0
+        self._output_path: Optional[str] = None
+        self.last_output: Optional[str] = None
+
+    def start(
+        self,
+        out_dir: str,
+        *,
+        requests: Optional[int] = None,
+        seconds: Optional[float] = None,
+        interval_ms: float = 5.0,
+        max_seconds: float = 600.0,
+    ) -> str:
+        """Arm the profiler; return the path the profile will be written to.
+
+        Raises RuntimeError if a capture is already running.
+        """
+        if (requests is None) == (seconds is None):
+            raise ValueError("Specify exactly one of requests or seconds")
+        with self._lock:
+            if self.armed:
+                raise RuntimeError("A profile capture is already running")
+            os.makedirs(out_dir, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            self._output_path = os.path.join(out_dir, f"profile-{stamp}-{os.getpid()}.folded")
+            self._stacks = Counter()
+            self._samples = 0
+            self._interval = interval_ms / 1000
+            self._remaining = requests
+            self._deadline = time.monotonic() + seconds if seconds is not None else None
+            self._cutoff = time.monotonic() + max_seconds
+            self._in_flight = 0
+            self.armed = True
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        logger.info(f"Profiler armed (requests={requests}, seconds={seconds}) -> {self._output_path}")
+        return self._output_path
+
+    def stop(self) -> None:
+        """End the current capture early; the profile is still written."""
+        with self._lock:
+            if self.armed:
+                self._deadline = time.monotonic()
+
+    def track_request(self):
+        """Context manager wrapping one profiled request (a no-op when disarmed)."""
+        if not self.armed:
+            return _NULL_CONTEXT
+        return self._tracked()
+
+    @contextmanager
+    def _tracked(self) -> Iterator[None]:
+        with self._lock:
+            if self._remaining is not None and self._remaining <= 0:
+                # Enough requests are already being captured.
+                tracked = False
+            else:
+                tracked = True
+                self._in_flight += 1
+                if self._remaining is not None:
+                    self._remaining -= 1
+        try:
+            yield
+        finally:
+            if tracked:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self.armed,
+                "samples": self._samples,
+                "remaining_requests": self._remaining,
+                "output": self._output_path if self.armed else self.last_output,
+            }
+
+    def _done(self) -> bool:
+        if self._deadline is not None:
+            return time.monotonic() >= self._deadline
+        if self._cutoff is not None and time.monotonic() >= self._cutoff:
+            return True
+        return self._remaining is not None and self._remaining <= 0 and self._in_flight == 0
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            time.sleep(self._interval)
+            with self._lock:
+                if self._done():
+                    break
+                # In request mode, only sample while a profiled request runs.
+                if self._deadline is None and self._in_flight == 0:
+                    continue
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                self._stacks[";".join(reversed(stack))] += 1
+            with self._lock:
+                self._samples += 1
+        self._write()
+
+    def _write(self) -> None:
+        written = False
+        try:
+            with open(self._output_path, "w") as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            written = True
+        except OSError as e:
+            logger.error(f"Could not write profile to {self._output_path}: {e}")
+        finally:
+            # Disarm even if the write failed, so requests stop being tracked
+            # and the profiler can be armed again.
+            with self._lock:
+                self.armed = False
+                self.last_output = self._output_path if written else None
+        if written:
+            logger.info(f"Profile with {self._samples} samples written to {self._output_path}")
+
+
+profiler = SamplingProfiler()
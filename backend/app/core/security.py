@@ -0,0 +1,20 @@
+"""Access control for operator-only endpoints."""
+
+import secrets
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from app.core.config import settings
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Allow the request only if it carries the configured admin token.
+
+    With no token configured the admin surface does not exist (404), so a
+    default deployment exposes nothing.
+    """
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
@@ -0,0 +1,82 @@
+"""Per-worker thread topology: native (BLAS/OpenMP) pools and the threadpool.
+
+Every uvicorn worker loads numpy/scikit-learn, whose OpenBLAS/MKL and
+OpenMP runtimes each default to one thread per core. With several workers
+on a many-core box that is workers x cores threads competing for the same
+cores whenever ``KMeans.predict`` or the scaler runs, which shows up as
+tail-latency spikes. Our calls are single-row, so they gain nothing from
+those threads; :func:`apply_thread_limits` caps them via threadpoolctl and
+sizes Starlette's threadpool (anyio's default limiter, which
+``run_in_threadpool`` draws from). :func:`thread_topology` reports the
+result; it is logged at startup and served on ``GET /metrics/threads``.
+
+Compare configurations with ``python -m benchmarks.thread_topology``.
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+from anyio.to_thread import current_default_thread_limiter
+from threadpoolctl import ThreadpoolController
+
+_controller: Optional[ThreadpoolController] = None
+
+
+def _controller_for_process() -> ThreadpoolController:
+    # Inspecting the loaded libraries is slow-ish; do it once per process.
+    global _controller
+    if _controller is None:
+        _controller = ThreadpoolController()
+    return _controller
+
+
+def usable_cpus() -> int:
+    """CPUs this process may run on (respects affinity masks / cpusets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS/Windows
+        return os.cpu_count() or 1
+
+
+def apply_thread_limits(native_threads: int, threadpool_tokens: int) -> None:
+    """Cap native thread pools and size the threadpool; 0 leaves either as is.
+
+    Must run inside the event loop (the anyio limiter is per loop).
+    """
+    if native_threads > 0:
+        _controller_for_process().limit(limits=native_threads)
+    if threadpool_tokens > 0:
+        current_default_thread_limiter().total_tokens = threadpool_tokens
+
+
+def thread_topology() -> Dict[str, Any]:
+    """Effective thread configuration of this worker process."""
+    pools = [
+        {
+            "user_api": info["user_api"],
+            "internal_api": info["internal_api"],
+            "num_threads": info["num_threads"],
+            "library": os.path.basename(info["filepath"]),
+        }
+        for info in _controller_for_process().info()
+    ]
+    return {
+        "pid": os.getpid(),
+        "cpu_count": os.cpu_count(),
+        "usable_cpus": usable_cpus(),
+        "native_pools": pools,
+        "threadpool_tokens": current_default_thread_limiter().total_tokens,
+    }
+
+
+def describe(topology: Dict[str, Any]) -> str:
+    """One log line summarizing :func:`thread_topology`."""
+    pools = ", ".join(
+        f"{pool['internal_api']}({pool['library']})={pool['num_threads']}"
+        for pool in topology["native_pools"]
+    )
+    return (
+        f"Thread topology (pid {topology['pid']}): {topology['usable_cpus']}/"
+        f"{topology['cpu_count']} CPUs usable; native pools: {pools or 'none'}; "
+        f"threadpool tokens: {topology['threadpool_tokens']}"
+    )
@@ -1,7 +1,8 @@
 """FastAPI application factory."""
 
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from typing import Optional
 
 from fastapi import FastAPI
@@ -10,29 +11,113 @@ from groq import AsyncGroq
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
 from app.core.limiter import limiter
+from app.core.load_shedding import LoadSheddingMiddleware, SaturationMonitor
 from app.core.logging import configure_logging
+from app.core.threads import apply_thread_limits, describe, thread_topology
 from app.ml.loader import load_model_bundle
-from app.routers import health, recommend
+from app.routers import admin, health, jobs, recommend, segments, session
+from app.services.capture import TrafficCapture
+from app.services.heavy_hitters import heavy_hitters, publish_snapshots
+from app.services.jobs import JobQueue
+from app.services.prefetch import PrefetchRegistry
+from app.services.result_store import ResultStore
+from app.services.stub_llm import StubGroqClient
 
 logger = logging.getLogger(__name__)
 
 
 def _init_llm_client() -> Optional[AsyncGroq]:
+    if settings.llm_stub:
+        logger.warning("LLM_STUB is set; recommendations come from the local stub client.")
+        return StubGroqClient(settings.llm_stub_latency_ms, settings.llm_stub_jitter_ms)
     if not settings.groq_api_key:
         logger.warning("GROQ_API_KEY not set; recommendations will use fallback mode.")
         return None
     logger.info(f"Groq client initialized (model={settings.groq_model}).")
-    return AsyncGroq(api_key=settings.groq_api_key, timeout=30.0, max_retries=2)
+    # Retries happen in llm._complete, where they are counted per request.
+    return AsyncGroq(api_key=settings.groq_api_key, timeout=30.0, max_retries=0)
+
+
+def _init_result_store() -> Optional[ResultStore]:
+    if not settings.result_store_path:
+        return None
+    return ResultStore(
+        settings.result_store_path,
+        ttl_seconds=settings.result_store_ttl_seconds,
+        max_entries=settings.result_store_max_entries,
+        memory_entries=settings.result_store_memory_entries,
+        warm_keys=settings.result_store_warm_keys,
+    )
+
+
+def _init_capture() -> Optional[TrafficCapture]:
+    if not settings.capture_path or settings.capture_sample_rate <= 0:
+        return None
+    return TrafficCapture(settings.capture_path, settings.capture_sample_rate)
+
+
+def _init_prefetch() -> Optional[PrefetchRegistry]:
+    if settings.prefetch_ttl_seconds <= 0:
+        return None
+    return PrefetchRegistry(settings.prefetch_ttl_seconds, settings.prefetch_max_per_client)
+
+
+def _init_job_queue() -> Optional[JobQueue]:
+    if settings.job_workers <= 0:
+        return None
+    return JobQueue(
+        workers=settings.job_workers,
+        max_depth=settings.job_queue_depth,
+        retention_seconds=settings.job_retention_seconds,
+    )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Fail loud here: if artifacts are missing/corrupt, startup raises.
     app.state.bundle = load_model_bundle(settings.model_dir)
+    # After the model load, so the native libraries it pulls in are covered.
+    apply_thread_limits(settings.native_threads, settings.threadpool_tokens)
+    logger.info(describe(thread_topology()))
     app.state.llm_client = _init_llm_client()
-    yield
+    app.state.result_store = _init_result_store()
+    if app.state.result_store is not None:
+        await app.state.result_store.start()
+    app.state.traffic_capture = _init_capture()
+    if app.state.traffic_capture is not None:
+        await app.state.traffic_capture.start()
+    app.state.prefetch = _init_prefetch()
+    app.state.job_queue = _init_job_queue()
+    if app.state.job_queue is not None:
+        await app.state.job_queue.start()
+    app.state.saturation.start()
+    publisher = None
+    if settings.heavy_hitters_dir:
+        publisher = asyncio.create_task(
+            publish_snapshots(
+                heavy_hitters, settings.heavy_hitters_dir, settings.heavy_hitters_flush_seconds
+            )
+        )
+    try:
+        yield
+    finally:
+        if publisher is not None:
+            publisher.cancel()
+            # It writes a final snapshot on the way out.
+            with suppress(asyncio.CancelledError):
+                await publisher
+        await app.state.saturation.stop()
+        if app.state.prefetch is not None:
+            await app.state.prefetch.close()
+        if app.state.job_queue is not None:
+            await app.state.job_queue.close()
+        if app.state.traffic_capture is not None:
+            await app.state.traffic_capture.close()
+        if app.state.result_store is not None:
+            await app.state.result_store.close()
 
 
 def create_app() -> FastAPI:
@@ -44,15 +129,37 @@ def create_app() -> FastAPI:
     )
     app.state.limiter = limiter
     app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+    app.state.saturation = SaturationMonitor(
+        max_in_flight=settings.shed_max_in_flight,
+        max_loop_lag_ms=settings.shed_max_loop_lag_ms,
+        max_threadpool_queue=settings.shed_max_threadpool_queue,
+        retry_after_seconds=settings.shed_retry_after_seconds,
+        lag_interval_ms=settings.loop_lag_interval_ms,
+    )
+    # Innermost of the middlewares, so shed 503s still get CORS headers.
+    app.add_middleware(LoadSheddingMiddleware, monitor=app.state.saturation)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.allowed_origins_list,
         allow_credentials=False,
         allow_methods=["GET", "POST"],
         allow_headers=["*"],
+        expose_headers=[
+            "ETag",
+            "X-Cache-Key",
+            "Preference-Applied",
+            "X-LLM-Usage",
+            "X-Prefetch",
+            "Location",
+        ],
     )
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_size)
     app.include_router(health.router)
     app.include_router(recommend.router)
+    app.include_router(jobs.router)
+    app.include_router(segments.router)
+    app.include_router(session.router)
+    app.include_router(admin.router)
     return app
 
 
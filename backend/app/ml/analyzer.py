@@ -6,9 +6,20 @@ from typing import Any, Dict, Tuple
 
 import numpy as np
 import pandas as pd
+import sklearn
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 
+from app.ml.encoder import (
+    AGE_MAP,
+    DEFAULT_AGE,
+    ENCODER_FILENAME,
+    ENCODER_VERSION,
+    PreferenceEncoder,
+    categorical_columns,
+)
+from app.ml.feature_cache import FeatureCache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -32,6 +43,9 @@ class SpotifyUserAnalyzer:
         self.features = None
         self.kmeans_model = None
         self.scaler = None
+        self.encoder = None
+        self.scaled_features = None
+        self.feature_cache_status = None
         self.label_encoders = {}
         self.valid_features = None
         self.segment_profiles = {}
@@ -54,9 +68,31 @@ class SpotifyUserAnalyzer:
             logger.error(f"Error loading data: {str(e)}")
             raise
             
-    def preprocess_data(self) -> pd.DataFrame:
+    def preprocessing_config(self) -> Dict[str, Any]:
+        """
+        Everything besides the data that determines the preprocessed features.
+        
+        Returns:
+            JSON-serializable dictionary (part of the feature cache key)
         """
-        Preprocess the user data for modeling.
+        return {
+            'age_column': 'Age',
+            'age_map': AGE_MAP,
+            'default_age': DEFAULT_AGE,
+            'encoding': f'PreferenceEncoder/{ENCODER_VERSION}',
+            'scaling': 'StandardScaler',
+            'pandas': pd.__version__,
+            'sklearn': sklearn.__version__,
+        }
+        
+    def preprocess_data(self, cache_dir: str = None) -> pd.DataFrame:
+        """
+        Preprocess the user data for modeling and scale it.
+        
+        Args:
+            cache_dir: Optional feature cache directory; when it holds an entry
+                for this data file and preprocessing config, the features and
+                scaled matrix are memory-mapped from it instead of recomputed
         
         Returns:
             DataFrame with processed features
@@ -66,67 +102,61 @@ class SpotifyUserAnalyzer:
             return None
             
         try:
-            # Convert age to numeric
-            self.data['age_numeric'] = self.data['Age'].apply(self._convert_age_to_numeric)
-            
-            # Get categorical columns
-            categorical_columns = self.data.select_dtypes(include=['object']).columns.tolist()
-            categorical_columns.remove('Age')  # Already processed
-            
-            # One-hot encode categorical variables
-            encoded_data = pd.get_dummies(self.data[categorical_columns])
-            
-            # Combine numeric and encoded features
-            self.features = pd.concat([
-                self.data[['age_numeric']], 
-                encoded_data
-            ], axis=1)
+            cache = None
+            if cache_dir:
+                cache = FeatureCache(cache_dir, self.data_path, self.preprocessing_config())
+                cached = cache.load()
+                self.feature_cache_status = cache.status
+                if cached is not None:
+                    self.features = cached.features
+                    self.valid_features = cached.valid_features
+                    self.encoder = PreferenceEncoder(self.valid_features, categorical_columns(self.data))
+                    self.scaler = cached.scaler
+                    self.scaled_features = cached.scaled
+                    self.data['age_numeric'] = self.features['age_numeric'].to_numpy(dtype=np.int64)
+                    return self.features
+            
+            # Numeric age plus one-hot categorical columns, encoded the same
+            # way as preferences are at serving time
+            self.encoder = PreferenceEncoder.fit(self.data)
+            self.features = pd.DataFrame(self.encoder.encode(self.data), columns=self.encoder.columns)
+            self.data['age_numeric'] = self.features['age_numeric'].to_numpy(dtype=np.int64)
             
             # Store valid feature names
-            self.valid_features = self.features.columns.tolist()
+            self.valid_features = self.encoder.columns
+            
+            # Scale the features
+            self.scaler = StandardScaler()
+            self.scaled_features = self.scaler.fit_transform(self.features)
             
             logger.info(f"Data preprocessed successfully with {self.features.shape[1]} features")
+            if cache is not None:
+                cache.save(self.features, self.scaled_features, self.scaler)
             return self.features
         except Exception as e:
             logger.error(f"Error preprocessing data: {str(e)}")
             raise
             
-    def _convert_age_to_numeric(self, age_category: str) -> int:
-        """
-        Convert age category to numeric value.
-        
-        Args:
-            age_category: Age category string
-            
-        Returns:
-            Numeric age value (middle of the range)
-        """
-        age_map = {
-            '12~20': 16,
-            '20~35': 28,
-            '35~60': 48,
-            '60+': 65
-        }
-        return age_map.get(age_category, 30)  # Default to 30 if unknown
-        
-    def train_cluster_model(self, n_clusters: int = 3) -> KMeans:
+    def train_cluster_model(self, n_clusters: int = 3, rows: np.ndarray = None,
+                            sample_weight: np.ndarray = None) -> KMeans:
         """
         Train KMeans clustering model on the preprocessed data.
         
         Args:
             n_clusters: Number of clusters (segments)
+            rows: Optional row positions to fit on (e.g. a coreset); the
+                scaler is always fitted on every row, in preprocess_data
+            sample_weight: Optional weight per entry of ``rows``
             
         Returns:
             Trained KMeans model
         """
-        if self.features is None:
+        if self.scaled_features is None:
             logger.error("No features available. Please preprocess data first.")
             return None
             
         try:
-            # Scale the features
-            self.scaler = StandardScaler()
-            scaled_features = self.scaler.fit_transform(self.features)
+            scaled_features = self.scaled_features
             
             # Train KMeans model
             self.kmeans_model = KMeans(
@@ -134,7 +164,9 @@ class SpotifyUserAnalyzer:
                 random_state=42,
                 n_init=10
             )
-            self.kmeans_model.fit(scaled_features)
+            if rows is not None:
+                scaled_features = scaled_features[rows]
+            self.kmeans_model.fit(scaled_features, sample_weight=sample_weight)
             
             logger.info(f"KMeans model trained successfully with {n_clusters} clusters")
             return self.kmeans_model
@@ -155,7 +187,7 @@ class SpotifyUserAnalyzer:
             
         try:
             # Assign segments to data
-            self.data['segment'] = self.kmeans_model.predict(self.scaler.transform(self.features))
+            self.data['segment'] = self.kmeans_model.predict(self.scaled_features)
             
             # Create segment profiles
             self.segment_profiles = {}
@@ -223,6 +255,9 @@ class SpotifyUserAnalyzer:
             with open(os.path.join(self.model_dir, 'valid_features.pkl'), 'wb') as f:
                 pickle.dump(self.valid_features, f)
                 
+            # Save the preference encoder
+            self.encoder.save(os.path.join(self.model_dir, ENCODER_FILENAME))
+                
             # Save segment profiles
             with open(os.path.join(self.model_dir, 'segment_profiles.json'), 'w') as f:
                 json.dump(self.segment_profiles, f, indent=4)
@@ -256,6 +291,13 @@ class SpotifyUserAnalyzer:
             with open(os.path.join(self.model_dir, 'valid_features.pkl'), 'rb') as f:
                 self.valid_features = pickle.load(f)
                 
+            # Load the preference encoder (older artifacts don't have one)
+            encoder_path = os.path.join(self.model_dir, ENCODER_FILENAME)
+            if os.path.exists(encoder_path):
+                self.encoder = PreferenceEncoder.load(encoder_path)
+            else:
+                self.encoder = PreferenceEncoder.from_columns(self.valid_features)
+                
             # Load segment profiles
             with open(os.path.join(self.model_dir, 'segment_profiles.json'), 'r') as f:
                 self.segment_profiles = json.load(f)
@@ -281,66 +323,8 @@ class SpotifyUserAnalyzer:
             return None, None
             
         try:
-            # Prepare features
-            features = np.zeros(len(self.valid_features))
-            feature_dict = {}
-            
-            # Add age as numeric (mid-point of range)
-            age_map = {
-                "18-24": 21,
-                "25-34": 30,
-                "35-44": 40,
-                "45-54": 50,
-                "55+": 60
-            }
-            feature_dict["age_numeric"] = age_map.get(user_data.get("age", "25-34"), 30)
-            
-            # Map categorical variables using one-hot encoding
-            for feature_name in self.valid_features:
-                if feature_name == "age_numeric":
-                    continue
-                    
-                if feature_name.startswith("fav_music_genre"):
-                    base_name = "fav_music_genre"
-                    value = user_data.get("music_genre", "")
-                    feature_value = f"{base_name}_{value}"
-                    if feature_value in self.valid_features:
-                        feature_dict[feature_value] = 1
-                        
-                elif feature_name.startswith("pod_lis_frequency"):
-                    base_name = "pod_lis_frequency"
-                    value = user_data.get("podcast_frequency", "")
-                    feature_value = f"{base_name}_{value}"
-                    if feature_value in self.valid_features:
-                        feature_dict[feature_value] = 1
-                        
-                elif feature_name.startswith("preffered_pod_duration"):
-                    base_name = "preffered_pod_duration"
-                    value = user_data.get("podcast_duration", "")
-                    feature_value = f"{base_name}_{value}"
-                    if feature_value in self.valid_features:
-                        feature_dict[feature_value] = 1
-                        
-                elif feature_name.startswith("preffered_pod_format"):
-                    base_name = "preffered_pod_format"
-                    value = user_data.get("podcast_format", "")
-                    feature_value = f"{base_name}_{value}"
-                    if feature_value in self.valid_features:
-                        feature_dict[feature_value] = 1
-                        
-                elif feature_name.startswith("fav_pod_genre"):
-                    base_name = "fav_pod_genre"
-                    value = user_data.get("podcast_content", "")
-                    feature_value = f"{base_name}_{value}"
-                    if feature_value in self.valid_features:
-                        feature_dict[feature_value] = 1
-            
-            # Create feature vector
-            for i, feature_name in enumerate(self.valid_features):
-                features[i] = feature_dict.get(feature_name, 0)
-            
-            # Scale the features
-            scaled_features = self.scaler.transform([features])
+            # Encode and scale the features
+            scaled_features = self.scaler.transform(self.encoder.encode(user_data))
             
             # Predict segment
             segment_id = self.kmeans_model.predict(scaled_features)[0]
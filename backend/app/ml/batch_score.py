@@ -0,0 +1,147 @@
+"""Offline bulk segment assignment for large preference files.
+
+Streams a CSV or Parquet file of user preferences (columns named like the
+``/recommend`` request fields) in fixed-size chunks, encodes each chunk with
+:func:`prepare_feature_matrix`, and assigns KMeans segments across a process
+pool. Results are written back in input order as each chunk completes, and at
+most ``2 * workers`` chunks are ever in flight, so memory stays bounded no
+matter how large the input is.
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.ml.features import prepare_feature_matrix
+from app.ml.loader import ModelBundle, load_model_bundle
+
+logger = logging.getLogger(__name__)
+
+# Set once per worker process by _init_worker.
+_worker_bundle: Optional[ModelBundle] = None
+
+
+def _init_worker(model_dir: str) -> None:
+    global _worker_bundle
+    _worker_bundle = load_model_bundle(model_dir)
+
+
+def score_chunk(bundle: ModelBundle, chunk: pd.DataFrame) -> np.ndarray:
+    """Segment id for every row of ``chunk``."""
+    return bundle.kmeans_model.predict(prepare_feature_matrix(bundle, chunk))
+
+
+def _score_in_worker(chunk: pd.DataFrame) -> np.ndarray:
+    return score_chunk(_worker_bundle, chunk)
+
+
+def iter_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Yield ``path`` as DataFrames of at most ``chunksize`` rows."""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise RuntimeError("Reading Parquet input requires pyarrow (pip install pyarrow)") from exc
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._parquet_writer = None
+        self._wrote_header = False
+
+    def write(self, frame: pd.DataFrame) -> None:
+        if self.path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            frame.to_csv(
+                self.path,
+                mode="a" if self._wrote_header else "w",
+                header=not self._wrote_header,
+                index=False,
+            )
+            self._wrote_header = True
+
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def score_file(
+    model_dir: str,
+    input_path: str,
+    output_path: str,
+    chunksize: int = 100_000,
+    workers: int = 0,
+    id_column: Optional[str] = None,
+) -> int:
+    """Score every row of ``input_path`` into ``output_path``; return the row count.
+
+    ``workers=0`` uses one process per CPU; ``workers=1`` scores inline.
+    Output has the ``id_column`` values (or the 0-based input row number as
+    ``row``) and a ``segment`` column.
+    """
+    workers = workers or os.cpu_count() or 1
+    writer = ChunkWriter(output_path)
+    total = 0
+    start = time.perf_counter()
+
+    def emit(ids: pd.Series, segments: np.ndarray) -> None:
+        nonlocal total
+        writer.write(pd.DataFrame({ids.name: ids.to_numpy(), "segment": segments}))
+        total += len(segments)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Scored {total:,} rows ({total / elapsed:,.0f} rows/s)")
+
+    def ids_for(chunk: pd.DataFrame, offset: int) -> pd.Series:
+        if id_column:
+            return chunk[id_column]
+        return pd.Series(np.arange(offset, offset + len(chunk)), name="row")
+
+    offset = 0
+    try:
+        if workers == 1:
+            bundle = load_model_bundle(model_dir)
+            for chunk in iter_chunks(input_path, chunksize):
+                emit(ids_for(chunk, offset), score_chunk(bundle, chunk))
+                offset += len(chunk)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(model_dir,)
+            ) as pool:
+                pending: Deque[Tuple[pd.Series, Future]] = deque()
+                for chunk in iter_chunks(input_path, chunksize):
+                    pending.append((ids_for(chunk, offset), pool.submit(_score_in_worker, chunk)))
+                    offset += len(chunk)
+                    # Backpressure: never hold more than 2 chunks per worker.
+                    while len(pending) >= 2 * workers:
+                        ids, future = pending.popleft()
+                        emit(ids, future.result())
+                while pending:
+                    ids, future = pending.popleft()
+                    emit(ids, future.result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed else 0.0
+    logger.info(f"Finished: {total:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s) -> {output_path}")
+    return total
@@ -0,0 +1,217 @@
+"""Local podcast catalog with vectorized preference scoring.
+
+The catalog is held column-wise: each categorical attribute is factorized
+into an integer code array plus its vocabulary. Podcasts that share the same
+(genre, format, duration, language, region) combination always score the
+same, so at load time we group them into buckets of distinct combinations,
+each sorted by popularity. Ranking then only has to score the distinct
+combinations (at most a few thousand, whatever the catalog size) and read
+the head of the best buckets, which keeps top-k selection in the low
+milliseconds for catalogs of millions of podcasts.
+"""
+
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILENAME = "podcast_catalog.csv"
+
+# Categorical attributes in combination-code order.
+ATTRIBUTES = ("genre", "format", "duration", "language", "region")
+
+# Relative weight of each signal in the score.
+GENRE_WEIGHT = 3.0
+SEGMENT_GENRE_WEIGHT = 1.0
+FORMAT_WEIGHT = 1.5
+DURATION_WEIGHT = 1.0
+LANGUAGE_WEIGHT = 2.0
+REGION_WEIGHT = 1.0
+GLOBAL_REGION_WEIGHT = 0.5
+# Popularity is in [0, 1]; keep it a tie-breaker rather than a signal.
+POPULARITY_WEIGHT = 0.25
+
+_STOPWORDS = {"and", "the", "of", "related", "stuff", "none"}
+
+
+def _tokens(value: str) -> set:
+    return {t for t in re.split(r"[^a-z]+", value.lower()) if t and t not in _STOPWORDS}
+
+
+@dataclass
+class PodcastCatalog:
+    names: np.ndarray
+    creators: np.ndarray
+    descriptions: np.ndarray
+    popularity: np.ndarray
+    # Per-attribute vocabulary and int32 code per podcast.
+    vocab: Dict[str, List[str]]
+    codes: Dict[str, np.ndarray]
+    # Distinct attribute combinations: (n_combos, len(ATTRIBUTES)) codes,
+    # and the podcast indices of each combination, sorted by popularity,
+    # laid out CSR-style in ``order[offsets[c]:offsets[c + 1]]``.
+    combos: np.ndarray
+    order: np.ndarray
+    offsets: np.ndarray
+    max_popularity: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "PodcastCatalog":
+        vocab: Dict[str, List[str]] = {}
+        codes: Dict[str, np.ndarray] = {}
+        for attr in ATTRIBUTES:
+            attr_codes, uniques = pd.factorize(df[attr].fillna("").astype(str))
+            codes[attr] = attr_codes.astype(np.int32)
+            vocab[attr] = [str(u) for u in uniques]
+
+        popularity = (
+            df["popularity"].fillna(0).to_numpy(dtype=np.float32)
+            if "popularity" in df.columns
+            else np.zeros(len(df), dtype=np.float32)
+        )
+        stacked = np.stack([codes[a] for a in ATTRIBUTES], axis=1)
+        combos, combo_of = np.unique(stacked, axis=0, return_inverse=True)
+        combo_of = combo_of.reshape(-1)
+        # Sort by combination, then by descending popularity within each.
+        order = np.lexsort((-popularity, combo_of)).astype(np.int64)
+        counts = np.bincount(combo_of, minlength=len(combos))
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        return cls(
+            names=df["name"].astype(str).to_numpy(dtype=object),
+            creators=df["creator"].astype(str).to_numpy(dtype=object),
+            descriptions=df.get("description", pd.Series([""] * len(df)))
+            .fillna("")
+            .astype(str)
+            .to_numpy(dtype=object),
+            popularity=popularity,
+            vocab=vocab,
+            codes=codes,
+            combos=combos.astype(np.int32),
+            order=order,
+            offsets=offsets,
+            max_popularity=float(popularity.max()) if len(popularity) else 0.0,
+        )
+
+    def _attribute_weights(
+        self, preferences: Dict[str, Any], segment_profile: Dict[str, Any]
+    ) -> List[np.ndarray]:
+        """One weight vector per attribute, indexed by that attribute's codes."""
+        wanted_genres = set(preferences.get("podcast_content") or [])
+        segment_genres = [
+            (_tokens(genre), share)
+            for genre, share in (segment_profile.get("fav_pod_genre") or {}).items()
+        ]
+
+        genre_w = np.zeros(len(self.vocab["genre"]), dtype=np.float32)
+        for i, genre in enumerate(self.vocab["genre"]):
+            if genre in wanted_genres:
+                genre_w[i] += GENRE_WEIGHT
+            genre_tokens = _tokens(genre)
+            for tokens, share in segment_genres:
+                if tokens & genre_tokens:
+                    genre_w[i] += SEGMENT_GENRE_WEIGHT * float(share)
+
+        def exact(attr: str, value: Optional[str], weight: float) -> np.ndarray:
+            return np.array(
+                [weight if v == value else 0.0 for v in self.vocab[attr]], dtype=np.float32
+            )
+
+        region = preferences.get("region")
+        region_w = np.array(
+            [
+                REGION_WEIGHT if v == region else GLOBAL_REGION_WEIGHT if v == "Global" else 0.0
+                for v in self.vocab["region"]
+            ],
+            dtype=np.float32,
+        )
+        return [
+            genre_w,
+            exact("format", preferences.get("podcast_format"), FORMAT_WEIGHT),
+            exact("duration", preferences.get("podcast_duration"), DURATION_WEIGHT),
+            exact("language", preferences.get("content_language"), LANGUAGE_WEIGHT),
+            region_w,
+        ]
+
+    def top_k(
+        self, preferences: Dict[str, Any], segment_profile: Dict[str, Any], k: int = 5
+    ) -> np.ndarray:
+        """Indices of the ``k`` best-scoring podcasts, best first."""
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+
+        weights = self._attribute_weights(preferences, segment_profile)
+        combo_scores = np.zeros(len(self.combos), dtype=np.float32)
+        for col, w in enumerate(weights):
+            combo_scores += w[self.combos[:, col]]
+
+        # Walk combinations best-first until k podcasts are covered, then
+        # include every combination close enough to the last one that its
+        # popularity bonus could still lift it into the top k.
+        ranked = np.argsort(-combo_scores, kind="stable")
+        sizes = np.diff(self.offsets)[ranked]
+        reach = int(np.searchsorted(np.cumsum(sizes), k))
+        threshold = combo_scores[ranked[min(reach, len(ranked) - 1)]]
+        threshold -= POPULARITY_WEIGHT * self.max_popularity
+        chosen = ranked[combo_scores[ranked] >= threshold]
+
+        heads = [
+            self.order[self.offsets[c] : min(self.offsets[c] + k, self.offsets[c + 1])]
+            for c in chosen
+        ]
+        candidates = np.concatenate(heads)
+        scores = np.repeat(combo_scores[chosen], [len(h) for h in heads])
+        final = scores + POPULARITY_WEIGHT * self.popularity[candidates]
+        best = np.lexsort((candidates, -final))[:k]
+        return candidates[best]
+
+    def recommend(
+        self, preferences: Dict[str, Any], segment_profile: Dict[str, Any], k: int = 5
+    ) -> List[Dict[str, Any]]:
+        """Top-k podcasts as raw recommendation dicts (pass through ``normalize_recommendations``)."""
+        wanted_genres = set(preferences.get("podcast_content") or [])
+        recs = []
+        for i in self.top_k(preferences, segment_profile, k):
+            genre = self.vocab["genre"][self.codes["genre"][i]]
+            fmt = self.vocab["format"][self.codes["format"][i]]
+            language = self.vocab["language"][self.codes["language"][i]]
+            if genre in wanted_genres:
+                reason = f"A top {genre} podcast that matches your interests."
+            else:
+                reason = f"A popular {fmt} podcast in {language} that fits your listening profile."
+            recs.append(
+                {
+                    "name": self.names[i],
+                    "creator": self.creators[i],
+                    "description": self.descriptions[i],
+                    "format": fmt,
+                    "duration": self.vocab["duration"][self.codes["duration"][i]],
+                    "language": language,
+                    "region": self.vocab["region"][self.codes["region"][i]],
+                    "reason": reason,
+                }
+            )
+        return recs
+
+
+def load_catalog(model_dir: str) -> Optional[PodcastCatalog]:
+    """Load the catalog next to the model artifacts, or None if there isn't one."""
+    path = os.path.join(model_dir, CATALOG_FILENAME)
+    if not os.path.exists(path):
+        logger.warning(f"No podcast catalog at {path}; fast mode is unavailable.")
+        return None
+    catalog = PodcastCatalog.from_frame(pd.read_csv(path))
+    logger.info(
+        f"Podcast catalog loaded ({len(catalog)} podcasts, {len(catalog.combos)} combinations)."
+    )
+    return catalog
@@ -0,0 +1,223 @@
+"""One encoding of user preferences, shared by training and serving.
+
+:class:`PreferenceEncoder` maps survey rows (training) and API preferences
+(serving) onto the same feature layout: ``age_numeric`` followed by one-hot
+``<survey column>_<value>`` columns. Survey columns and API fields are two
+names for the same inputs (``fav_music_genre`` is ``music_genre``, ``Age``
+is ``age``, see :data:`FIELDS`), and both age vocabularies (the survey's
+``12~20`` bands, the form's ``18-24`` bands) are in one :data:`AGE_MAP`.
+
+:meth:`PreferenceEncoder.fit` learns the one-hot columns from the survey in
+``pd.get_dummies`` order, and ``train.py`` saves the encoder as
+``encoder.json`` with the other artifacts. Artifacts without one get an
+encoder derived from ``valid_features`` (:meth:`~PreferenceEncoder.from_columns`).
+
+:meth:`~PreferenceEncoder.encode` takes a dict, a list of dicts or a
+DataFrame. A single dict (the request path) is encoded field by field; a
+batch is encoded column by column with pandas/NumPy ops, so a 100k-row chunk
+costs a handful of array operations. Both produce the same rows.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+ENCODER_FILENAME = "encoder.json"
+ENCODER_VERSION = 1
+
+AGE_COLUMN = "age_numeric"
+# (survey column, API field) for age; encoded as the middle of the band.
+AGE_FIELD = ("Age", "age")
+SURVEY_AGE_MAP = {"12~20": 16, "20~35": 28, "35~60": 48, "60+": 65}
+API_AGE_MAP = {"18-24": 21, "25-34": 30, "35-44": 40, "45-54": 50, "55+": 60}
+AGE_MAP = {**SURVEY_AGE_MAP, **API_AGE_MAP}
+DEFAULT_AGE = 30
+
+
+@dataclass(frozen=True)
+class Field:
+    survey: str  # survey column, and the prefix of its one-hot columns
+    api: str  # UserPreferences field
+    multi: bool = False  # the API value is a list
+
+
+# The survey columns the API collects; other survey columns are never set at
+# serving time.
+FIELDS = (
+    Field("fav_music_genre", "music_genre", multi=True),
+    Field("fav_pod_genre", "podcast_content", multi=True),
+    Field("pod_lis_frequency", "podcast_frequency"),
+    Field("preffered_pod_duration", "podcast_duration"),
+    Field("preffered_pod_format", "podcast_format"),
+)
+_BY_SURVEY = {field.survey: field for field in FIELDS}
+_BY_API = {field.api: field for field in FIELDS}
+
+Preferences = Union[Dict[str, Any], Sequence[Dict[str, Any]], pd.DataFrame]
+
+
+def categorical_columns(survey: pd.DataFrame) -> List[str]:
+    """The survey columns that are one-hot encoded (every text column but Age)."""
+    return [c for c in survey.select_dtypes(include=["object"]).columns if c != AGE_FIELD[0]]
+
+
+# Stripped from both ends of every multi-value item.
+_ITEM_EDGES = " \t\r\n[]\"'"
+
+
+def _as_list(value: Any) -> List[str]:
+    """One API multi-value as its items: a list, or a JSON-array / comma-separated string.
+
+    Every item is split on commas and stripped of whitespace, brackets and
+    quotes, so ``["Melody "]``, ``['"Melody"']`` and ``'["Melody"]'`` all give
+    ``["Melody"]``. The single and batch paths both go through here.
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    parts = value if isinstance(value, (list, tuple)) else [value]
+    items = []
+    for part in parts:
+        for item in str(part).split(","):
+            item = item.strip(_ITEM_EDGES)
+            if item:
+                items.append(item)
+    return items
+
+
+def _split_multi(values: pd.Series) -> pd.Series:
+    """:func:`_as_list` per row, exploded: one item per entry, indexed by row."""
+    return values.map(_as_list).explode().dropna()
+
+
+class PreferenceEncoder:
+    def __init__(
+        self,
+        columns: Sequence[str],
+        categorical: Optional[Sequence[str]] = None,
+        age_map: Optional[Dict[str, float]] = None,
+        default_age: float = DEFAULT_AGE,
+    ) -> None:
+        self.columns = list(columns)
+        # Survey columns whose values are one-hot encoded, in column order.
+        self.categorical = list(categorical) if categorical is not None else list(_BY_SURVEY)
+        self.age_map = dict(AGE_MAP if age_map is None else age_map)
+        self.default_age = default_age
+        self._index = {name: i for i, name in enumerate(self.columns)}
+
+    @classmethod
+    def fit(cls, survey: pd.DataFrame) -> "PreferenceEncoder":
+        """Columns for ``survey``: age, then each text column's values in get_dummies order."""
+        categorical = categorical_columns(survey)
+        columns = [AGE_COLUMN] + [
+            f"{column}_{value}"
+            for column in categorical
+            for value in sorted(v for v in survey[column].unique() if not pd.isna(v))
+        ]
+        return cls(columns, categorical)
+
+    @classmethod
+    def from_columns(cls, valid_features: Iterable[str]) -> "PreferenceEncoder":
+        """An encoder for artifacts saved without one (the API fields only)."""
+        return cls(list(valid_features))
+
+    # --- single preferences (the request path) -----------------------------
+
+    def field_columns(self, name: str, value: Any) -> Dict[int, float]:
+        """Column positions and raw values one field sets; ``name`` is an API field."""
+        if name == AGE_FIELD[1]:
+            column = self._index.get(AGE_COLUMN)
+            age = self.age_map.get(value, self.default_age) if isinstance(value, str) else None
+            if age is None:
+                age = self.default_age
+            return {} if column is None else {column: float(age)}
+        field = _BY_API.get(name)
+        if field is None or field.survey not in self.categorical:
+            return {}
+        values = _as_list(value) if field.multi else [str(value or "")]
+        names = {f"{field.survey}_{v}" for v in values if v}
+        return {self._index[n]: 1.0 for n in names if n in self._index}
+
+    def _encode_one(self, preferences: Dict[str, Any]) -> np.ndarray:
+        row = np.zeros((1, len(self.columns)))
+        for name in (AGE_FIELD[1],) + tuple(_BY_API):
+            for column, value in self.field_columns(name, preferences.get(name)).items():
+                row[0, column] = value
+        return row
+
+    # --- batches ------------------------------------------------------------
+
+    def _set_one_hot(
+        self, matrix: np.ndarray, rows: np.ndarray, prefix: str, values: pd.Series
+    ) -> None:
+        # Look up each distinct value once, then gather by code.
+        codes, uniques = pd.factorize(values)
+        lookup = np.array([self._index.get(f"{prefix}_{u}", -1) for u in uniques] + [-1])
+        cols = lookup[codes]  # code -1 (missing) hits the trailing -1
+        known = cols >= 0
+        matrix[rows[known], cols[known]] = 1
+
+    def _encode_frame(self, frame: pd.DataFrame) -> np.ndarray:
+        frame = frame.reset_index(drop=True)
+        positions = np.arange(len(frame))
+        matrix = np.zeros((len(frame), len(self.columns)))
+
+        if AGE_COLUMN in self._index:
+            source = next((c for c in AGE_FIELD if c in frame.columns), None)
+            ages = frame[source].map(self.age_map) if source else pd.Series(np.nan, positions)
+            matrix[:, self._index[AGE_COLUMN]] = ages.fillna(self.default_age).to_numpy(float)
+
+        for column in self.categorical:
+            field = _BY_SURVEY.get(column)
+            if column in frame.columns:
+                values, rows = frame[column], positions
+            elif field is not None and field.api in frame.columns:
+                if field.multi:
+                    values = _split_multi(frame[field.api])
+                    rows = values.index.to_numpy()
+                else:
+                    values, rows = frame[field.api].fillna(""), positions
+            else:
+                continue
+            self._set_one_hot(matrix, rows, column, values)
+        return matrix
+
+    def encode(self, preferences: Preferences) -> np.ndarray:
+        """Raw (unscaled) feature rows, one per preference set or survey row.
+
+        Accepts API field names (``music_genre``) or survey column names
+        (``fav_music_genre``); values not in the layout are ignored.
+        """
+        if isinstance(preferences, dict):
+            return self._encode_one(preferences)
+        if not isinstance(preferences, pd.DataFrame):
+            preferences = pd.DataFrame(list(preferences))
+        return self._encode_frame(preferences)
+
+    # --- persistence ----------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": ENCODER_VERSION,
+            "columns": self.columns,
+            "categorical": self.categorical,
+            "age_map": self.age_map,
+            "default_age": self.default_age,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PreferenceEncoder":
+        if data.get("version") != ENCODER_VERSION:
+            raise ValueError(f"Unsupported encoder version {data.get('version')!r}")
+        return cls(data["columns"], data["categorical"], data["age_map"], data["default_age"])
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "PreferenceEncoder":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,164 @@
+"""On-disk cache of the training feature matrix, keyed by the survey's hash.
+
+Preprocessing the survey (age mapping, one-hot encoding, scaling) gives the
+same result every time for the same file, so ``train.py`` keeps it between
+runs: :class:`FeatureCache` stores the encoded features, the scaled matrix
+KMeans trains on and the scaler's fitted parameters as ``.npy`` files plus a
+``meta.json``. A later run with the same file and preprocessing config
+memory-maps the arrays instead of recomputing them.
+
+The key is the SHA-256 of the survey file's bytes and of the preprocessing
+config (age map, encoding, library versions); the directory holds one entry,
+replaced (and logged as invalidated) when either changes. ``meta.json`` is
+written last, so an interrupted save leaves no entry rather than a bad one.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+META_FILENAME = "meta.json"
+FEATURES_FILENAME = "features.npy"
+SCALED_FILENAME = "scaled.npy"
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def config_digest(config: Dict[str, Any]) -> str:
+    encoded = json.dumps({"cache_version": CACHE_VERSION, **config}, sort_keys=True)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _compact(features: pd.DataFrame) -> np.ndarray:
+    """The features as uint8 when that's exact (ages and 0/1 dummies), else float64."""
+    values = features.to_numpy(dtype=np.float64)
+    small = values.astype(np.uint8)
+    return small if np.array_equal(small, values) else values
+
+
+@dataclass
+class CachedFeatures:
+    features: pd.DataFrame
+    scaled: np.ndarray
+    scaler: StandardScaler
+
+    @property
+    def valid_features(self) -> List[str]:
+        return self.features.columns.tolist()
+
+
+class FeatureCache:
+    def __init__(self, directory: str, data_path: str, config: Dict[str, Any]) -> None:
+        self.directory = directory
+        self.data_hash = file_digest(data_path)
+        self.config_hash = config_digest(config)
+        # "hit", "miss" (no entry) or "invalidated" (entry for other data or config).
+        self.status: Optional[str] = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(META_FILENAME)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable feature cache metadata: {e}")
+            return {}
+
+    def load(self) -> Optional[CachedFeatures]:
+        """The cached features, memory-mapped, or None (and the reason logged)."""
+        meta = self._read_meta()
+        if meta is None:
+            self.status = "miss"
+            logger.info(f"Feature cache miss: no entry in {self.directory}")
+            return None
+        reasons = []
+        if meta.get("data_hash") != self.data_hash:
+            reasons.append("survey data changed")
+        if meta.get("config_hash") != self.config_hash:
+            reasons.append("preprocessing config changed")
+        if not reasons:
+            try:
+                return self._load_entry(meta)
+            except (OSError, ValueError, KeyError) as e:
+                reasons.append(f"entry unreadable ({e})")
+        self.status = "invalidated"
+        logger.info(f"Feature cache invalidated: {', '.join(reasons)}")
+        return None
+
+    def _load_entry(self, meta: Dict[str, Any]) -> CachedFeatures:
+        features = np.load(self._path(FEATURES_FILENAME), mmap_mode="r")
+        scaled = np.load(self._path(SCALED_FILENAME), mmap_mode="r")
+        columns = meta["valid_features"]
+        if features.shape != scaled.shape or features.shape != (meta["rows"], len(columns)):
+            raise ValueError(f"shapes {features.shape} and {scaled.shape} don't match metadata")
+
+        scaler = StandardScaler()
+        scaler.mean_ = np.array(meta["scaler"]["mean"])
+        scaler.var_ = np.array(meta["scaler"]["var"])
+        scaler.scale_ = np.array(meta["scaler"]["scale"])
+        scaler.n_samples_seen_ = meta["rows"]
+        scaler.n_features_in_ = len(columns)
+        scaler.feature_names_in_ = np.array(columns, dtype=object)
+
+        self.status = "hit"
+        logger.info(
+            f"Feature cache hit: memory-mapping {features.shape[0]} rows x "
+            f"{features.shape[1]} features from {self.directory}"
+        )
+        return CachedFeatures(
+            features=pd.DataFrame(features, columns=columns, copy=False),
+            scaled=scaled,
+            scaler=scaler,
+        )
+
+    def _save_array(self, name: str, values: np.ndarray) -> None:
+        tmp = self._path(f"{name}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, values)
+        os.replace(tmp, self._path(name))
+
+    def save(self, features: pd.DataFrame, scaled: np.ndarray, scaler: StandardScaler) -> None:
+        """Replace the entry with these preprocessing results."""
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            os.remove(self._path(META_FILENAME))
+        except FileNotFoundError:
+            pass
+        self._save_array(FEATURES_FILENAME, _compact(features))
+        self._save_array(SCALED_FILENAME, np.asarray(scaled, dtype=np.float64))
+        meta = {
+            "data_hash": self.data_hash,
+            "config_hash": self.config_hash,
+            "rows": len(features),
+            "valid_features": features.columns.tolist(),
+            "scaler": {
+                "mean": scaler.mean_.tolist(),
+                "var": scaler.var_.tolist(),
+                "scale": scaler.scale_.tolist(),
+            },
+        }
+        tmp = self._path(f"{META_FILENAME}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path(META_FILENAME))
+        logger.info(f"Feature cache written to {self.directory}")
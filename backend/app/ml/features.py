@@ -1,35 +1,79 @@
-"""Map user preferences to the scaled one-hot feature vector."""
+"""Map user preferences to the scaled feature vector (see app/ml/encoder.py)."""
 
-from typing import Any, Dict, List
+from typing import Any, Dict, Set
 
 import numpy as np
+import pandas as pd
 
+from app.ml.encoder import AGE_FIELD, AGE_MAP, FIELDS  # noqa: F401 (AGE_MAP re-exported)
 from app.ml.loader import ModelBundle
 
-AGE_MAP = {"18-24": 21, "25-34": 30, "35-44": 40, "45-54": 50, "55+": 60}
+# Every preference field that feeds the feature vector.
+ENCODED_FIELDS = (AGE_FIELD[1],) + tuple(field.api for field in FIELDS)
+_ENCODED = frozenset(ENCODED_FIELDS)
 
 
 def prepare_features(bundle: ModelBundle, preferences: Dict[str, Any]) -> np.ndarray:
     """Build the scaled feature vector for KMeans prediction."""
-    valid_features = bundle.valid_features
-    features: Dict[str, int] = {"age_numeric": AGE_MAP.get(preferences["age"], 30)}
-
-    def set_multi(base_name: str, values: List[str]) -> None:
-        for value in values:
-            if value and f"{base_name}_{value}" in valid_features:
-                features[f"{base_name}_{value}"] = 1
-
-    def set_single(base_name: str, value: str) -> None:
-        if value and f"{base_name}_{value}" in valid_features:
-            features[f"{base_name}_{value}"] = 1
-
-    set_multi("fav_music_genre", preferences["music_genre"])
-    set_multi("fav_pod_genre", preferences["podcast_content"])
-    set_single("pod_lis_frequency", preferences["podcast_frequency"])
-    set_single("preffered_pod_duration", preferences["podcast_duration"])
-    set_single("preffered_pod_format", preferences["podcast_format"])
-
-    feature_vector = np.array(
-        [[features.get(name, 0) for name in valid_features]], dtype=float
-    )
-    return bundle.scaler.transform(feature_vector)
+    return bundle.scaler.transform(bundle.encoder.encode(preferences))
+
+
+class IncrementalFeatures:
+    """One user's scaled feature row and segment distances, updatable per field.
+
+    Gives the same vector as :func:`prepare_features` and the same segment as
+    ``kmeans_model.predict``, but changing one preference only touches that
+    field's columns: the StandardScaler transform is applied per column and
+    the squared distance to each cluster centre is adjusted in place.
+    """
+
+    def __init__(self, bundle: ModelBundle, preferences: Dict[str, Any]) -> None:
+        self._encoder = bundle.encoder
+        n = len(self._encoder.columns)
+        scaler = bundle.scaler
+        # StandardScaler leaves mean_/scale_ as None when centring/scaling is off.
+        mean, scale = getattr(scaler, "mean_", None), getattr(scaler, "scale_", None)
+        self._mean = np.zeros(n) if mean is None else mean
+        self._scale = np.ones(n) if scale is None else scale
+        self._centers = bundle.kmeans_model.cluster_centers_
+        self.raw = np.zeros(n)
+        self.scaled = (self.raw - self._mean) / self._scale
+        self._distances = ((self.scaled - self._centers) ** 2).sum(axis=1)
+        # field -> {column: raw value} currently set by that field.
+        self._set: Dict[str, Dict[int, float]] = {}
+        for field in ENCODED_FIELDS:
+            self.update(field, preferences[field])
+
+    def update(self, field: str, value: Any) -> bool:
+        """Re-encode one preference field; return True if the row changed."""
+        if field not in _ENCODED:
+            return False
+        old = self._set.get(field, {})
+        new = self._encoder.field_columns(field, value)
+        self._set[field] = new
+        touched: Set[int] = {j for j in old.keys() | new.keys() if old.get(j) != new.get(j)}
+        for j in touched:
+            scaled = (new.get(j, 0.0) - self._mean[j]) / self._scale[j]
+            centers = self._centers[:, j]
+            self._distances += (scaled - centers) ** 2 - (self.scaled[j] - centers) ** 2
+            self.raw[j] = new.get(j, 0.0)
+            self.scaled[j] = scaled
+        return bool(touched)
+
+    @property
+    def segment(self) -> int:
+        return int(np.argmin(self._distances))
+
+    def vector(self) -> np.ndarray:
+        """The scaled row, shaped like :func:`prepare_features` output."""
+        return self.scaled.reshape(1, -1).copy()
+
+
+def prepare_feature_matrix(bundle: ModelBundle, frame: pd.DataFrame) -> np.ndarray:
+    """Batch version of :func:`prepare_features`: one scaled row per frame row.
+
+    ``frame`` uses the API's preference field names. Encoding is done per
+    column with pandas/NumPy ops rather than per row, so a 100k-row chunk
+    costs a handful of array operations.
+    """
+    return bundle.scaler.transform(bundle.encoder.encode(frame))
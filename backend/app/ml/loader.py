@@ -1,11 +1,15 @@
 """Load ML model artifacts, failing loudly if any are missing or corrupt."""
 
+import hashlib
 import json
 import logging
 import os
 import pickle
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+from app.ml.catalog import CATALOG_FILENAME, PodcastCatalog, load_catalog
+from app.ml.encoder import ENCODER_FILENAME, PreferenceEncoder
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +20,16 @@ class ModelBundle:
     scaler: Any
     valid_features: Any
     segment_profiles: Dict[str, Any]
+    # Optional: enables catalog-backed "fast" recommendations.
+    catalog: Optional[PodcastCatalog] = None
+    # Content hash of the artifact files; changes whenever any of them do.
+    version: str = ""
+    # Preferences -> feature rows; derived from valid_features when not saved.
+    encoder: Optional[PreferenceEncoder] = None
+
+    def __post_init__(self) -> None:
+        if self.encoder is None:
+            self.encoder = PreferenceEncoder.from_columns(self.valid_features)
 
 
 def load_model_bundle(model_dir: str) -> ModelBundle:
@@ -30,19 +44,42 @@ def load_model_bundle(model_dir: str) -> ModelBundle:
         "scaler": "scaler.pkl",
         "valid_features": "valid_features.pkl",
     }
+    digest = hashlib.sha256()
     loaded: Dict[str, Any] = {}
     for key, filename in pickles.items():
         path = os.path.join(model_dir, filename)
         if not os.path.exists(path):
             raise RuntimeError(f"Required model artifact missing: {path}")
         with open(path, "rb") as f:
-            loaded[key] = pickle.load(f)
+            data = f.read()
+        digest.update(data)
+        loaded[key] = pickle.loads(data)
 
     segment_path = os.path.join(model_dir, "segment_profiles.json")
     if not os.path.exists(segment_path):
         raise RuntimeError(f"Required model artifact missing: {segment_path}")
-    with open(segment_path, "r") as f:
-        segment_profiles = json.load(f)
+    with open(segment_path, "rb") as f:
+        data = f.read()
+    digest.update(data)
+    segment_profiles = json.loads(data)
+
+    encoder = None
+    encoder_path = os.path.join(model_dir, ENCODER_FILENAME)
+    if os.path.exists(encoder_path):
+        with open(encoder_path, "rb") as f:
+            data = f.read()
+        digest.update(data)
+        encoder = PreferenceEncoder.from_dict(json.loads(data))
+        if encoder.columns != list(loaded["valid_features"]):
+            raise RuntimeError(f"{encoder_path} does not match valid_features.pkl")
+    else:
+        logger.info(f"No {ENCODER_FILENAME}; encoding preferences from valid_features.")
+
+    catalog_path = os.path.join(model_dir, CATALOG_FILENAME)
+    if os.path.exists(catalog_path):
+        with open(catalog_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
 
     logger.info("Models and segment profiles loaded successfully.")
     return ModelBundle(
@@ -50,4 +87,7 @@ def load_model_bundle(model_dir: str) -> ModelBundle:
         scaler=loaded["scaler"],
         valid_features=loaded["valid_features"],
         segment_profiles=segment_profiles,
+        catalog=load_catalog(model_dir),
+        version=digest.hexdigest()[:16],
+        encoder=encoder,
     )
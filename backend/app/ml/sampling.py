@@ -0,0 +1,102 @@
+"""Train KMeans on a weighted sample of the survey and check it against full KMeans.
+
+For large surveys the segment structure is stable on a few thousand rows,
+so ``python train.py --sample coreset`` fits on a weighted sample instead of
+every row:
+
+* :func:`lightweight_coreset` draws rows with probability half uniform, half
+  proportional to their squared (standardized) distance from the mean, and
+  weights each by the inverse of that probability (Bachem et al., "Scalable
+  k-Means Clustering via Lightweight Coresets", 2018). Outliers that shape
+  the clusters are kept; the weighted cost approximates the full cost.
+* :func:`stratified_sample` samples each combination of some categorical
+  columns in proportion to its size (at least one row each), weighted by
+  stratum size over rows drawn.
+
+:func:`evaluate` then runs the full-data fit the sample replaces on the
+training rows and scores both models on held-out rows: the inertia ratio
+(sample model / full model, 1.0 is as good) and the adjusted Rand index of
+their labels (1.0 is identical segments). :func:`check_quality` raises
+:class:`SampleQualityError` when either misses its tolerance, so a bad sample
+never replaces the shipped artifacts.
+"""
+
+import time
+from typing import Any, Dict, Tuple
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.metrics import adjusted_rand_score
+
+Sample = Tuple[np.ndarray, np.ndarray]
+
+
+class SampleQualityError(RuntimeError):
+    """The sample-trained model is too far from the full-data model."""
+
+
+def lightweight_coreset(features: np.ndarray, size: int, rng: np.random.Generator) -> Sample:
+    """``size`` row indices drawn with replacement, and their weights."""
+    n = len(features)
+    mean, std = features.mean(axis=0), features.std(axis=0)
+    std[std == 0] = 1.0
+    distances = (((features - mean) / std) ** 2).sum(axis=1)
+    total = distances.sum()
+    q = 0.5 / n + (0.5 * distances / total if total > 0 else 0.5 / n)
+    rows = rng.choice(n, size=size, replace=True, p=q / q.sum())
+    return rows, 1.0 / (size * q[rows])
+
+
+def stratified_sample(strata: np.ndarray, size: int, rng: np.random.Generator) -> Sample:
+    """About ``size`` row indices, proportionally allocated over ``strata`` codes."""
+    n = len(strata)
+    order = np.argsort(strata, kind="stable")
+    codes, starts, counts = np.unique(strata[order], return_index=True, return_counts=True)
+    take = np.maximum(1, np.round(counts * size / n).astype(int))
+    rows, weights = [], []
+    for start, count, k in zip(starts, counts, np.minimum(take, counts)):
+        members = order[start : start + count]
+        rows.append(rng.choice(members, size=k, replace=False))
+        weights.append(np.full(k, count / k))
+    return np.concatenate(rows), np.concatenate(weights)
+
+
+def _inertia(model: KMeans, features: np.ndarray) -> float:
+    return float(-model.score(features))
+
+
+def evaluate(
+    sample_model: KMeans,
+    train_features: np.ndarray,
+    eval_features: np.ndarray,
+    random_state: int = 42,
+) -> Dict[str, Any]:
+    """Fit the full-data reference on ``train_features`` and compare on ``eval_features``."""
+    started = time.perf_counter()
+    full = KMeans(
+        n_clusters=sample_model.n_clusters, random_state=random_state, n_init=sample_model.n_init
+    ).fit(train_features)
+    full_seconds = time.perf_counter() - started
+    full_inertia = _inertia(full, eval_features)
+    sample_inertia = _inertia(sample_model, eval_features)
+    return {
+        "train_rows": len(train_features),
+        "eval_rows": len(eval_features),
+        "full_fit_seconds": round(full_seconds, 6),
+        "full_inertia": full_inertia,
+        "sample_inertia": sample_inertia,
+        "inertia_ratio": sample_inertia / full_inertia if full_inertia > 0 else 1.0,
+        "adjusted_rand_index": float(
+            adjusted_rand_score(full.predict(eval_features), sample_model.predict(eval_features))
+        ),
+    }
+
+
+def check_quality(quality: Dict[str, Any], max_inertia_ratio: float, min_ari: float) -> None:
+    problems = []
+    if quality["inertia_ratio"] > max_inertia_ratio:
+        problems.append(f"inertia ratio {quality['inertia_ratio']:.4f} > {max_inertia_ratio}")
+    if quality["adjusted_rand_index"] < min_ari:
+        problems.append(f"adjusted Rand index {quality['adjusted_rand_index']:.4f} < {min_ari}")
+    if problems:
+        raise SampleQualityError("Sample-trained model rejected: " + "; ".join(problems))
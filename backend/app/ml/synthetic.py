@@ -0,0 +1,210 @@
+"""Synthetic survey rows for scale-testing the training pipeline.
+
+:class:`SurveyModel` learns the survey schema's per-column distributions and
+the strongest pairwise dependencies, then streams any number of rows that
+look like ``Spotify_user_research.csv``:
+
+* :meth:`SurveyModel.fit` treats every column as categorical (missing values
+  are a category of their own), measures the mutual information of every
+  pair of columns from their joint counts, and keeps the maximum spanning
+  tree of those pairs (a Chow-Liu tree). Each column is then sampled from
+  ``P(column | parent column)``, which reproduces every marginal and the
+  tree's pairwise joints, and approximates the remaining pairs.
+* :meth:`SurveyModel.from_segment_profiles` builds a model from the shipped
+  ``segment_profiles.json`` when the raw survey isn't available: a hidden
+  segment column is the root and every profiled column depends on it, so
+  columns are correlated through the segment as in the real clusters. Only
+  each segment's top values are known, so the value sets are smaller.
+
+Models serialize to JSON (:meth:`SurveyModel.to_dict`), so a model learned
+from the raw survey can be shared without the survey itself. Sampling is
+vectorized per chunk; with the same seed and chunk size the output is
+identical.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.ml.batch_score import ChunkWriter
+
+logger = logging.getLogger(__name__)
+
+HIDDEN_SEGMENT = "__segment__"
+
+# Marker for missing values while fitting; written back out as empty cells.
+_MISSING = "\0missing"
+
+
+def _mutual_information(a: np.ndarray, b: np.ndarray, ka: int, kb: int) -> float:
+    joint = np.bincount(a * kb + b, minlength=ka * kb).reshape(ka, kb) / len(a)
+    outer = joint.sum(axis=1, keepdims=True) @ joint.sum(axis=0, keepdims=True)
+    nonzero = joint > 0
+    return float((joint[nonzero] * np.log(joint[nonzero] / outer[nonzero])).sum())
+
+
+class SurveyModel:
+    def __init__(self, columns: List[str], nodes: List[Dict[str, Any]]) -> None:
+        # Output column order, and nodes in sampling (parent-first) order:
+        # {"name", "values", "parent" (name or None), "probs" (rows per parent value)}.
+        self.columns = columns
+        self.nodes = nodes
+        self._cdfs = []
+        for node in nodes:
+            cdf = np.cumsum(node["probs"], axis=1)
+            cdf[:, -1] = 1.0  # guard against rounding leaving u >= cdf[-1]
+            self._cdfs.append(cdf)
+        self._values = {node["name"]: np.array(node["values"], dtype=object) for node in nodes}
+
+    @classmethod
+    def fit(cls, frame: pd.DataFrame, smoothing: float = 0.1) -> "SurveyModel":
+        """Learn marginals and a Chow-Liu dependency tree from survey rows."""
+        columns = list(frame.columns)
+        values: Dict[str, List[Any]] = {}
+        codes: Dict[str, np.ndarray] = {}
+        for name in columns:
+            column = frame[name].astype(object).where(frame[name].notna(), _MISSING)
+            column_codes, uniques = pd.factorize(column)
+            codes[name] = column_codes
+            values[name] = [None if v == _MISSING else v for v in uniques.tolist()]
+
+        # Maximum spanning tree over pairwise mutual information (Prim's),
+        # rooted at the column with the most values.
+        root = max(columns, key=lambda name: len(values[name]))
+        parents: Dict[str, Optional[str]] = {root: None}
+
+        def mi(a: str, b: str) -> float:
+            return _mutual_information(codes[a], codes[b], len(values[a]), len(values[b]))
+
+        best = {name: (mi(name, root), root) for name in columns if name != root}
+        order = [root]
+        while best:
+            name = max(best, key=lambda n: best[n][0])
+            parents[name] = best.pop(name)[1]
+            order.append(name)
+            for other in best:
+                score = mi(other, name)
+                if score > best[other][0]:
+                    best[other] = (score, name)
+
+        nodes = []
+        for name in order:
+            k = len(values[name])
+            parent = parents[name]
+            if parent is None:
+                counts = np.bincount(codes[name], minlength=k)[None, :].astype(float)
+            else:
+                kp = len(values[parent])
+                counts = np.bincount(codes[parent] * k + codes[name], minlength=kp * k)
+                counts = counts.reshape(kp, k).astype(float)
+            counts += smoothing
+            probs = counts / counts.sum(axis=1, keepdims=True)
+            nodes.append({"name": name, "values": values[name], "parent": parent, "probs": probs})
+        return cls(columns, nodes)
+
+    @classmethod
+    def from_segment_profiles(cls, profiles: Dict[str, Dict[str, Any]]) -> "SurveyModel":
+        """A segment mixture built from ``segment_profiles.json`` (top values per segment)."""
+        segments = sorted(profiles)
+        columns = sorted(
+            {
+                name
+                for profile in profiles.values()
+                for name, dist in profile.items()
+                if not {"mean", "median"} & set(dist)
+            }
+        )
+        nodes: List[Dict[str, Any]] = [
+            {
+                "name": HIDDEN_SEGMENT,
+                "values": segments,
+                "parent": None,
+                "probs": np.full((1, len(segments)), 1 / len(segments)),
+            }
+        ]
+        for name in columns:
+            dists = [profiles[segment].get(name, {}) for segment in segments]
+            column_values = sorted({value for dist in dists for value in dist})
+            probs = np.array([[dist.get(v, 0.0) for v in column_values] for dist in dists])
+            probs[probs.sum(axis=1) == 0] = 1.0
+            probs /= probs.sum(axis=1, keepdims=True)
+            nodes.append(
+                {"name": name, "values": column_values, "parent": HIDDEN_SEGMENT, "probs": probs}
+            )
+        return cls(columns, nodes)
+
+    def sample(self, rows: int, rng: np.random.Generator) -> pd.DataFrame:
+        """``rows`` synthetic survey rows."""
+        sampled: Dict[str, np.ndarray] = {}
+        for node, cdf in zip(self.nodes, self._cdfs):
+            draws = rng.random(rows)
+            parent = node["parent"]
+            if parent is None:
+                sampled[node["name"]] = np.searchsorted(cdf[0], draws, side="right")
+            else:
+                # Inverse-CDF per row, using the row of the parent's value.
+                sampled[node["name"]] = (cdf[sampled[parent]] <= draws[:, None]).sum(axis=1)
+        return pd.DataFrame({name: self._values[name][sampled[name]] for name in self.columns})
+
+    def generate(
+        self, rows: int, seed: int = 0, chunksize: int = 100_000
+    ) -> Iterator[pd.DataFrame]:
+        """Stream ``rows`` synthetic rows as DataFrames of at most ``chunksize``."""
+        rng = np.random.default_rng(seed)
+        for start in range(0, rows, chunksize):
+            yield self.sample(min(chunksize, rows - start), rng)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "columns": self.columns,
+            "nodes": [{**node, "probs": node["probs"].tolist()} for node in self.nodes],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SurveyModel":
+        nodes = [{**node, "probs": np.array(node["probs"], dtype=float)} for node in data["nodes"]]
+        return cls(data["columns"], nodes)
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "SurveyModel":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def survey_model(
+    data_path: Optional[str], model_dir: str, model_path: Optional[str] = None
+) -> SurveyModel:
+    """A saved model if ``model_path`` is given, else one fitted to the survey
+    CSV at ``data_path``, else the segment-profile mixture from ``model_dir``."""
+    if model_path:
+        return SurveyModel.load(model_path)
+    if data_path and os.path.exists(data_path):
+        logger.info(f"Fitting the synthetic survey model to {data_path}")
+        return SurveyModel.fit(pd.read_csv(data_path))
+    logger.warning(
+        f"Survey data not found at {data_path}; generating from the segment profiles "
+        f"in {model_dir} (top values per segment only)"
+    )
+    with open(os.path.join(model_dir, "segment_profiles.json")) as f:
+        return SurveyModel.from_segment_profiles(json.load(f))
+
+
+def write_synthetic(
+    model: SurveyModel, path: str, rows: int, seed: int = 0, chunksize: int = 100_000
+) -> int:
+    """Stream ``rows`` synthetic rows to a CSV or Parquet file; return the row count."""
+    writer = ChunkWriter(path)
+    try:
+        for chunk in model.generate(rows, seed=seed, chunksize=chunksize):
+            writer.write(chunk)
+    finally:
+        writer.close()
+    return rows
@@ -0,0 +1,63 @@
+"""Operator-only endpoints, guarded by the X-Admin-Token header."""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.profiling import profiler
+from app.core.security import require_admin
+from app.schemas.admin import HeavyHitter, HeavyHittersReport, ProfileRequest, ProfileStatus
+from app.services.heavy_hitters import heavy_hitters, merge_snapshots
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+
+@router.post("/profile", response_model=ProfileStatus, status_code=202)
+async def start_profile(body: ProfileRequest) -> ProfileStatus:
+    """Start sampling this worker; the folded-stack file lands in ``profile_dir``."""
+    try:
+        profiler.start(
+            settings.profile_dir,
+            requests=body.requests,
+            seconds=body.seconds,
+            interval_ms=body.interval_ms,
+            max_seconds=settings.profile_max_seconds,
+        )
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    return ProfileStatus(**profiler.status())
+
+
+@router.get("/profile", response_model=ProfileStatus)
+async def profile_status() -> ProfileStatus:
+    return ProfileStatus(**profiler.status())
+
+
+@router.delete("/profile", response_model=ProfileStatus)
+async def stop_profile() -> ProfileStatus:
+    profiler.stop()
+    return ProfileStatus(**profiler.status())
+
+
+@router.get("/heavy-hitters", response_model=HeavyHittersReport)
+async def get_heavy_hitters(n: int = Query(20, ge=1, le=100)) -> HeavyHittersReport:
+    """Top ``n`` preference combinations and the share of traffic they cover."""
+    # Snapshots from workers that stopped publishing are ignored.
+    max_age = 3 * settings.heavy_hitters_flush_seconds
+    merged, workers = await run_in_threadpool(
+        merge_snapshots, heavy_hitters.to_dict(), settings.heavy_hitters_dir, max_age
+    )
+    return HeavyHittersReport(
+        total=merged.total,
+        workers=workers,
+        coverage=round(merged.coverage(n), 4),
+        top=[
+            HeavyHitter(
+                preference_key=key,
+                segment=segment,
+                count=count,
+                preferences=merged.preferences.get(key),
+            )
+            for key, segment, count in merged.top_n(n)
+        ],
+    )
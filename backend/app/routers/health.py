@@ -1,6 +1,11 @@
 """Root and health-check endpoints."""
 
 from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from app.core.metrics import metrics
+from app.core.threads import thread_topology
+from app.services.usage import usage_tracker
 
 router = APIRouter()
 
@@ -12,9 +17,49 @@ async def root():
 
 @router.get("/health")
 async def health(request: Request):
-    """Report readiness. Suitable for the Render health check."""
+    """Report readiness. Suitable for the Render health check.
+
+    Answers 503 while the worker is shedding load, so a load balancer
+    routes around it until it recovers.
+    """
     models_loaded = getattr(request.app.state, "bundle", None) is not None
-    return {
+    monitor = request.app.state.saturation
+    saturation = monitor.snapshot()
+    body = {
         "status": "ok" if models_loaded else "degraded",
         "models_loaded": models_loaded,
+        "saturation": saturation,
     }
+    if saturation["saturated"]:
+        body["status"] = "saturated"
+        return JSONResponse(
+            body,
+            status_code=503,
+            headers={"Retry-After": str(monitor.retry_after_seconds)},
+        )
+    return body
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """In-process counters and gauges for this worker."""
+    return metrics.snapshot()
+
+
+@router.get("/metrics/jobs")
+async def get_job_metrics(request: Request):
+    """Job queue depth, queue wait and worker utilization for this worker."""
+    queue = request.app.state.job_queue
+    return queue.snapshot() if queue is not None else {"enabled": False}
+
+
+@router.get("/metrics/threads")
+async def get_thread_topology():
+    """Native thread pools, usable CPUs and threadpool size of this worker."""
+    return thread_topology()
+
+
+@router.get("/metrics/usage")
+async def get_usage():
+    """LLM tokens, cost and latency for this worker, by segment and model."""
+    return usage_tracker.snapshot()
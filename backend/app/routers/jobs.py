@@ -0,0 +1,105 @@
+"""Asynchronous recommendation jobs: enqueue, then poll, long-poll or get called back."""
+
+import asyncio
+import logging
+from typing import Any, Dict, Literal, Optional
+from urllib.parse import urlparse
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.limiter import limiter
+from app.ml.features import prepare_features
+from app.routers.recommend import result_key
+from app.schemas.fast_decode import PREFERENCES_OPENAPI, fast_preferences
+from app.schemas.recommendation import JobStatus
+from app.services.heavy_hitters import heavy_hitters
+from app.services.jobs import PRIORITIES, JobQueue
+from app.services.llm import generate_podcast_recommendations
+from app.services.prefkey import preference_key
+from app.services.usage import CallUsage
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/recommend/jobs")
+
+
+def _queue(request: Request) -> JobQueue:
+    queue = request.app.state.job_queue
+    if queue is None:
+        raise HTTPException(status_code=404, detail="Recommendation jobs are disabled")
+    return queue
+
+
+def _check_callback(url: str) -> None:
+    parsed = urlparse(url)
+    allowed = settings.job_callback_hosts_list
+    if parsed.scheme not in ("http", "https") or parsed.hostname not in allowed:
+        raise HTTPException(
+            status_code=422, detail="callback_url must be an http(s) URL on an allowed host"
+        )
+
+
+async def _recommend(app: FastAPI, prefs: Dict[str, Any]) -> Dict[str, Any]:
+    """The work /recommend does in LLM mode, run by a job worker."""
+    bundle = app.state.bundle
+    prefkey = preference_key(prefs)
+    user_features = prepare_features(bundle, prefs)
+    segment_id = int((await run_in_threadpool(bundle.kmeans_model.predict, user_features))[0])
+    user_segment = bundle.segment_profiles.get(f"Segment_{segment_id}", {})
+    heavy_hitters.add(prefkey, segment_id, prefs)
+    store = app.state.result_store
+    recommendations = await generate_podcast_recommendations(
+        app.state.llm_client,
+        prefs,
+        user_segment,
+        settings.groq_model,
+        store=store,
+        cache_key=result_key(bundle, prefkey) if store is not None else None,
+        usage=CallUsage(segment=segment_id),
+    )
+    return {"segment_profile": user_segment, "recommendations": recommendations}
+
+
+@router.post("", response_model=JobStatus, status_code=202, openapi_extra=PREFERENCES_OPENAPI)
+@limiter.limit(settings.rate_limit)
+async def submit_job(
+    request: Request,
+    response: Response,
+    prefs: Dict[str, Any] = Depends(fast_preferences),
+    priority: Literal["high", "normal", "low"] = Query("normal"),
+    callback_url: Optional[str] = Query(
+        None, description="POSTed the finished job (host must be in JOB_CALLBACK_HOSTS)"
+    ),
+) -> JobStatus:
+    queue = _queue(request)
+    if callback_url:
+        _check_callback(callback_url)
+    app = request.app
+    try:
+        job = queue.submit(lambda: _recommend(app, prefs), PRIORITIES[priority], callback_url)
+    except asyncio.QueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Job queue is full",
+            headers={"Retry-After": str(settings.shed_retry_after_seconds)},
+        ) from None
+    response.headers["Location"] = f"/recommend/jobs/{job.id}"
+    return JobStatus(**job.to_dict())
+
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job(
+    request: Request,
+    job_id: str,
+    wait: float = Query(
+        0, ge=0, description="Long-poll: seconds to wait for the job to finish (capped)"
+    ),
+) -> JobStatus:
+    queue = _queue(request)
+    job = queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    await queue.wait(job, min(wait, settings.job_max_wait_seconds))
+    return JobStatus(**job.to_dict())
@@ -1,42 +1,208 @@
 """Podcast recommendation endpoint."""
 
 import logging
+from contextlib import nullcontext
+from typing import Any, Dict, Literal, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from pydantic import ValidationError
+from slowapi.util import get_remote_address
 from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
 from app.core.limiter import limiter
-from app.ml.features import prepare_features
-from app.schemas.recommendation import RecommendationResponse, UserPreferences
-from app.services.llm import generate_podcast_recommendations
+from app.core.negotiation import (
+    BINARY_MEDIA_TYPES,
+    BINARY_RESPONSES,
+    choose_media_type,
+    encode,
+    encode_map,
+)
+from app.core.profiling import profiler
+from app.ml.features import ENCODED_FIELDS, IncrementalFeatures, prepare_features
+from app.ml.loader import ModelBundle
+from app.schemas.fast_decode import PREFERENCES_OPENAPI, fast_preferences
+from app.schemas.recommendation import (
+    PrefetchResponse,
+    RecommendationResponse,
+    UserPreferences,
+    coerce_list,
+)
+from app.services.heavy_hitters import heavy_hitters
+from app.services.llm import generate_podcast_recommendations, normalize_recommendations
+from app.services.prefetch import Speculation
+from app.services.prefkey import preference_key
+from app.services.usage import CallUsage, usage_tracker
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.post("/recommend", response_model=RecommendationResponse)
+# Segment profiles pre-encoded per (bundle version, segment name, media type).
+_profile_cache: Dict[Tuple[str, str, str], bytes] = {}
+
+
+def _encoded_profile(bundle: ModelBundle, name: str, media_type: str) -> bytes:
+    key = (bundle.version, name, media_type)
+    encoded = _profile_cache.get(key)
+    if encoded is None:
+        if any(version != bundle.version for version, _, _ in _profile_cache):
+            _profile_cache.clear()
+        encoded = encode(media_type, bundle.segment_profiles.get(name, {}))
+        _profile_cache[key] = encoded
+    return encoded
+
+
+def result_key(bundle: ModelBundle, prefkey: str) -> str:
+    """Store key for an LLM result: model, bundle version and canonical preferences."""
+    return f"{settings.groq_model}:{bundle.version}:{prefkey}"
+
+
+def _claim_prefetch(request: Request, response: Response, prefkey: str) -> Optional[Speculation]:
+    """The speculation named by X-Prefetch-Token, if it matches these preferences."""
+    token = request.headers.get("x-prefetch-token")
+    registry = request.app.state.prefetch
+    if not token or registry is None:
+        return None
+    speculation = registry.claim(token, get_remote_address(request), prefkey)
+    response.headers["X-Prefetch"] = "hit" if speculation is not None else "miss"
+    return speculation
+
+
+@router.post("/recommend/prefetch", response_model=PrefetchResponse)
+@limiter.limit(settings.prefetch_rate_limit)
+async def prefetch_recommendations(
+    request: Request, preferences: Dict[str, Any] = Body(...)
+) -> PrefetchResponse:
+    """Compute the segment from partial preferences and, once they are
+    complete, start the LLM call speculatively under a short-lived token."""
+    registry = request.app.state.prefetch
+    if registry is None:
+        raise HTTPException(status_code=404, detail="Prefetch is disabled")
+    bundle = request.app.state.bundle
+    partial = {
+        name: coerce_list(value) if name in ("music_genre", "podcast_content") else value
+        for name, value in preferences.items()
+        if name in UserPreferences.model_fields
+    }
+    missing = [
+        name
+        for name, field in UserPreferences.model_fields.items()
+        if field.is_required() and not partial.get(name)
+    ]
+    segment = None
+    if all(partial.get(name) for name in ENCODED_FIELDS):
+        segment = IncrementalFeatures(bundle, partial).segment
+    try:
+        prefs = UserPreferences(**partial).model_dump()
+    except ValidationError:
+        return PrefetchResponse(segment=segment, missing=missing)
+    if segment is None:
+        segment = IncrementalFeatures(bundle, prefs).segment
+
+    client_id = get_remote_address(request)
+    prefkey = preference_key(prefs)
+    token = registry.find(client_id, prefkey)
+    client = request.app.state.llm_client
+    if token is None and client is not None and not usage_tracker.over_budget():
+        store = request.app.state.result_store
+        usage = CallUsage(segment=segment)
+        work = generate_podcast_recommendations(
+            client,
+            prefs,
+            bundle.segment_profiles.get(f"Segment_{segment}", {}),
+            settings.groq_model,
+            store=store,
+            cache_key=result_key(bundle, prefkey) if store is not None else None,
+            usage=usage,
+        )
+        token = registry.speculate(client_id, prefkey, work, usage)
+    return PrefetchResponse(
+        segment=segment,
+        missing=missing,
+        token=token,
+        expires_in=registry.ttl_seconds if token else None,
+    )
+
+
+@router.post(
+    "/recommend",
+    response_model=RecommendationResponse,
+    responses=BINARY_RESPONSES,
+    openapi_extra=PREFERENCES_OPENAPI,
+)
 @limiter.limit(settings.rate_limit)
 async def recommend_podcasts(
-    preferences: UserPreferences, request: Request
+    request: Request,
+    response: Response,
+    prefs: Dict[str, Any] = Depends(fast_preferences),
+    mode: Literal["llm", "fast"] = Query(
+        "llm", description="`fast` ranks the local podcast catalog instead of calling the LLM."
+    ),
 ) -> RecommendationResponse:
     bundle = request.app.state.bundle
     client = request.app.state.llm_client
-    prefs = preferences.model_dump()
-    logger.info(f"Received recommendation request for age={prefs['age']}")
+    logger.info(f"Received recommendation request for age={prefs['age']} (mode={mode})")
+    if mode == "fast" and bundle.catalog is None:
+        raise HTTPException(status_code=503, detail="Podcast catalog not loaded")
+    prefkey = preference_key(prefs)
+    if "return-cache-key" in request.headers.get("prefer", ""):
+        # Opt-in (RFC 7240 Prefer): a key identifying this result, so clients
+        # and CDNs can reuse it for the same preferences under the same model.
+        # LLM results also depend on which Groq model produced them.
+        source = f"{mode}:{settings.groq_model}" if mode == "llm" else mode
+        response.headers["X-Cache-Key"] = f"{bundle.version}:{source}:{prefkey}"
+        response.headers["Preference-Applied"] = "return-cache-key"
+    # JSON by default; MessagePack or CBOR when the Accept header asks for it.
+    media_type = choose_media_type(request.headers.get("accept"))
+    response.headers.add_vary_header("Accept")
+    capture = request.app.state.traffic_capture
+    captured = capture.track(prefs, mode, media_type) if capture is not None else nullcontext()
 
-    try:
-        user_features = prepare_features(bundle, prefs)
-        segment_id = (await run_in_threadpool(bundle.kmeans_model.predict, user_features))[0]
-        user_segment = bundle.segment_profiles.get(f"Segment_{segment_id}", {})
+    with profiler.track_request(), captured:
+        try:
+            user_features = prepare_features(bundle, prefs)
+            segment_id = (await run_in_threadpool(bundle.kmeans_model.predict, user_features))[0]
+            segment_name = f"Segment_{segment_id}"
+            user_segment = bundle.segment_profiles.get(segment_name, {})
+            heavy_hitters.add(prefkey, int(segment_id), prefs)
 
-        recommendations = await generate_podcast_recommendations(
-            client, prefs, user_segment, settings.groq_model
-        )
-        return RecommendationResponse(
-            segment_profile=user_segment, recommendations=recommendations
-        )
-    except Exception as exc:  # noqa: BLE001 - surface a clean 500 to the client
-        logger.exception("Error generating recommendations")
-        raise HTTPException(status_code=500, detail="Error generating recommendations") from exc
+            if mode == "fast":
+                recommendations = normalize_recommendations(
+                    bundle.catalog.recommend(prefs, user_segment), prefs
+                )
+            else:
+                speculation = _claim_prefetch(request, response, prefkey)
+                if speculation is not None:
+                    usage = speculation.usage
+                    recommendations = await speculation.task
+                else:
+                    store = request.app.state.result_store
+                    usage = CallUsage(segment=int(segment_id))
+                    recommendations = await generate_podcast_recommendations(
+                        client,
+                        prefs,
+                        user_segment,
+                        settings.groq_model,
+                        store=store,
+                        cache_key=result_key(bundle, prefkey) if store is not None else None,
+                        usage=usage,
+                    )
+                if settings.llm_usage_header:
+                    response.headers["X-LLM-Usage"] = usage.header_value()
+            if media_type in BINARY_MEDIA_TYPES:
+                # Recommendations are already normalized to the schema, so
+                # encode them directly and splice in the pre-encoded profile.
+                body = encode_map(
+                    media_type,
+                    {"recommendations": recommendations},
+                    {"segment_profile": _encoded_profile(bundle, segment_name, media_type)},
+                )
+                return Response(body, media_type=media_type, headers=dict(response.headers))
+            return RecommendationResponse(
+                segment_profile=user_segment, recommendations=recommendations
+            )
+        except Exception as exc:  # noqa: BLE001 - surface a clean 500 to the client
+            logger.exception("Error generating recommendations")
+            raise HTTPException(status_code=500, detail="Error generating recommendations") from exc
@@ -0,0 +1,58 @@
+"""Read-only access to the KMeans segment profiles, with HTTP caching.
+
+Profiles only change when a new model bundle is deployed, so responses carry
+a strong ETag derived from the bundle's content hash and can be revalidated
+with If-None-Match for a bodiless 304.
+"""
+
+import json
+from typing import Dict
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from app.core.config import settings
+from app.core.http_cache import conditional_response
+from app.ml.loader import ModelBundle
+
+router = APIRouter()
+
+# Serialized payloads per bundle version: (list body, {segment id: body}).
+_payload_cache: Dict[str, tuple] = {}
+
+
+def _payloads(bundle: ModelBundle) -> tuple:
+    cached = _payload_cache.get(bundle.version)
+    if cached is None:
+        profiles = bundle.segment_profiles
+        cached = (
+            json.dumps({"version": bundle.version, "segments": profiles}).encode(),
+            {name: json.dumps(profile).encode() for name, profile in profiles.items()},
+        )
+        _payload_cache.clear()
+        _payload_cache[bundle.version] = cached
+    return cached
+
+
+def _cache_control() -> str:
+    return f"public, max-age={settings.segments_max_age}"
+
+
+@router.get("/segments")
+async def list_segments(request: Request) -> Response:
+    """All segment profiles, keyed by segment name (e.g. ``Segment_0``)."""
+    bundle = request.app.state.bundle
+    body, _ = _payloads(bundle)
+    return conditional_response(request, body, f'"{bundle.version}"', _cache_control())
+
+
+@router.get("/segments/{segment_id}")
+async def get_segment(segment_id: int, request: Request) -> Response:
+    """One segment's profile."""
+    bundle = request.app.state.bundle
+    _, per_segment = _payloads(bundle)
+    body = per_segment.get(f"Segment_{segment_id}")
+    if body is None:
+        raise HTTPException(status_code=404, detail=f"Unknown segment: {segment_id}")
+    return conditional_response(
+        request, body, f'"{bundle.version}-{segment_id}"', _cache_control()
+    )
@@ -0,0 +1,117 @@
+"""WebSocket session for iterative refinement of recommendations.
+
+Protocol (JSON text frames):
+
+* client ``{"type": "start", "preferences": {...}}`` — the /recommend body;
+  answered with a full set of recommendations.
+* client ``{"type": "update", "changes": {"podcast_duration": "..."}}`` —
+  only the changed fields; the segment is re-derived incrementally and Groq
+  is asked to replace just the items that no longer fit.
+* server ``{"type": "recommendations", "segment", "segment_profile",
+  "recommendations", "changed", "replaced"}`` or ``{"type": "error",
+  "detail"}``.
+
+Each start/update counts against a per-client limit equal to, but kept
+separate from, the /recommend one (RATE_LIMIT). Connections from origins
+outside ALLOWED_ORIGINS are refused, and idle sessions are closed after
+SESSION_IDLE_TIMEOUT_SECONDS.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from limits import parse
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.core.limiter import limiter
+from app.routers.recommend import result_key
+from app.services.heavy_hitters import heavy_hitters
+from app.services.prefkey import preference_key
+from app.services.session import RecommendationSession, validate_preferences
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _error(detail: Any) -> Dict[str, Any]:
+    return {"type": "error", "detail": detail}
+
+
+def _rate_limited(websocket: WebSocket) -> bool:
+    if not limiter.enabled:
+        return False
+    host = websocket.client.host if websocket.client else "unknown"
+    return not limiter.limiter.hit(parse(settings.rate_limit), "ws-session", host)
+
+
+async def _handle(
+    websocket: WebSocket, session: RecommendationSession, message: Any
+) -> Dict[str, Any]:
+    kind = message.get("type") if isinstance(message, dict) else None
+    if kind not in ("start", "update"):
+        return _error('Expected a message with "type" "start" or "update"')
+    if kind == "update" and not session.started:
+        return _error('Send a "start" message first')
+    if _rate_limited(websocket):
+        return _error(f"Rate limit exceeded: {settings.rate_limit}")
+
+    try:
+        if kind == "start":
+            prefs = validate_preferences(message.get("preferences") or {})
+            store = websocket.app.state.result_store
+            prefkey = preference_key(prefs)
+            cache_key = result_key(session.bundle, prefkey) if store is not None else None
+            result = await session.start(prefs, store=store, cache_key=cache_key)
+        else:
+            changes = message.get("changes")
+            if not isinstance(changes, dict):
+                return _error('"changes" must be an object of changed fields')
+            result = await session.update(changes)
+            if not result["changed"]:
+                return result
+            prefkey = preference_key(session.preferences)
+    except ValidationError as exc:
+        return _error(exc.errors(include_url=False, include_context=False))
+    heavy_hitters.add(prefkey, session.segment, session.preferences)
+    if settings.llm_usage_header and session.last_usage is not None:
+        result["usage"] = session.last_usage.header_value()
+    return result
+
+
+@router.websocket("/ws/session")
+async def recommendation_session(websocket: WebSocket) -> None:
+    origin = websocket.headers.get("origin")
+    if origin is not None and origin not in settings.allowed_origins_list:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    session = RecommendationSession(
+        websocket.app.state.bundle, websocket.app.state.llm_client, settings.groq_model
+    )
+    try:
+        while True:
+            try:
+                text = await asyncio.wait_for(
+                    websocket.receive_text(), settings.session_idle_timeout_seconds
+                )
+            except asyncio.TimeoutError:
+                await websocket.close(code=status.WS_1000_NORMAL_CLOSURE, reason="idle timeout")
+                return
+            try:
+                message = json.loads(text)
+            except json.JSONDecodeError:
+                await websocket.send_json(_error("Messages must be JSON"))
+                continue
+            try:
+                reply = await _handle(websocket, session, message)
+            except Exception:  # noqa: BLE001 - report and keep the session open
+                logger.exception("Error in recommendation session")
+                reply = _error("Error generating recommendations")
+            await websocket.send_json(reply)
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,44 @@
+"""Request/response schemas for the operator-only /admin endpoints."""
+
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+
+class ProfileRequest(BaseModel):
+    """Capture either the next ``requests`` /recommend calls or ``seconds`` of wall time."""
+
+    requests: Optional[int] = Field(None, ge=1, le=10_000)
+    seconds: Optional[float] = Field(None, gt=0, le=600)
+    interval_ms: float = Field(5.0, ge=1, le=1000)
+
+    @model_validator(mode="after")
+    def exactly_one_window(self) -> "ProfileRequest":
+        if (self.requests is None) == (self.seconds is None):
+            raise ValueError("specify exactly one of requests or seconds")
+        return self
+
+
+class ProfileStatus(BaseModel):
+    running: bool
+    samples: int
+    remaining_requests: Optional[int]
+    output: Optional[str]
+
+
+class HeavyHitter(BaseModel):
+    preference_key: str
+    segment: int
+    count: int
+    preferences: Optional[Dict[str, Any]] = Field(
+        None, description="The canonical preferences behind preference_key"
+    )
+
+
+class HeavyHittersReport(BaseModel):
+    """Most requested (preferences, segment) combinations across reporting workers."""
+
+    total: int
+    workers: int
+    coverage: float = Field(description="Estimated share of requests in the top entries")
+    top: List[HeavyHitter]
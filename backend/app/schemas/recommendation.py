@@ -1,11 +1,35 @@
 """Request/response schemas for the recommendation endpoint."""
 
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
 
+def coerce_list(v: Any) -> Any:
+    """Accept a JSON string or comma-separated string as a list.
+
+    Shared by the pydantic validator and the fast decoder so both normalize
+    identically.
+    """
+    if v is None:
+        return []
+    if isinstance(v, str):
+        # Only a string that starts like an array can decode to a list, so
+        # skip the json.loads attempt for the common "Pop" / "Pop, Rock" case.
+        if v.lstrip().startswith("["):
+            try:
+                parsed = json.loads(v)
+                if isinstance(parsed, list):
+                    return parsed
+            except json.JSONDecodeError:
+                pass
+        if "," in v:
+            return [item.strip() for item in v.split(",") if item.strip()]
+        return [v] if v else []
+    return v
+
+
 class UserPreferences(BaseModel):
     """Request body for /recommend.
 
@@ -34,19 +58,7 @@ class UserPreferences(BaseModel):
     @classmethod
     def coerce_to_list(cls, v: Any) -> Any:
         """Accept a JSON string or comma-separated string as a list."""
-        if v is None:
-            return []
-        if isinstance(v, str):
-            try:
-                parsed = json.loads(v)
-                if isinstance(parsed, list):
-                    return parsed
-            except json.JSONDecodeError:
-                pass
-            if "," in v:
-                return [item.strip() for item in v.split(",") if item.strip()]
-            return [v] if v else []
-        return v
+        return coerce_list(v)
 
     @field_validator("music_genre", "podcast_content")
     @classmethod
@@ -71,3 +83,25 @@ class Recommendation(BaseModel):
 class RecommendationResponse(BaseModel):
     segment_profile: Dict[str, Any]
     recommendations: List[Recommendation]
+
+
+class PrefetchResponse(BaseModel):
+    segment: Optional[int] = Field(
+        None, description="Segment, once every segment-matching field is known"
+    )
+    missing: List[str] = Field(..., description="Required fields not provided yet")
+    token: Optional[str] = Field(
+        None, description="Send as X-Prefetch-Token with POST /recommend to reuse the speculation"
+    )
+    expires_in: Optional[float] = Field(None, description="Seconds the token stays valid")
+
+
+class JobStatus(BaseModel):
+    id: str
+    status: Literal["queued", "running", "done", "failed"]
+    priority: int
+    created_at: float
+    queue_wait_ms: Optional[float] = None
+    run_ms: Optional[float] = None
+    result: Optional[RecommendationResponse] = None
+    error: Optional[str] = None
@@ -0,0 +1,346 @@
+"""Preference-key affinity routing across API replicas.
+
+Each replica keeps its own in-memory result cache, heavy-hitter sketch and
+prefetch registry, so with random load balancing a preference combination
+warms every replica before any of them serves it from memory. The reference
+front proxy here (run with ``python proxy.py``) sends every request for the
+same combination to the same replica instead:
+
+* :class:`HashRing` places each replica at ``vnodes`` points on a 64-bit
+  ring. A request's canonical preference key
+  (:func:`app.services.prefkey.preference_key`) is hashed onto the ring and
+  served by the next replica clockwise, so adding or removing a replica only
+  moves the keys next to its points.
+* :meth:`AffinityRouter.candidates` bounds the load (Mirrokni et al.,
+  "Consistent Hashing with Bounded Loads", 2018): a replica already serving
+  more than ``load_factor`` times the average in-flight requests is passed
+  over for the next one on the ring, so a hot combination spills instead of
+  queueing behind itself.
+* Failover: a replica that refuses the connection, or sheds the request with
+  ``503``, is skipped for ``cooldown_seconds`` and the request is retried on
+  the next candidate. Both failures happen before the replica does any work,
+  so retrying is safe for every method. Failures after that (a read timeout,
+  a dropped connection) may have run the request, so they aren't retried:
+  the client gets ``504`` or ``502``.
+
+The proxy appends the client's address to ``X-Forwarded-For``. Replicas key
+their rate limits, prefetch caps and session limits on the client address,
+so they must take it from that header: run them with uvicorn's
+``--forwarded-allow-ips`` set to the proxy's address (the default trusts only
+``127.0.0.1``, which covers a proxy on the same host). Otherwise every user
+shares the proxy's rate-limit bucket.
+
+Requests without preferences in the body (or with an invalid body, which the
+replica will reject) go to the least-loaded replica. ``GET
+/recommend/jobs/{id}`` follows the job to the replica that accepted it.
+WebSocket sessions are not proxied; route ``/ws/session`` with the load
+balancer's sticky sessions.
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import httpx
+from starlette.types import Receive, Scope, Send
+
+from app.core.metrics import metrics
+from app.schemas.fast_decode import decode_preferences
+from app.services.prefkey import preference_key
+
+logger = logging.getLogger(__name__)
+
+# POST bodies on these paths are preferences; they're routed by key.
+KEYED_PATHS = frozenset({"/recommend", "/recommend/prefetch", "/recommend/jobs"})
+JOBS_PREFIX = "/recommend/jobs/"
+STATUS_PATH = "/proxy/status"
+
+# Hop-by-hop headers (RFC 9110 section 7.6.1) aren't forwarded either way.
+_HOP_BY_HOP = frozenset(
+    {
+        b"connection",
+        b"keep-alive",
+        b"proxy-authenticate",
+        b"proxy-authorization",
+        b"te",
+        b"trailer",
+        b"transfer-encoding",
+        b"upgrade",
+    }
+)
+# Set by httpx (or, for X-Forwarded-For, by the proxy) for the upstream request.
+_REQUEST_ONLY = _HOP_BY_HOP | {b"host", b"content-length", b"x-forwarded-for"}
+
+
+def _point(label: str) -> int:
+    return int.from_bytes(hashlib.blake2b(label.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, nodes: Sequence[str], vnodes: int = 160) -> None:
+        points = sorted((_point(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+        self.size = len(set(nodes))
+
+    def walk(self, key: str) -> Iterator[str]:
+        """Every node once, clockwise from ``key``'s point on the ring."""
+        start = bisect.bisect(self._hashes, _point(key))
+        seen = set()
+        for i in range(len(self._nodes)):
+            node = self._nodes[(start + i) % len(self._nodes)]
+            if node not in seen:
+                seen.add(node)
+                yield node
+                if len(seen) == self.size:
+                    return
+
+
+class AffinityRouter:
+    def __init__(
+        self,
+        upstreams: Sequence[str],
+        strategy: str = "affinity",
+        load_factor: float = 1.25,
+        vnodes: int = 160,
+        cooldown_seconds: float = 5.0,
+    ) -> None:
+        if strategy not in ("affinity", "random"):
+            raise ValueError(f"Unknown routing strategy {strategy!r}")
+        self.upstreams = list(upstreams)
+        self.strategy = strategy
+        self.load_factor = load_factor
+        self.cooldown_seconds = cooldown_seconds
+        self.ring = HashRing(self.upstreams, vnodes)
+        self.in_flight = {node: 0 for node in self.upstreams}
+        self.down_until = {node: 0.0 for node in self.upstreams}
+
+    def healthy(self) -> List[str]:
+        now = time.monotonic()
+        up = [node for node in self.upstreams if self.down_until[node] <= now]
+        # With every replica cooling down, trying one beats failing outright.
+        return up or list(self.upstreams)
+
+    def capacity(self, healthy: int) -> int:
+        """Most in-flight requests one replica may hold before keys spill over."""
+        total = sum(self.in_flight.values()) + 1
+        return math.ceil(self.load_factor * total / healthy)
+
+    def candidates(self, key: Optional[str]) -> List[str]:
+        """Replicas to try for ``key``, in order."""
+        healthy = self.healthy()
+        if self.strategy == "random":
+            return random.sample(healthy, len(healthy))
+        if key is None:
+            metrics.incr("affinity.unkeyed")
+            return sorted(healthy, key=lambda node: self.in_flight[node])
+        up = set(healthy)
+        ring = [node for node in self.ring.walk(key) if node in up]
+        cap = self.capacity(len(ring))
+        for i, node in enumerate(ring):
+            if self.in_flight[node] < cap:
+                metrics.incr("affinity.primary" if i == 0 else "affinity.spilled")
+                return ring[i:] + ring[:i]
+        return ring
+
+    def mark_down(self, node: str, seconds: Optional[float] = None) -> None:
+        cooldown = self.cooldown_seconds if seconds is None else seconds
+        self.down_until[node] = time.monotonic() + cooldown
+        metrics.incr("affinity.failover")
+        logger.warning(f"Upstream {node} unavailable; skipping it for {cooldown:g}s")
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "strategy": self.strategy,
+            "load_factor": self.load_factor,
+            "upstreams": {
+                node: {
+                    "in_flight": self.in_flight[node],
+                    "down_for": round(max(0.0, self.down_until[node] - now), 3),
+                }
+                for node in self.upstreams
+            },
+        }
+
+
+def routing_key(method: str, path: str, body: bytes) -> Optional[str]:
+    """The preference key of a keyed request, or None."""
+    if method != "POST" or path not in KEYED_PATHS:
+        return None
+    try:
+        return preference_key(decode_preferences(body))
+    except ValueError:  # malformed JSON or invalid preferences
+        return None
+
+
+class AffinityProxy:
+    """ASGI app forwarding every HTTP request to one of the router's upstreams."""
+
+    def __init__(
+        self,
+        router: AffinityRouter,
+        client: Optional[httpx.AsyncClient] = None,
+        remembered_jobs: int = 10_000,
+    ) -> None:
+        self.router = router
+        self.client = client or httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0, connect=2.0),
+            # Expire idle connections before uvicorn's 5s keep-alive timeout
+            # does, so a request isn't sent on a connection being closed.
+            limits=httpx.Limits(
+                max_connections=1000, max_keepalive_connections=200, keepalive_expiry=4.0
+            ),
+        )
+        self.remembered_jobs = remembered_jobs
+        self._jobs: "OrderedDict[str, str]" = OrderedDict()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._handle(scope, receive, send)
+        else:  # websocket
+            await send({"type": "websocket.close", "code": 1011})
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.client.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["path"] == STATUS_PATH:
+            body = {**self.router.snapshot(), "metrics": metrics.snapshot()["counters"]}
+            await self._respond(send, 200, body)
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        method, path = scope["method"], scope["path"]
+        candidates = self._job_upstream(path) or self.router.candidates(
+            routing_key(method, path, body)
+        )
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in scope["headers"]
+            if name.lower() not in _REQUEST_ONLY
+        ]
+        # One header, client last: uvicorn reads only one X-Forwarded-For and
+        # takes the rightmost address it doesn't trust.
+        forwarded = [
+            value.decode("latin-1")
+            for name, value in scope["headers"]
+            if name.lower() == b"x-forwarded-for"
+        ]
+        if scope.get("client"):
+            forwarded.append(scope["client"][0])
+        if forwarded:
+            headers.append(("x-forwarded-for", ", ".join(forwarded)))
+        target = (scope.get("raw_path") or path.encode()).decode("latin-1")
+        if scope["query_string"]:
+            target += "?" + scope["query_string"].decode("latin-1")
+
+        for i, node in enumerate(candidates):
+            last = i == len(candidates) - 1
+            request = self.client.build_request(
+                method, node + target, headers=headers, content=body
+            )
+            self.router.in_flight[node] += 1
+            try:
+                try:
+                    response = await self.client.send(request, stream=True)
+                except (httpx.ConnectError, httpx.ConnectTimeout) as exc:
+                    self.router.mark_down(node)
+                    if last:
+                        await self._respond(send, 502, {"detail": f"No upstream available: {exc}"})
+                        return
+                    continue
+                except httpx.TimeoutException as exc:
+                    # The replica may be running it; don't run it twice.
+                    metrics.incr("affinity.upstream_timeout")
+                    logger.warning(f"Upstream {node} timed out: {exc!r}")
+                    await self._respond(send, 504, {"detail": "Upstream timed out"})
+                    return
+                except httpx.TransportError as exc:
+                    metrics.incr("affinity.upstream_error")
+                    logger.warning(f"Upstream {node} failed: {exc!r}")
+                    await self._respond(send, 502, {"detail": "Upstream connection failed"})
+                    return
+                try:
+                    if response.status_code == 503 and not last:
+                        # Shed at the door: nothing ran, so another replica may take it.
+                        retry_after = response.headers.get("retry-after", "")
+                        self.router.mark_down(
+                            node, float(retry_after) if retry_after.isdigit() else None
+                        )
+                        continue
+                    self._remember_job(method, path, response, node)
+                    await self._forward(send, response, node)
+                    return
+                finally:
+                    await response.aclose()
+            finally:
+                self.router.in_flight[node] -= 1
+
+    def _job_upstream(self, path: str) -> Optional[List[str]]:
+        if not path.startswith(JOBS_PREFIX):
+            return None
+        node = self._jobs.get(path[len(JOBS_PREFIX) :])
+        return [node] if node is not None else None
+
+    def _remember_job(self, method: str, path: str, response: httpx.Response, node: str) -> None:
+        location = response.headers.get("location", "")
+        if method == "POST" and path == "/recommend/jobs" and location.startswith(JOBS_PREFIX):
+            self._jobs[location[len(JOBS_PREFIX) :]] = node
+            while len(self._jobs) > self.remembered_jobs:
+                self._jobs.popitem(last=False)
+
+    async def _forward(self, send: Send, response: httpx.Response, node: str) -> None:
+        headers = [
+            (name, value)
+            for name, value in response.headers.raw
+            if name.lower() not in _HOP_BY_HOP
+        ]
+        headers.append((b"x-upstream", node.encode("latin-1")))
+        await send(
+            {"type": "http.response.start", "status": response.status_code, "headers": headers}
+        )
+        # Raw bytes: a compressed body stays compressed, matching its headers.
+        async for chunk in response.aiter_raw():
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    @staticmethod
+    async def _respond(send: Send, status: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(payload)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": payload})
+
+
+def create_proxy(upstreams: Sequence[str], **router_options: Any) -> AffinityProxy:
+    """A proxy over ``upstreams`` (base URLs such as ``http://127.0.0.1:8001``)."""
+    return AffinityProxy(AffinityRouter([u.rstrip("/") for u in upstreams], **router_options))
@@ -0,0 +1,131 @@
+"""Sampled capture of anonymized /recommend traffic for replay.
+
+When enabled, a ``sample_rate`` fraction of ``/recommend`` requests is
+appended to a JSON-lines file: arrival time, query mode, negotiated media
+type, response status, handler latency and the normalized request body.
+The only free-text field, ``podcasts_enjoyed``, is replaced by a keyed hash
+(HMAC-SHA256 under a random key each :class:`TrafficCapture` generates and
+keeps only in memory). Equal values still get equal tokens, so cache-hit
+rates replay faithfully, but without the key the tokens can't be matched
+against a dictionary of popular podcast names. Each worker has its own key,
+so the same text captured by two workers gets two tokens.
+
+Lines are buffered in memory and appended by a background task about once a
+second, each batch in a single ``O_APPEND`` write, so several workers can
+share one file. Replay the file with ``python replay.py``.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import secrets
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+_FLUSH_INTERVAL = 1.0
+
+
+def anonymize(prefs: Dict[str, Any], key: bytes) -> Dict[str, Any]:
+    """A copy of ``prefs`` with free text replaced by its HMAC under ``key``."""
+    body = dict(prefs)
+    enjoyed = body.get("podcasts_enjoyed")
+    if enjoyed:
+        digest = hmac.new(key, enjoyed.encode(), hashlib.sha256).hexdigest()[:16]
+        body["podcasts_enjoyed"] = f"anon-{digest}"
+    return body
+
+
+class TrafficCapture:
+    def __init__(self, path: str, sample_rate: float = 0.01) -> None:
+        self.path = path
+        self.sample_rate = sample_rate
+        # Never written anywhere: without it the tokens can't be reversed.
+        self._key = secrets.token_bytes(32)
+        self._buffer: List[str] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._flusher = asyncio.create_task(self._flush_loop())
+        logger.info(f"Capturing {self.sample_rate:.1%} of /recommend traffic to {self.path}")
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    @contextmanager
+    def track(self, prefs: Dict[str, Any], mode: str, media_type: str) -> Iterator[None]:
+        """Time the enclosed request handling and record it if sampled."""
+        if random.random() >= self.sample_rate:
+            yield
+            return
+        arrived = time.time()
+        started = time.perf_counter()
+        status = 200
+        try:
+            yield
+        except HTTPException as exc:
+            status = exc.status_code
+            raise
+        except Exception:
+            status = 500
+            raise
+        finally:
+            record = {
+                "t": round(arrived, 6),
+                "mode": mode,
+                "accept": media_type,
+                "status": status,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+                "body": anonymize(prefs, self._key),
+            }
+            self._buffer.append(json.dumps(record, separators=(",", ":")) + "\n")
+
+    async def flush(self) -> None:
+        lines, self._buffer = self._buffer, []
+        if lines:
+            await run_in_threadpool(self._append, "".join(lines).encode())
+
+    def _append(self, data: bytes) -> None:
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except OSError as exc:
+                logger.warning(f"Could not append captured traffic to {self.path}: {exc}")
+
+
+def read_capture(path: str) -> List[Dict[str, Any]]:
+    """All records of a capture file, oldest first; unreadable lines are skipped."""
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed capture line: {line[:80]!r}")
+    records.sort(key=lambda record: record["t"])
+    return records
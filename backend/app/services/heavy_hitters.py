@@ -0,0 +1,243 @@
+"""Streaming heavy-hitter tracking of (preference combination, segment) pairs.
+
+A count-min sketch estimates how often each combination was requested in
+fixed memory; a small candidate table keeps the ``k`` combinations with the
+highest estimates, along with their canonical preferences so a report can
+say which combinations they are. Together they tell us how concentrated
+traffic is (the share of requests covered by the top N combinations), which
+decides how much precomputation or caching pays off.
+
+:meth:`CountMinTopK.add` only appends to a bounded buffer, so the request
+path pays one list append. Every ``batch_size`` updates (and before any
+read) the buffer is folded into the sketch with numpy: the preference key
+is already a uniform 128-bit digest, so row indices come straight from its
+bits (double hashing, mixed with the segment) without hashing again. See
+``benchmarks/heavy_hitters.py`` for the per-update cost.
+
+Sketches with the same dimensions merge by adding their counters, so each
+worker can periodically write :meth:`CountMinTopK.to_dict` to a shared
+directory and any worker can combine them with :func:`merge_snapshots`.
+Counts are upper bounds: they never undercount, and overcount by at most
+``e / width`` of the total with probability ``1 - exp(-depth)``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from itertools import compress
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from app.services.prefkey import canonical_preferences
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = ".sketch.json"
+
+_SEGMENT_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+Item = Tuple[str, int]
+
+
+class CountMinTopK:
+    def __init__(
+        self, width: int = 4096, depth: int = 4, k: int = 100, batch_size: int = 1024
+    ) -> None:
+        if width & (width - 1):
+            raise ValueError("width must be a power of two")
+        self.width = width
+        self.depth = depth
+        self.k = k
+        self.batch_size = batch_size
+        self._total = 0
+        self.rows = np.zeros((depth, width), dtype=np.int64)
+        # Candidate heavy hitters: (preference_key, segment) -> estimated count.
+        self.top: Dict[Item, int] = {}
+        # Canonical preferences of the candidates' keys.
+        self.preferences: Dict[str, Dict[str, Any]] = {}
+        # Buffered updates, kept as flat lists (no per-update allocation).
+        self._keys: List[str] = []
+        self._segments: List[int] = []
+        self._prefs: List[Optional[Dict[str, Any]]] = []
+
+    @property
+    def total(self) -> int:
+        """Requests counted so far, including any still buffered."""
+        return self._total + len(self._keys)
+
+    def add(self, key: str, segment: int, preferences: Optional[Dict[str, Any]] = None) -> None:
+        """Count one request for (``key``, ``segment``); ``preferences`` are the
+        request's, kept (canonicalized) only if the key becomes a candidate."""
+        self._keys.append(key)
+        self._segments.append(segment)
+        self._prefs.append(preferences)
+        if len(self._keys) >= self.batch_size:
+            self.flush()
+
+    def _indices(self, keys: Sequence[str], segments: Sequence[int]) -> np.ndarray:
+        """``(depth, len(keys))`` column indices for the given items."""
+        digests = np.frombuffer(bytes.fromhex("".join(keys)), dtype=">u8")
+        digests = digests.reshape(-1, 2).astype(np.uint64)
+        segments = np.array(segments, dtype=np.uint64)
+        h1 = digests[:, 0] ^ (segments * _SEGMENT_MIX)
+        h2 = digests[:, 1] | np.uint64(1)
+        steps = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1 + steps * h2) & np.uint64(self.width - 1)).astype(np.intp)
+
+    def _estimates(self, indices: np.ndarray) -> np.ndarray:
+        return self.rows[np.arange(self.depth)[:, None], indices].min(axis=0)
+
+    def flush(self) -> None:
+        """Fold buffered updates into the sketch and the candidate table."""
+        keys, segments, prefs = self._keys, self._segments, self._prefs
+        if not keys:
+            return
+        self._keys, self._segments, self._prefs = [], [], []
+        self._total += len(keys)
+        indices = self._indices(keys, segments)
+        for row, columns in zip(self.rows, indices):
+            row += np.bincount(columns, minlength=self.width)
+        estimates = self._estimates(indices)
+
+        floor = min(self.top.values()) if len(self.top) >= self.k else 0
+        keep = (estimates >= floor).tolist()
+        items = zip(compress(keys, keep), compress(segments, keep))
+        self.top.update(zip(items, compress(estimates.tolist(), keep)))
+        for key, preferences in zip(compress(keys, keep), compress(prefs, keep)):
+            if preferences is not None and key not in self.preferences:
+                self.preferences[key] = canonical_preferences(preferences)
+        if len(self.top) > self.k:
+            self.top = dict(sorted(self.top.items(), key=lambda kv: kv[1], reverse=True)[: self.k])
+            self._prune_preferences()
+
+    def _prune_preferences(self) -> None:
+        live = {key for key, _ in self.top}
+        self.preferences = {k: v for k, v in self.preferences.items() if k in live}
+
+    def estimate(self, key: str, segment: int) -> int:
+        self.flush()
+        return int(self._estimates(self._indices([key], [segment]))[0])
+
+    def top_n(self, n: int) -> List[Tuple[str, int, int]]:
+        """The ``n`` heaviest ``(preference_key, segment, count)``, largest first."""
+        self.flush()
+        ranked = sorted(self.top.items(), key=lambda kv: kv[1], reverse=True)[:n]
+        return [(key, segment, count) for (key, segment), count in ranked]
+
+    def coverage(self, n: int) -> float:
+        """Estimated share of all requests that fall in the top ``n`` combinations."""
+        self.flush()
+        if not self.total:
+            return 0.0
+        covered = sum(count for _, _, count in self.top_n(n))
+        return min(1.0, covered / self.total)
+
+    # --- merging ------------------------------------------------------------
+
+    def merge(self, other: "CountMinTopK") -> None:
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("cannot merge sketches with different dimensions")
+        self.flush()
+        other.flush()
+        self.rows += other.rows
+        self._total += other.total
+        candidates = list(set(self.top) | set(other.top))
+        if not candidates:
+            return
+        keys, segments = zip(*candidates)
+        estimates = self._estimates(self._indices(keys, segments)).tolist()
+        ranked = sorted(zip(candidates, estimates), key=lambda kv: kv[1], reverse=True)
+        self.top = dict(ranked[: self.k])
+        self.preferences = {**other.preferences, **self.preferences}
+        self._prune_preferences()
+
+    def to_dict(self) -> Dict[str, Any]:
+        self.flush()
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "k": self.k,
+            "total": self.total,
+            "rows": self.rows.tolist(),
+            "top": {f"{key}|{segment}": count for (key, segment), count in self.top.items()},
+            "preferences": self.preferences,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CountMinTopK":
+        sketch = cls(width=data["width"], depth=data["depth"], k=data["k"])
+        sketch._total = data["total"]
+        sketch.rows = np.array(data["rows"], dtype=np.int64).reshape(sketch.depth, sketch.width)
+        for item, count in data["top"].items():
+            key, segment = item.rsplit("|", 1)
+            sketch.top[(key, int(segment))] = count
+        sketch.preferences = dict(data.get("preferences", {}))
+        return sketch
+
+
+def write_snapshot(snapshot: Dict[str, Any], directory: str) -> str:
+    """Atomically write this worker's ``to_dict()`` snapshot; return the path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{os.getpid()}{SNAPSHOT_SUFFIX}")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+    os.replace(tmp, path)
+    return path
+
+
+async def publish_snapshots(sketch: CountMinTopK, directory: str, interval: float) -> None:
+    """Write ``sketch`` to ``directory`` every ``interval`` seconds until
+    cancelled, then once more so the last interval's counts aren't lost."""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            # Snapshot on the loop (the sketch isn't thread-safe), write off it.
+            snapshot = sketch.to_dict()
+            try:
+                await run_in_threadpool(write_snapshot, snapshot, directory)
+            except OSError as exc:
+                logger.warning(f"Could not write sketch snapshot to {directory}: {exc}")
+    except asyncio.CancelledError:
+        try:
+            write_snapshot(sketch.to_dict(), directory)
+        except OSError as exc:
+            logger.warning(f"Could not write final sketch snapshot to {directory}: {exc}")
+        raise
+
+
+def merge_snapshots(
+    local: Dict[str, Any], directory: Optional[str], max_age: float
+) -> Tuple[CountMinTopK, int]:
+    """This worker's ``local`` snapshot merged with the other workers' recent
+    snapshots in ``directory``, and the number of workers included.
+
+    Snapshots older than ``max_age`` seconds belong to workers that have
+    exited and are ignored.
+    """
+    merged = CountMinTopK.from_dict(local)
+    workers = 1
+    if not directory or not os.path.isdir(directory):
+        return merged, workers
+    own = f"{os.getpid()}{SNAPSHOT_SUFFIX}"
+    cutoff = time.time() - max_age
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(SNAPSHOT_SUFFIX) or name == own:
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                continue
+            with open(path) as f:
+                merged.merge(CountMinTopK.from_dict(json.load(f)))
+            workers += 1
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning(f"Skipping unreadable sketch snapshot {path}: {exc}")
+    return merged, workers
+
+
+heavy_hitters = CountMinTopK()
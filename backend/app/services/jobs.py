@@ -0,0 +1,254 @@
+"""In-process job queue for recommendation work that outlives the request.
+
+``POST /recommend/jobs`` enqueues the segment + LLM work here and answers
+``202`` straight away, so no connection is held open for the Groq round
+trip. A fixed pool of asyncio workers takes jobs from a bounded priority
+queue (lower number first, FIFO within a priority); when the queue is full,
+:meth:`JobQueue.submit` raises ``asyncio.QueueFull`` and the caller sheds
+the request. Results are kept for ``retention_seconds`` so clients can
+fetch them, long-poll for them or, with a callback URL, have them POSTed;
+at most ``max_retained`` jobs are kept, oldest finished ones going first.
+
+:meth:`JobQueue.snapshot` reports queue depth, queue wait percentiles and
+worker utilization over the last ``UTILIZATION_WINDOW_SECONDS`` for sizing
+the pool. Like the rest of the in-process state, each uvicorn worker has its
+own queue, so job ids are only known to the worker that accepted them.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+_CALLBACK_ATTEMPTS = 3
+
+UTILIZATION_WINDOW_SECONDS = 60.0
+# Default cap on retained jobs, as a multiple of the queue depth.
+_RETAINED_PER_SLOT = 4
+
+Work = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+@dataclass
+class Job:
+    id: str
+    work: Work
+    priority: int
+    callback_url: Optional[str] = None
+    status: str = QUEUED
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def to_dict(self) -> Dict[str, Any]:
+        wait_ms = run_ms = None
+        if self.started is not None:
+            wait_ms = round((self.started - self.created) * 1000, 3)
+        if self.finished is not None and self.started is not None:
+            run_ms = round((self.finished - self.started) * 1000, 3)
+        return {
+            "id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "created_at": self.created,
+            "queue_wait_ms": wait_ms,
+            "run_ms": run_ms,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+def _percentile(ordered: List[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+class JobQueue:
+    def __init__(
+        self,
+        workers: int = 4,
+        max_depth: int = 100,
+        retention_seconds: float = 600,
+        callback_timeout: float = 10.0,
+        max_retained: Optional[int] = None,
+    ) -> None:
+        self.workers = workers
+        self.max_depth = max_depth
+        self.retention_seconds = retention_seconds
+        self.max_retained = max_retained or _RETAINED_PER_SLOT * max_depth
+        self.callback_timeout = callback_timeout
+        self._queue: "asyncio.PriorityQueue" = asyncio.PriorityQueue(maxsize=max_depth)
+        self._seq = itertools.count()
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._callbacks: Set[asyncio.Task] = set()
+        self._http: Optional[httpx.AsyncClient] = None
+        self._busy = 0
+        # Busy intervals (monotonic start, end) of jobs that finished within
+        # the utilization window, and the start times of running jobs.
+        self._busy_spans: Deque[Tuple[float, float]] = deque()
+        self._running: Dict[str, float] = {}
+        self._started_at = time.monotonic()
+        self._waits_ms: Deque[float] = deque(maxlen=1024)
+
+    async def start(self) -> None:
+        self._http = httpx.AsyncClient(timeout=self.callback_timeout)
+        self._started_at = time.monotonic()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Job queue started ({self.workers} workers, depth {self.max_depth}).")
+
+    async def close(self) -> None:
+        tasks = self._tasks + list(self._callbacks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def submit(self, work: Work, priority: int = 1, callback_url: Optional[str] = None) -> Job:
+        """Enqueue ``work``; raises ``asyncio.QueueFull`` at ``max_depth``."""
+        job = Job(id=uuid.uuid4().hex, work=work, priority=priority, callback_url=callback_url)
+        try:
+            self._queue.put_nowait((priority, next(self._seq), job))
+        except asyncio.QueueFull:
+            metrics.incr("jobs.rejected")
+            raise
+        # Only make room once the job is accepted; a rejection evicts nothing.
+        self._purge(room=1)
+        self._jobs[job.id] = job
+        metrics.incr("jobs.submitted")
+        metrics.set_gauge("jobs.queue_depth", self._queue.qsize())
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._purge()
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        """Return ``job`` once finished, or after ``timeout`` seconds at most."""
+        if timeout > 0 and not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def _purge(self, room: int = 0) -> None:
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished is not None and job.finished < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        # Past the cap, drop the oldest finished jobs (dicts keep submit order).
+        excess = len(self._jobs) + room - self.max_retained
+        if excess > 0:
+            finished = [job_id for job_id, job in self._jobs.items() if job.finished is not None]
+            for job_id in finished[:excess]:
+                del self._jobs[job_id]
+                metrics.incr("jobs.evicted")
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            metrics.set_gauge("jobs.queue_depth", self._queue.qsize())
+            await self._run(job)
+            if job.callback_url:
+                task = asyncio.create_task(self._deliver(job))
+                self._callbacks.add(task)
+                task.add_done_callback(self._callbacks.discard)
+
+    async def _run(self, job: Job) -> None:
+        job.status = RUNNING
+        job.started = time.time()
+        wait_ms = (job.started - job.created) * 1000
+        self._waits_ms.append(wait_ms)
+        self._busy += 1
+        started = time.monotonic()
+        self._running[job.id] = started
+        metrics.set_gauge("jobs.utilization", self.utilization())
+        try:
+            job.result = await job.work()
+            job.status = DONE
+            metrics.incr("jobs.completed")
+        except Exception:  # noqa: BLE001 - a failed job must not kill its worker
+            logger.exception(f"Recommendation job {job.id} failed")
+            job.status = FAILED
+            job.error = "Error generating recommendations"
+            metrics.incr("jobs.failed")
+        finally:
+            self._busy -= 1
+            del self._running[job.id]
+            self._busy_spans.append((started, time.monotonic()))
+            job.finished = time.time()
+            job.done.set()
+            # Release the closure (request state) now that the job has run.
+            job.work = None  # type: ignore[assignment]
+            metrics.set_gauge("jobs.utilization", self.utilization())
+
+    async def _deliver(self, job: Job) -> None:
+        """POST the finished job to its callback URL, retrying with backoff."""
+        for attempt in range(_CALLBACK_ATTEMPTS):
+            try:
+                response = await self._http.post(job.callback_url, json=job.to_dict())
+                response.raise_for_status()
+                metrics.incr("jobs.callback.delivered")
+                return
+            except httpx.HTTPError as exc:
+                logger.warning(f"Callback for job {job.id} failed (attempt {attempt + 1}): {exc}")
+                if attempt + 1 < _CALLBACK_ATTEMPTS:
+                    await asyncio.sleep(2**attempt)
+        metrics.incr("jobs.callback.failed")
+
+    def utilization(self, now: Optional[float] = None) -> float:
+        """Share of worker time spent running jobs over the last
+        ``UTILIZATION_WINDOW_SECONDS`` (or since the pool started, if later)."""
+        now = time.monotonic() if now is None else now
+        window_start = max(now - UTILIZATION_WINDOW_SECONDS, self._started_at)
+        while self._busy_spans and self._busy_spans[0][1] <= window_start:
+            self._busy_spans.popleft()
+        busy = sum(end - max(start, window_start) for start, end in self._busy_spans)
+        busy += sum(now - max(start, window_start) for start in self._running.values())
+        capacity = (now - window_start) * self.workers
+        return min(1.0, busy / capacity) if capacity > 0 else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        waits = sorted(self._waits_ms)
+        return {
+            "workers": self.workers,
+            "busy_workers": self._busy,
+            "utilization": round(self.utilization(), 4),
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_depth,
+            "jobs_retained": len(self._jobs),
+            "max_jobs_retained": self.max_retained,
+            "queue_wait_ms": {
+                "samples": len(waits),
+                "p50": round(_percentile(waits, 50), 3) if waits else None,
+                "p95": round(_percentile(waits, 95), 3) if waits else None,
+                "max": round(waits[-1], 3) if waits else None,
+            },
+        }
@@ -0,0 +1,103 @@
+"""Recover recommendation objects from malformed or truncated LLM JSON.
+
+Groq's JSON mode is reliable but not perfect: a response that hits
+``max_tokens`` stops mid-object, and the model occasionally emits trailing
+commas. Rather than discarding the whole (paid-for) response, we keep every
+recommendation object that parsed completely and let the caller ask for just
+the missing ones.
+"""
+
+import json
+from typing import Any, Dict, List, Tuple
+
+_decoder = json.JSONDecoder()
+
+
+def strip_trailing_commas(text: str) -> str:
+    """Drop commas directly before ``}`` or ``]``, leaving string contents alone."""
+    out: List[str] = []
+    in_string = False
+    escaped = False
+    pending_comma = ""
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if pending_comma:
+            if ch.isspace():
+                pending_comma += ch
+                continue
+            # Keep the comma only if it's not closing a container.
+            out.append(pending_comma if ch not in "}]" else pending_comma[1:])
+            pending_comma = ""
+        if ch == ",":
+            pending_comma = ch
+            continue
+        if ch == '"':
+            in_string = True
+        out.append(ch)
+    out.append(pending_comma)
+    return "".join(out)
+
+
+def _extract_list(parsed: Any) -> List[Dict[str, Any]]:
+    if isinstance(parsed, dict):
+        parsed = parsed.get("recommendations", [])
+    if not isinstance(parsed, list):
+        return []
+    return [rec for rec in parsed if isinstance(rec, dict)]
+
+
+def _scan_objects(text: str, start: int) -> List[Dict[str, Any]]:
+    """Decode consecutive array elements from ``start`` until one fails."""
+    recs: List[Dict[str, Any]] = []
+    idx = start
+    length = len(text)
+    while idx < length:
+        ch = text[idx]
+        if ch.isspace() or ch == ",":
+            idx += 1
+            continue
+        if ch == "]":
+            break
+        try:
+            obj, idx = _decoder.raw_decode(text, idx)
+        except json.JSONDecodeError:
+            # Truncated (or hopelessly broken) element: everything before it
+            # is all we can trust.
+            break
+        if isinstance(obj, dict):
+            recs.append(obj)
+    return recs
+
+
+def salvage_recommendations(content: str) -> Tuple[List[Dict[str, Any]], bool]:
+    """Parse ``content`` into recommendation dicts.
+
+    Returns ``(recommendations, intact)`` where ``intact`` is False when the
+    payload needed repair or was only partially recoverable.
+    """
+    if not content:
+        return [], False
+    try:
+        return _extract_list(json.loads(content)), True
+    except json.JSONDecodeError:
+        pass
+
+    text = strip_trailing_commas(content)
+    try:
+        return _extract_list(json.loads(text)), False
+    except json.JSONDecodeError:
+        pass
+
+    key = text.find('"recommendations"')
+    array_start = text.find("[", key if key != -1 else 0)
+    if array_start == -1:
+        return [], False
+    return _scan_objects(text, array_start + 1), False
@@ -6,14 +6,29 @@ Llama model) in JSON mode so the model returns a structured payload instead
 of free-text we have to scrape.
 """
 
+import asyncio
 import json
 import logging
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
-from groq import AsyncGroq
+from groq import APIConnectionError, APIStatusError, AsyncGroq
+
+from app.core.metrics import metrics
+from app.services.json_salvage import salvage_recommendations
+from app.services.result_store import ResultStore
+from app.services.usage import SOURCE_CACHE, SOURCE_FALLBACK, CallUsage, usage_tracker
 
 logger = logging.getLogger(__name__)
 
+NUM_RECOMMENDATIONS = 5
+
+# Re-sends of a failed chat completion. The Groq client is built with
+# max_retries=0 so that every attempt goes through _complete and is counted.
+LLM_MAX_RETRIES = 2
+_RETRY_BASE_DELAY = 0.5
+_RETRY_MAX_DELAY = 8.0
+
 SYSTEM_PROMPT = (
     "You are a podcast recommendation expert. You always respond with a single "
     "valid JSON object and nothing else."
@@ -79,7 +94,9 @@ The "recommendations" array must contain exactly 5 items.
     return prompt
 
 
-def _normalize(recs: List[Dict[str, Any]], user_prefs: Dict[str, Any]) -> List[Dict[str, Any]]:
+def normalize_recommendations(
+    recs: List[Dict[str, Any]], user_prefs: Dict[str, Any]
+) -> List[Dict[str, Any]]:
     """Ensure every recommendation has all required fields + a link.
 
     The model can omit or mistype fields; we backfill from the user's
@@ -96,7 +113,7 @@ def _normalize(recs: List[Dict[str, Any]], user_prefs: Dict[str, Any]) -> List[D
         "reason": "Matches your listening preferences.",
     }
     normalized = []
-    for rec in recs[:5]:
+    for rec in recs[:NUM_RECOMMENDATIONS]:
         if not isinstance(rec, dict):
             continue
         item = {f: str(rec.get(f) or defaults[f]) for f in _REQUIRED_FIELDS}
@@ -112,31 +129,321 @@ async def generate_podcast_recommendations(
     user_preferences: Dict[str, Any],
     segment_profile: Dict[str, Any],
     model: str,
+    store: Optional[ResultStore] = None,
+    cache_key: Optional[str] = None,
+    usage: Optional[CallUsage] = None,
+) -> List[Dict[str, Any]]:
+    """Return 5 podcast recommendations, falling back to a static list on failure.
+
+    With a ``store`` and ``cache_key``, a stored LLM result is returned
+    without calling Groq, and fresh LLM results are stored once complete
+    (partial lists and fallbacks never are). Tokens, latency and the outcome
+    are accumulated into ``usage`` (if given) and recorded with the usage
+    tracker; while its per-minute token budget is exhausted, Groq is not
+    called.
+    """
+    usage = usage if usage is not None else CallUsage()
+    usage.model = model
+    try:
+        return await _generate(
+            client, user_preferences, segment_profile, model, store, cache_key, usage
+        )
+    finally:
+        usage_tracker.record(usage)
+
+
+async def _generate(
+    client: Optional[AsyncGroq],
+    user_preferences: Dict[str, Any],
+    segment_profile: Dict[str, Any],
+    model: str,
+    store: Optional[ResultStore],
+    cache_key: Optional[str],
+    usage: CallUsage,
 ) -> List[Dict[str, Any]]:
-    """Return 5 podcast recommendations, falling back to a static list on failure."""
+    if store is not None and cache_key:
+        cached = await store.get(cache_key)
+        if cached:
+            usage.source = SOURCE_CACHE
+            return cached
+
     if client is None:
         logger.warning("Groq client unavailable; returning fallback recommendations")
-        return get_fallback_recommendations(user_preferences)
+        return _fallback(user_preferences, usage, "no_client")
+    if usage_tracker.over_budget():
+        logger.warning("Per-minute LLM token budget exhausted; returning fallback recommendations")
+        return _fallback(user_preferences, usage, "token_budget")
 
     try:
-        response = await client.chat.completions.create(
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": _build_prompt(user_preferences, segment_profile)},
+        ]
+        response = await _complete(
+            client,
+            usage,
             model=model,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": _build_prompt(user_preferences, segment_profile)},
-            ],
+            messages=messages,
             response_format={"type": "json_object"},
             max_tokens=1500,
             temperature=0.7,
         )
         content = response.choices[0].message.content
-        recommendations = (json.loads(content) or {}).get("recommendations", [])
+        recommendations = _parse_recommendations(content)
         if not recommendations:
-            raise ValueError("no recommendations in model response")
-        return _normalize(recommendations, user_preferences)
+            logger.error("Groq response contained no usable recommendations")
+            return _fallback(user_preferences, usage, "unparseable_response")
+        missing = NUM_RECOMMENDATIONS - len(recommendations)
+        if missing > 0:
+            recommendations += await _request_missing(
+                client, model, messages, recommendations, missing, usage
+            )
+        result = normalize_recommendations(recommendations, user_preferences)
+        # A short list (salvaged, follow-up failed) is served but not shared.
+        if store is not None and cache_key and len(result) == NUM_RECOMMENDATIONS:
+            store.put(cache_key, result)
+        return result
     except Exception as exc:  # noqa: BLE001 - any failure degrades to the static fallback
         logger.error(f"Groq recommendation error: {exc}")
-        return get_fallback_recommendations(user_preferences)
+        return _fallback(user_preferences, usage, type(exc).__name__)
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before re-sending after ``error``, or None if it is final.
+
+    Same policy as the Groq SDK's own retries: connection errors and timeouts,
+    408, 409, 429 and 5xx, honouring a Retry-After of up to a minute.
+    """
+    if isinstance(error, APIStatusError):
+        status = error.status_code
+        if status not in (408, 409, 429) and status < 500:
+            return None
+        try:
+            retry_after = float(error.response.headers.get("retry-after", ""))
+        except ValueError:
+            retry_after = 0.0
+        if 0 < retry_after <= 60:
+            return retry_after
+    elif not isinstance(error, APIConnectionError):
+        return None
+    return min(_RETRY_BASE_DELAY * 2**attempt, _RETRY_MAX_DELAY)
+
+
+async def _complete(client: AsyncGroq, usage: CallUsage, **kwargs: Any) -> Any:
+    """One chat completion, retried on transient errors.
+
+    Every attempt is timed into ``usage`` whether it succeeds or raises, and
+    each re-send is counted in ``usage.retries``.
+    """
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            response = await client.chat.completions.create(**kwargs)
+        except Exception as exc:
+            usage.add_failure(time.perf_counter() - started)
+            delay = _retry_delay(exc, attempt) if attempt < LLM_MAX_RETRIES else None
+            if delay is None:
+                raise
+            logger.warning(f"Groq call failed ({type(exc).__name__}); retrying in {delay:.1f}s")
+            usage.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+            continue
+        usage.add_response(response, time.perf_counter() - started)
+        return response
+
+
+def _fallback(
+    user_preferences: Dict[str, Any], usage: CallUsage, reason: str
+) -> List[Dict[str, Any]]:
+    usage.source = SOURCE_FALLBACK
+    usage.fallback_reason = reason
+    return get_fallback_recommendations(user_preferences)
+
+
+def _parse_recommendations(content: str, prefix: str = "llm.parse") -> List[Dict[str, Any]]:
+    """Parse the model's payload, salvaging what we can and recording the outcome.
+
+    First responses are counted under ``llm.parse``; follow-ups pass their own
+    ``prefix`` so the salvage and failure rates describe first answers only.
+    """
+    recommendations, intact = salvage_recommendations(content)
+    metrics.incr(f"{prefix}.total")
+    if not recommendations:
+        metrics.incr(f"{prefix}.failed")
+    elif not intact:
+        metrics.incr(f"{prefix}.salvaged")
+        logger.warning(f"Salvaged {len(recommendations)} recommendation(s) from malformed JSON")
+    else:
+        metrics.incr(f"{prefix}.ok")
+    total = f"{prefix}.total"
+    metrics.set_gauge(f"{prefix}.salvage_rate", metrics.ratio(f"{prefix}.salvaged", total))
+    metrics.set_gauge(f"{prefix}.failure_rate", metrics.ratio(f"{prefix}.failed", total))
+    return recommendations[:NUM_RECOMMENDATIONS]
+
+
+async def _request_missing(
+    client: AsyncGroq,
+    model: str,
+    messages: List[Dict[str, str]],
+    have: List[Dict[str, Any]],
+    missing: int,
+    usage: CallUsage,
+) -> List[Dict[str, Any]]:
+    """Ask for only the ``missing`` recommendations rather than regenerating all 5.
+
+    Best effort: on any failure we keep the partial list we already have.
+    """
+    metrics.incr("llm.followup.requests")
+    usage.followups += 1
+    names = ", ".join(str(rec.get("name", "")) for rec in have)
+    follow_up = [
+        *messages,
+        {"role": "assistant", "content": json.dumps({"recommendations": have})},
+        {
+            "role": "user",
+            "content": (
+                f"That answer had {len(have)} of the {NUM_RECOMMENDATIONS} podcasts. Suggest "
+                f"exactly {missing} more podcast(s) for the same user, different from: "
+                f"{names}. Respond with the same JSON shape, "
+                f'containing only the {missing} new item(s) in "recommendations".'
+            ),
+        },
+    ]
+    try:
+        response = await _complete(
+            client,
+            usage,
+            model=model,
+            messages=follow_up,
+            response_format={"type": "json_object"},
+            max_tokens=300 * missing,
+            temperature=0.7,
+        )
+        extra = _parse_recommendations(
+            response.choices[0].message.content, prefix="llm.followup.parse"
+        )
+    except Exception as exc:  # noqa: BLE001 - keep the partial result
+        logger.error(f"Groq follow-up error: {exc}")
+        extra = []
+    if not extra:
+        metrics.incr("llm.followup.failed")
+    return extra[:missing]
+
+
+def _describe(value: Any) -> str:
+    return ", ".join(value) if isinstance(value, list) else str(value)
+
+
+def _build_refine_prompt(
+    user_preferences: Dict[str, Any],
+    previous: List[Dict[str, Any]],
+    changes: Dict[str, Tuple[Any, Any]],
+    segment_profile: Optional[Dict[str, Any]],
+) -> str:
+    """A short follow-up turn: what changed, and the current list by index."""
+    changed = "; ".join(
+        f"{field} from {_describe(old)!r} to {_describe(new)!r}"
+        for field, (old, new) in changes.items()
+    )
+    current = "\n".join(
+        f"{i}. {rec['name']} ({rec['format']}, {rec['duration']}, {rec['language']})"
+        for i, rec in enumerate(previous)
+    )
+    prefs = "; ".join(
+        f"{field}: {_describe(value)}" for field, value in user_preferences.items() if value
+    )
+    prompt = f"""You previously recommended these podcasts:
+{current}
+
+The user changed {changed}.
+Their preferences are now: {prefs}.
+"""
+    if segment_profile is not None:
+        top_music_genre = next(iter(segment_profile.get("fav_music_genre", {})), "Various")
+        top_pod_genre = next(iter(segment_profile.get("fav_pod_genre", {})), "Various")
+        prompt += (
+            f"Their listener segment changed (top music genre: {top_music_genre}, "
+            f"top podcast genre: {top_pod_genre}).\n"
+        )
+    prompt += """
+Replace only the items that no longer fit. Respond with a JSON object of this shape:
+{"recommendations": [{"replaces": <index>, "name": ..., "creator": ..., "description": ..., "format": ..., "duration": ..., "language": ..., "region": ..., "reason": ...}]}
+Use an empty "recommendations" array if every item still fits.
+"""
+    return prompt
+
+
+async def refine_recommendations(
+    client: Optional[AsyncGroq],
+    user_preferences: Dict[str, Any],
+    previous: List[Dict[str, Any]],
+    changes: Dict[str, Tuple[Any, Any]],
+    model: str,
+    segment_profile: Optional[Dict[str, Any]] = None,
+    usage: Optional[CallUsage] = None,
+) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """Update ``previous`` recommendations after the user ``changes`` some fields.
+
+    Instead of re-sending the full prompt, Groq gets a short follow-up turn
+    listing the current items and the ``{field: (old, new)}`` changes, and
+    answers with replacements for the items that no longer fit. Pass
+    ``segment_profile`` only when the segment changed. Returns the merged
+    list and the replaced indices. Without a client or token budget the
+    fallback list for the new preferences replaces everything; if the call
+    fails, ``previous`` is kept unchanged.
+    """
+    usage = usage if usage is not None else CallUsage()
+    usage.model = model
+    try:
+        if client is None or usage_tracker.over_budget():
+            reason = "no_client" if client is None else "token_budget"
+            return _fallback(user_preferences, usage, reason), list(range(len(previous)))
+        metrics.incr("llm.refine.requests")
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": _build_refine_prompt(
+                    user_preferences, previous, changes, segment_profile
+                ),
+            },
+        ]
+        try:
+            response = await _complete(
+                client,
+                usage,
+                model=model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                max_tokens=300 * len(previous),
+                temperature=0.7,
+            )
+            content = response.choices[0].message.content
+            replacements, intact = salvage_recommendations(content)
+        except Exception as exc:  # noqa: BLE001 - keep the previous recommendations
+            logger.error(f"Groq refine error: {exc}")
+            usage.source = SOURCE_FALLBACK
+            usage.fallback_reason = type(exc).__name__
+            return previous, []
+        if not intact:
+            metrics.incr("llm.refine.salvaged")
+
+        merged = list(previous)
+        replaced: List[int] = []
+        for rec in replacements:
+            try:
+                index = int(rec.get("replaces"))
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < len(merged) and index not in replaced:
+                merged[index] = normalize_recommendations([rec], user_preferences)[0]
+                replaced.append(index)
+        metrics.incr("llm.refine.replaced", len(replaced))
+        return merged, sorted(replaced)
+    finally:
+        usage_tracker.record(usage)
 
 
 def get_fallback_recommendations(user_preferences: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -148,7 +455,7 @@ def get_fallback_recommendations(user_preferences: Dict[str, Any]) -> List[Dict[
     region = user_preferences.get("region", "Global")
     age = user_preferences.get("age", "25-34")
 
-    return _normalize(
+    return normalize_recommendations(
         [
             {
                 "name": "The Daily",
@@ -0,0 +1,109 @@
+"""Speculative LLM work started while the user is still filling in the form.
+
+``POST /recommend/prefetch`` is called with whatever preferences are known so
+far. Once they form a complete, valid body it starts the Groq call in a
+background task and parks it here under a random, short-lived token. The
+final ``POST /recommend`` presents the token in ``X-Prefetch-Token``; if the
+submitted preferences match what was speculated on, it awaits that task
+(usually already finished) instead of starting a new call.
+
+Speculation is bounded per client: each client (remote address) has at
+most ``max_per_client`` live speculations, and starting another cancels its
+oldest, which belongs to a form state the user has since moved past.
+Unclaimed speculations are cancelled once their ``ttl_seconds`` are up.
+Like the other in-memory registries this is per worker process, so a token
+can only be redeemed on the worker that issued it.
+"""
+
+import asyncio
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Dict, List, Optional
+
+from app.core.metrics import metrics
+from app.services.usage import CallUsage
+
+Result = List[Dict[str, Any]]
+
+
+@dataclass
+class Speculation:
+    client_id: str
+    prefkey: str
+    task: "asyncio.Task[Result]"
+    usage: CallUsage
+    expires: float
+
+
+class PrefetchRegistry:
+    def __init__(self, ttl_seconds: float = 30.0, max_per_client: int = 2) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_per_client = max_per_client
+        # Insertion-ordered, so expired entries are always at the front.
+        self._entries: "OrderedDict[str, Speculation]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _discard(self, token: str, reason: str) -> None:
+        entry = self._entries.pop(token)
+        entry.task.cancel()
+        metrics.incr(f"prefetch.{reason}")
+
+    def _expire(self, now: float) -> None:
+        while self._entries:
+            token, entry = next(iter(self._entries.items()))
+            if entry.expires > now:
+                break
+            self._discard(token, "expired")
+
+    def find(self, client_id: str, prefkey: str) -> Optional[str]:
+        """Token of a live speculation for the same client and preferences."""
+        self._expire(time.monotonic())
+        for token, entry in self._entries.items():
+            if entry.client_id == client_id and entry.prefkey == prefkey:
+                return token
+        return None
+
+    def speculate(
+        self, client_id: str, prefkey: str, work: Awaitable[Result], usage: CallUsage
+    ) -> str:
+        """Run ``work`` in the background and return the token to claim it with."""
+        now = time.monotonic()
+        self._expire(now)
+        mine = [token for token, entry in self._entries.items() if entry.client_id == client_id]
+        for token in mine[: max(0, len(mine) - self.max_per_client + 1)]:
+            self._discard(token, "evicted")
+        token = secrets.token_urlsafe(16)
+        self._entries[token] = Speculation(
+            client_id, prefkey, asyncio.ensure_future(work), usage, now + self.ttl_seconds
+        )
+        metrics.incr("prefetch.started")
+        return token
+
+    def claim(self, token: str, client_id: str, prefkey: str) -> Optional[Speculation]:
+        """Take the speculation for ``token`` if it was made for these preferences.
+
+        A token is single-use: a mismatch (the user changed something after
+        the last prefetch) cancels the speculation and returns None.
+        """
+        self._expire(time.monotonic())
+        entry = self._entries.get(token)
+        if entry is None or entry.client_id != client_id:
+            metrics.incr("prefetch.unknown")
+            return None
+        if entry.prefkey != prefkey:
+            self._discard(token, "mismatch")
+            return None
+        del self._entries[token]
+        metrics.incr("prefetch.hit")
+        return entry
+
+    async def close(self) -> None:
+        tasks = [entry.task for entry in self._entries.values()]
+        self._entries.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,42 @@
+"""Canonical keys for user preference combinations.
+
+Two requests that mean the same thing (same fields, list items in any order
+or with stray whitespace) map to the same key, so caches and counters keyed
+on it see them as one combination.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict
+
+# Fields that influence the recommendations (and therefore the key).
+KEY_FIELDS = (
+    "age",
+    "music_genre",
+    "podcast_frequency",
+    "podcast_duration",
+    "podcast_format",
+    "podcast_content",
+    "content_language",
+    "region",
+    "listening_mood",
+    "podcasts_enjoyed",
+)
+
+
+def canonical_preferences(prefs: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalized copy of the key fields: strings stripped, lists sorted and de-duplicated."""
+    canonical: Dict[str, Any] = {}
+    for field in KEY_FIELDS:
+        value = prefs.get(field)
+        if isinstance(value, (list, tuple)):
+            canonical[field] = sorted({str(v).strip() for v in value if str(v).strip()})
+        else:
+            canonical[field] = str(value or "").strip()
+    return canonical
+
+
+def preference_key(prefs: Dict[str, Any]) -> str:
+    """Stable 128-bit hex digest of the canonical preferences."""
+    payload = json.dumps(canonical_preferences(prefs), sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
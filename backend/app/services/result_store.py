@@ -0,0 +1,217 @@
+"""Persistent, cross-worker store for LLM recommendation results.
+
+Results live in a local SQLite database (WAL mode, so every uvicorn worker
+on the host can read and write it concurrently) and survive deploys. Each
+worker keeps a small in-memory LRU in front of it:
+
+* reads hit memory first and otherwise go to SQLite on the threadpool, so
+  the event loop never blocks on disk;
+* writes (new results and hit counts) are queued and committed in batches
+  by a background task;
+* entries expire after ``ttl_seconds`` and the least recently used are
+  evicted beyond ``max_entries``;
+* on startup the most-hit keys are preloaded into memory (warm start).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+Result = List[Dict[str, Any]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+# Writer batching: commit when this many ops are queued or after this delay.
+_BATCH_SIZE = 256
+_BATCH_DELAY = 0.05
+# How often the writer runs TTL/size eviction.
+_EVICT_INTERVAL = 60.0
+
+
+class ResultStore:
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float = 86_400,
+        max_entries: int = 100_000,
+        memory_entries: int = 2048,
+        warm_keys: int = 512,
+    ) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.warm_keys = warm_keys
+        # key -> (value, created)
+        self._memory: "OrderedDict[str, Tuple[Result, float]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._queue: "asyncio.Queue[Tuple[str, str, Optional[str], float]]" = asyncio.Queue()
+        self._writer: Optional[asyncio.Task] = None
+        self._last_evict = 0.0
+
+    # --- lifecycle ----------------------------------------------------------
+
+    async def start(self) -> None:
+        await run_in_threadpool(self._open)
+        warmed = await run_in_threadpool(self._load_hot_keys)
+        for key, value, created in warmed:
+            self._remember(key, value, created)
+        self._writer = asyncio.create_task(self._write_loop())
+        logger.info(f"Result store ready at {self.path} ({len(warmed)} keys prefetched).")
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            await self._queue.join()
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.close()
+            self._conn = None
+
+    def _open(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+
+    def _load_hot_keys(self) -> List[Tuple[str, Result, float]]:
+        cutoff = time.time() - self.ttl_seconds
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT key, value, created FROM results WHERE created > ? "
+                "ORDER BY hits DESC LIMIT ?",
+                (cutoff, min(self.warm_keys, self.memory_entries)),
+            ).fetchall()
+        return [(key, json.loads(value), created) for key, value, created in rows]
+
+    # --- reads --------------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[Result]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, created = entry
+            if now - created < self.ttl_seconds:
+                self._memory.move_to_end(key)
+                metrics.incr("result_store.memory_hits")
+                self._queue.put_nowait(("hit", key, None, now))
+                return value
+            del self._memory[key]
+
+        row = await run_in_threadpool(self._read, key)
+        if row is None or now - row[1] >= self.ttl_seconds:
+            metrics.incr("result_store.misses")
+            return None
+        value, created = json.loads(row[0]), row[1]
+        self._remember(key, value, created)
+        metrics.incr("result_store.disk_hits")
+        self._queue.put_nowait(("hit", key, None, now))
+        return value
+
+    def _read(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._db_lock:
+            return self._conn.execute(
+                "SELECT value, created FROM results WHERE key = ?", (key,)
+            ).fetchone()
+
+    # --- writes -------------------------------------------------------------
+
+    def put(self, key: str, value: Result) -> None:
+        """Store ``value`` under ``key``; the disk write happens in the background."""
+        now = time.time()
+        self._remember(key, value, now)
+        self._queue.put_nowait(("put", key, json.dumps(value), now))
+
+    def _remember(self, key: str, value: Result, created: float) -> None:
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    async def _write_loop(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + _BATCH_DELAY
+            while len(batch) < _BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await run_in_threadpool(self._write_batch, batch)
+            except Exception:  # noqa: BLE001 - a failed write must not kill the writer
+                logger.exception("Result store write failed")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: List[Tuple[str, str, Optional[str], float]]) -> None:
+        puts = [(key, value, ts, ts) for op, key, value, ts in batch if op == "put"]
+        hits = [(ts, key) for op, key, _, ts in batch if op == "hit"]
+        with self._db_lock, self._conn:
+            if puts:
+                self._conn.executemany(
+                    "INSERT INTO results (key, value, created, last_used) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, "
+                    "created = excluded.created, last_used = excluded.last_used",
+                    puts,
+                )
+            if hits:
+                self._conn.executemany(
+                    "UPDATE results SET hits = hits + 1, last_used = MAX(last_used, ?) "
+                    "WHERE key = ?",
+                    hits,
+                )
+        metrics.incr("result_store.writes", len(puts))
+        now = time.time()
+        if now - self._last_evict >= _EVICT_INTERVAL:
+            self._last_evict = now
+            self.evict(now)
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Drop expired entries and trim to ``max_entries``; return rows removed."""
+        now = time.time() if now is None else now
+        with self._db_lock, self._conn:
+            expired = self._conn.execute(
+                "DELETE FROM results WHERE created <= ?", (now - self.ttl_seconds,)
+            ).rowcount
+            overflow = self._conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results "
+                "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        if expired or overflow:
+            logger.info(f"Result store evicted {expired} expired and {overflow} LRU entries.")
+        return expired + overflow
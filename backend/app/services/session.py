@@ -0,0 +1,112 @@
+"""Per-connection state for iterative refinement over ``/ws/session``.
+
+A session keeps what a one-shot ``/recommend`` call throws away: the
+validated preferences, the scaled feature row with its distances to every
+segment centre (:class:`~app.ml.features.IncrementalFeatures`), the segment
+and the current recommendations. When the user changes a field, only that
+field's columns are re-encoded, and Groq gets a short follow-up turn naming
+the change and the current list instead of the full prompt, replacing just
+the items that no longer fit.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from groq import AsyncGroq
+
+from app.ml.features import IncrementalFeatures
+from app.ml.loader import ModelBundle
+from app.schemas.recommendation import UserPreferences
+from app.services.llm import generate_podcast_recommendations, refine_recommendations
+from app.services.result_store import ResultStore
+from app.services.usage import CallUsage
+
+
+def validate_preferences(preferences: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate like the /recommend body; raises pydantic's ValidationError."""
+    return UserPreferences(**preferences).model_dump()
+
+
+class RecommendationSession:
+    def __init__(self, bundle: ModelBundle, client: Optional[AsyncGroq], model: str) -> None:
+        self.bundle = bundle
+        self.client = client
+        self.model = model
+        self.preferences: Dict[str, Any] = {}
+        self.features: Optional[IncrementalFeatures] = None
+        self.segment: Optional[int] = None
+        self.recommendations: List[Dict[str, Any]] = []
+        self.last_usage: Optional[CallUsage] = None
+
+    @property
+    def started(self) -> bool:
+        return self.features is not None
+
+    def _profile(self) -> Dict[str, Any]:
+        return self.bundle.segment_profiles.get(f"Segment_{self.segment}", {})
+
+    def _result(self, changed: List[str], replaced: List[int]) -> Dict[str, Any]:
+        return {
+            "type": "recommendations",
+            "segment": self.segment,
+            "segment_profile": self._profile(),
+            "recommendations": self.recommendations,
+            "changed": changed,
+            "replaced": replaced,
+        }
+
+    async def start(
+        self,
+        preferences: Dict[str, Any],
+        store: Optional[ResultStore] = None,
+        cache_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """(Re)initialize from validated preferences with a full LLM request."""
+        self.preferences = preferences
+        self.features = IncrementalFeatures(self.bundle, preferences)
+        self.segment = self.features.segment
+        self.last_usage = CallUsage(segment=self.segment)
+        self.recommendations = await generate_podcast_recommendations(
+            self.client,
+            preferences,
+            self._profile(),
+            self.model,
+            store=store,
+            cache_key=cache_key,
+            usage=self.last_usage,
+        )
+        return self._result(list(preferences), list(range(len(self.recommendations))))
+
+    async def update(self, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply changed fields and refine the current recommendations.
+
+        Raises pydantic's ValidationError if the merged preferences are
+        invalid; the session is left unchanged in that case.
+        """
+        if self.features is None:
+            raise RuntimeError("session not started")
+        merged = validate_preferences({**self.preferences, **changes})
+        delta = {
+            field: (self.preferences[field], value)
+            for field, value in merged.items()
+            if value != self.preferences[field]
+        }
+        if not delta:
+            self.last_usage = None
+            return self._result([], [])
+
+        for field, (_, value) in delta.items():
+            self.features.update(field, value)
+        segment = self.features.segment
+        segment_changed = segment != self.segment
+        self.preferences, self.segment = merged, segment
+        self.last_usage = CallUsage(segment=segment)
+        self.recommendations, replaced = await refine_recommendations(
+            self.client,
+            merged,
+            self.recommendations,
+            delta,
+            self.model,
+            segment_profile=self._profile() if segment_changed else None,
+            usage=self.last_usage,
+        )
+        return self._result(list(delta), replaced)
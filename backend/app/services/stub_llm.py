@@ -0,0 +1,56 @@
+"""A deterministic stand-in for the Groq client, for replay and load tests.
+
+Enable it with ``LLM_STUB=true`` so a local instance can be driven at
+production-like rates without spending tokens or hitting provider limits.
+It implements the one call the app makes, ``chat.completions.create``, and
+answers after a simulated latency with five well-formed recommendations.
+Latency and content are derived from a hash of the prompt, so the same
+request always takes the same time and gets the same answer.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+
+class StubGroqClient:
+    def __init__(self, latency_ms: float = 800.0, jitter_ms: float = 200.0) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        # Mirror the SDK's attribute chain: client.chat.completions.create().
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, *, messages: List[Dict[str, str]], **kwargs: Any) -> SimpleNamespace:
+        prompt = messages[-1]["content"]
+        digest = hashlib.blake2b(prompt.encode(), digest_size=8).hexdigest()
+        rng = random.Random(digest)
+        delay_ms = max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms))
+        await asyncio.sleep(delay_ms / 1000)
+
+        content = json.dumps(
+            {
+                "recommendations": [
+                    {
+                        "name": f"Stub Podcast {digest[:6]}-{i}",
+                        "creator": f"Stub Creator {i}",
+                        "description": "A stand-in recommendation from the stub LLM client.",
+                        "format": "Interview",
+                        "duration": "Medium (30-60 min)",
+                        "language": "English",
+                        "region": "Global",
+                        "reason": "Generated by the stub client for load testing.",
+                    }
+                    for i in range(1, 6)
+                ]
+            }
+        )
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens, completion_tokens=len(content) // 4
+            ),
+        )
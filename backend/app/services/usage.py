@@ -0,0 +1,205 @@
+"""Token, cost and latency accounting for LLM recommendation calls.
+
+Every ``generate_podcast_recommendations`` call fills in a :class:`CallUsage`
+(tokens from each Groq response's ``usage``, time spent waiting on each Groq
+call, failed or not, retries, follow-up requests, and where the answer
+finally came from). The tracker aggregates those per (segment, model) for
+``GET /metrics/usage``, mirrors the totals into the flat ``/metrics``
+counters, and enforces an optional per-minute token budget: once the last
+60 seconds have used up ``tokens_per_minute``, new requests are answered
+from the result store or the static fallback instead of calling Groq, until
+the window slides on.
+
+Like the metrics registry, all of this is per worker process.
+"""
+
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+WINDOW_SECONDS = 60.0
+
+# Where a request's recommendations came from.
+SOURCE_LLM = "llm"
+SOURCE_CACHE = "cache"
+SOURCE_FALLBACK = "fallback"
+
+
+@dataclass
+class CallUsage:
+    """What one recommendation request cost."""
+
+    segment: Optional[int] = None
+    model: str = ""
+    source: str = SOURCE_LLM
+    fallback_reason: Optional[str] = None
+    llm_calls: int = 0
+    failed_calls: int = 0
+    retries: int = 0  # re-sends after a retryable failure (each also a call)
+    followups: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms: float = 0.0  # summed over this request's Groq calls
+    latency_ms_max: float = 0.0  # slowest single call
+
+    def _add_call(self, latency_seconds: float) -> None:
+        self.llm_calls += 1
+        self.latency_ms += latency_seconds * 1000
+        self.latency_ms_max = max(self.latency_ms_max, latency_seconds * 1000)
+
+    def add_failure(self, latency_seconds: float) -> None:
+        """Account for one chat completion that raised."""
+        self._add_call(latency_seconds)
+        self.failed_calls += 1
+
+    def add_response(self, response: Any, latency_seconds: float) -> None:
+        """Account for one completed chat completion."""
+        self._add_call(latency_seconds)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def cost_usd(self) -> float:
+        return (
+            self.prompt_tokens * settings.llm_prompt_cost_per_million
+            + self.completion_tokens * settings.llm_completion_cost_per_million
+        ) / 1_000_000
+
+    def header_value(self) -> str:
+        """Compact ``key=value`` summary for the debug response header."""
+        parts = [
+            f"source={self.source}",
+            f"model={self.model}",
+            f"calls={self.llm_calls}",
+            f"retries={self.retries}",
+            f"followups={self.followups}",
+            f"prompt_tokens={self.prompt_tokens}",
+            f"completion_tokens={self.completion_tokens}",
+            f"latency_ms={self.latency_ms:.0f}",
+            f"cost_usd={self.cost_usd:.6f}",
+        ]
+        if self.fallback_reason:
+            parts.append(f"fallback_reason={self.fallback_reason}")
+        return "; ".join(parts)
+
+
+@dataclass
+class _Aggregate:
+    requests: int = 0
+    llm_calls: int = 0
+    failed_calls: int = 0
+    retries: int = 0
+    followups: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    # Per Groq call (failed ones included), so avg and max describe the same thing.
+    latency_ms_total: float = 0.0
+    latency_ms_max: float = 0.0
+    sources: Counter = field(default_factory=Counter)
+    fallback_reasons: Counter = field(default_factory=Counter)
+
+
+class UsageTracker:
+    def __init__(self, tokens_per_minute: int = 0) -> None:
+        self.tokens_per_minute = tokens_per_minute
+        self._groups: Dict[Tuple[Optional[int], str], _Aggregate] = {}
+        self._window: Deque[Tuple[float, int]] = deque()
+        self._window_tokens = 0
+
+    # --- budget -------------------------------------------------------------
+
+    def tokens_last_minute(self, now: Optional[float] = None) -> int:
+        cutoff = (time.monotonic() if now is None else now) - WINDOW_SECONDS
+        while self._window and self._window[0][0] <= cutoff:
+            self._window_tokens -= self._window.popleft()[1]
+        return self._window_tokens
+
+    def over_budget(self) -> bool:
+        """True while the per-minute token ceiling is used up (never if unset)."""
+        return bool(self.tokens_per_minute) and self.tokens_last_minute() >= self.tokens_per_minute
+
+    # --- aggregation --------------------------------------------------------
+
+    def record(self, call: CallUsage) -> None:
+        if call.total_tokens:
+            self._window.append((time.monotonic(), call.total_tokens))
+            self._window_tokens += call.total_tokens
+
+        group = self._groups.setdefault((call.segment, call.model), _Aggregate())
+        group.requests += 1
+        group.llm_calls += call.llm_calls
+        group.failed_calls += call.failed_calls
+        group.retries += call.retries
+        group.followups += call.followups
+        group.prompt_tokens += call.prompt_tokens
+        group.completion_tokens += call.completion_tokens
+        group.cost_usd += call.cost_usd
+        group.latency_ms_total += call.latency_ms
+        group.latency_ms_max = max(group.latency_ms_max, call.latency_ms_max)
+        group.sources[call.source] += 1
+        if call.fallback_reason:
+            group.fallback_reasons[call.fallback_reason] += 1
+
+        metrics.incr(f"llm.source.{call.source}")
+        metrics.incr("llm.calls", call.llm_calls)
+        metrics.incr("llm.calls_failed", call.failed_calls)
+        metrics.incr("llm.retries", call.retries)
+        metrics.incr("llm.tokens.prompt", call.prompt_tokens)
+        metrics.incr("llm.tokens.completion", call.completion_tokens)
+        metrics.incr("llm.cost_usd", call.cost_usd)
+        if call.fallback_reason:
+            metrics.incr(f"llm.fallback.{call.fallback_reason}")
+        metrics.set_gauge("llm.budget.tokens_last_minute", self.tokens_last_minute())
+
+    def snapshot(self) -> Dict[str, Any]:
+        groups = []
+        for (segment, model), agg in sorted(
+            self._groups.items(), key=lambda item: (item[0][0] is None, item[0][0] or 0, item[0][1])
+        ):
+            groups.append(
+                {
+                    "segment": segment,
+                    "model": model,
+                    "requests": agg.requests,
+                    "llm_calls": agg.llm_calls,
+                    "failed_calls": agg.failed_calls,
+                    "retries": agg.retries,
+                    "followups": agg.followups,
+                    "prompt_tokens": agg.prompt_tokens,
+                    "completion_tokens": agg.completion_tokens,
+                    "cost_usd": round(agg.cost_usd, 6),
+                    "latency_ms_avg": round(agg.latency_ms_total / agg.llm_calls, 1)
+                    if agg.llm_calls
+                    else 0.0,
+                    "latency_ms_max": round(agg.latency_ms_max, 1),
+                    "sources": dict(agg.sources),
+                    "fallback_reasons": dict(agg.fallback_reasons),
+                }
+            )
+        return {
+            "budget": {
+                "tokens_per_minute": self.tokens_per_minute,
+                "tokens_last_minute": self.tokens_last_minute(),
+                "exhausted": self.over_budget(),
+            },
+            "groups": groups,
+        }
+
+    def reset(self) -> None:
+        self._groups.clear()
+        self._window.clear()
+        self._window_tokens = 0
+
+
+usage_tracker = UsageTracker(tokens_per_minute=settings.llm_tokens_per_minute)
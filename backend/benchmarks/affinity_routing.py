@@ -0,0 +1,249 @@
+"""Benchmark affinity routing against random routing across local replicas.
+
+Run from the backend/ directory:
+
+    python -m benchmarks.affinity_routing --replicas 3 --requests 3000
+
+For each strategy, starts --replicas API processes (stub LLM, each with its
+own result store file so they behave like separate hosts with
+--memory-entries of in-memory cache, trusting the proxy's X-Forwarded-For)
+and ``proxy.py`` in front of them, then sends --requests /recommend calls
+through the proxy from --concurrency clients. Preference combinations are
+drawn from a Zipf(--zipf) distribution over --combinations distinct bodies,
+with the same seed for every strategy. Each request comes from one of
+--users simulated users, each with its own loopback address (127.0.x.y), so
+the replicas' normal RATE_LIMIT applies per user as it would in production.
+
+Reports throughput, latency percentiles, errors and rate-limited (429)
+responses and, from each replica's /metrics, how many requests it served and
+what share came from its in-memory cache, its result store file, or the
+(stub) LLM.
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BASE = {
+    "podcast_frequency": "Several times a week",
+    "podcast_duration": "Medium (30-60 min)",
+    "content_language": "English",
+    "region": "North America",
+    "listening_mood": "Curious",
+}
+AGES = ["18-24", "25-34", "35-44", "45-54", "55+"]
+GENRES = ["Pop", "Rock", "Hip-Hop", "Jazz", "Classical", "Electronic"]
+CONTENT = ["Technology", "Comedy", "True Crime", "Health", "News", "Sports"]
+FORMATS = ["Interview", "Narrative/Storytelling", "Conversational"]
+
+
+def _bodies(count: int, rng: np.random.Generator) -> List[Dict[str, Any]]:
+    combos = list(itertools.product(AGES, GENRES, CONTENT, FORMATS))
+    rng.shuffle(combos)
+    if count > len(combos):
+        raise SystemExit(f"--combinations is at most {len(combos)}")
+    return [
+        {
+            **BASE,
+            "age": age,
+            "music_genre": [genre],
+            "podcast_content": [content],
+            "podcast_format": fmt,
+        }
+        for age, genre, content, fmt in combos[:count]
+    ]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"{url} did not come up within {timeout:g}s")
+
+
+def _start_replicas(args: argparse.Namespace, work: str) -> List[tuple]:
+    replicas = []
+    for i in range(args.replicas):
+        port = _free_port()
+        env = {
+            **os.environ,
+            "LLM_STUB": "true",
+            "LLM_STUB_LATENCY_MS": str(args.stub_latency_ms),
+            "LLM_STUB_JITTER_MS": "0",
+            "RESULT_STORE_PATH": os.path.join(work, f"replica-{i}.sqlite"),
+            "RESULT_STORE_MEMORY_ENTRIES": str(args.memory_entries),
+            "RESULT_STORE_WARM_KEYS": "0",
+            "PYTHONWARNINGS": "ignore",
+        }
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+             "--log-level", "warning", "--forwarded-allow-ips", "127.0.0.1"],
+            cwd=BACKEND_DIR,
+            env=env,
+        )
+        replicas.append((f"http://127.0.0.1:{port}", proc))
+    return replicas
+
+
+def _user_address(user: int) -> str:
+    return f"127.0.{user // 250}.{user % 250 + 2}"
+
+
+async def _load(
+    url: str,
+    bodies: List[Dict[str, Any]],
+    order: np.ndarray,
+    users: np.ndarray,
+    concurrency: int,
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    served: Counter = Counter()
+    statuses: Counter = Counter()
+    cursor = iter(zip(order, users))
+    clients: Dict[int, httpx.AsyncClient] = {}
+
+    def client_for(user: int) -> httpx.AsyncClient:
+        # One client per user, connecting from the user's own address.
+        if user not in clients:
+            transport = httpx.AsyncHTTPTransport(
+                local_address=_user_address(user),
+                limits=httpx.Limits(keepalive_expiry=2.0),  # under uvicorn's 5s
+            )
+            clients[user] = httpx.AsyncClient(base_url=url, timeout=120.0, transport=transport)
+        return clients[user]
+
+    async def client_loop() -> None:
+        for index, user in cursor:
+            started = time.perf_counter()
+            try:
+                response = await client_for(int(user)).post("/recommend", json=bodies[index])
+            except httpx.TransportError:
+                statuses["transport error"] += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+            served[response.headers.get("x-upstream", "?")] += 1
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients.values()))
+    ms = np.array(latencies) * 1000
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "rate_limited": statuses[429],
+        "errors": sum(count for status, count in statuses.items() if status not in (200, 429)),
+        "served": served,
+    }
+
+
+def run(strategy: str, args: argparse.Namespace, bodies, order, users) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="affinity-") as work:
+        replicas = _start_replicas(args, work)
+        proxy_port = _free_port()
+        proxy = subprocess.Popen(
+            [sys.executable, "proxy.py", "--port", str(proxy_port), "--strategy", strategy,
+             "--upstream", ",".join(url for url, _ in replicas)],
+            cwd=BACKEND_DIR,
+        )
+        try:
+            for url, _ in replicas:
+                _wait_ready(f"{url}/health")
+            proxy_url = f"http://127.0.0.1:{proxy_port}"
+            _wait_ready(f"{proxy_url}/proxy/status")
+            result = asyncio.run(_load(proxy_url, bodies, order, users, args.concurrency))
+            result["replicas"] = {}
+            for url, _ in replicas:
+                counters = httpx.get(f"{url}/metrics").json()["counters"]
+                result["replicas"][url] = {
+                    name: counters.get(f"result_store.{name}", 0)
+                    for name in ("memory_hits", "disk_hits", "misses")
+                }
+            return result
+        finally:
+            for proc in [proxy] + [proc for _, proc in replicas]:
+                proc.terminate()
+            for proc in [proxy] + [proc for _, proc in replicas]:
+                proc.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--combinations", type=int, default=300)
+    parser.add_argument(
+        "--users", type=int, default=600, help="Simulated users (client addresses)"
+    )
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of key popularity")
+    parser.add_argument(
+        "--memory-entries", type=int, default=64, help="In-memory result cache size per replica"
+    )
+    parser.add_argument("--stub-latency-ms", type=float, default=50)
+    parser.add_argument("--strategies", default="random,affinity")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    bodies = _bodies(args.combinations, rng)
+    weights = 1.0 / np.arange(1, len(bodies) + 1) ** args.zipf
+    order = rng.choice(len(bodies), size=args.requests, p=weights / weights.sum())
+    users = rng.integers(0, args.users, size=args.requests)
+    print(
+        f"{args.replicas} replicas, {args.requests} requests over {len(set(order.tolist()))} "
+        f"combinations from {len(set(users.tolist()))} users, concurrency {args.concurrency}"
+    )
+    for strategy in args.strategies.split(","):
+        r = run(strategy, args, bodies, order, users)
+        totals = Counter()
+        print(
+            f"\n{strategy}: {r['throughput']:.0f} req/s, p50 {r['p50_ms']:.1f} ms, "
+            f"p99 {r['p99_ms']:.1f} ms, {r['rate_limited']} rate-limited, {r['errors']} errors"
+        )
+        print(f"  {'replica':<24} {'served':>7} {'memory':>8} {'store':>8} {'LLM':>8}")
+        for url, counts in r["replicas"].items():
+            totals.update(counts)
+            lookups = sum(counts.values()) or 1
+            print(
+                f"  {url:<24} {r['served'][url]:>7} {counts['memory_hits'] / lookups:>8.1%} "
+                f"{counts['disk_hits'] / lookups:>8.1%} {counts['misses'] / lookups:>8.1%}"
+            )
+        lookups = sum(totals.values()) or 1
+        print(
+            f"  {'all':<24} {sum(r['served'].values()):>7} "
+            f"{totals['memory_hits'] / lookups:>8.1%} {totals['disk_hits'] / lookups:>8.1%} "
+            f"{totals['misses'] / lookups:>8.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
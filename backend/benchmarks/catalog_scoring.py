@@ -0,0 +1,104 @@
+"""Benchmark catalog top-k scoring against a synthetic catalog.
+
+Run from the backend/ directory:
+
+    python -m benchmarks.catalog_scoring --size 1000000
+
+Builds a random catalog over the same vocabularies the frontend offers,
+then reports load time and per-query latency percentiles, and checks the
+bucketed top-k against a brute-force full-catalog ranking.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.ml.catalog import POPULARITY_WEIGHT, PodcastCatalog
+
+GENRES = [
+    "Science & Technology", "Business & Finance", "Art & Culture", "News & Politics",
+    "Health & Wellness", "Education", "Entertainment", "Sports", "True Crime", "History",
+    "Philosophy", "Comedy",
+]
+FORMATS = [
+    "Interview", "Solo", "Panel discussion", "Narrative/Storytelling", "Educational",
+    "News/Current events",
+]
+DURATIONS = ["Short (< 30 min)", "Medium (30-60 min)", "Long (> 60 min)"]
+LANGUAGES = [
+    "English", "Spanish", "French", "German", "Mandarin", "Hindi", "Japanese", "Korean",
+    "Portuguese", "Russian", "Arabic", "Italian",
+]
+REGIONS = [
+    "North America", "Europe", "Asia", "South America", "Africa", "Australia/Oceania", "Global",
+]
+
+
+def synthetic_catalog(size: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "name": [f"Podcast {i}" for i in range(size)],
+            "creator": [f"Creator {i % 5000}" for i in range(size)],
+            "description": "",
+            "genre": rng.choice(GENRES, size),
+            "format": rng.choice(FORMATS, size),
+            "duration": rng.choice(DURATIONS, size),
+            "language": rng.choice(LANGUAGES, size, p=[0.5] + [0.5 / 11] * 11),
+            "region": rng.choice(REGIONS, size),
+            "popularity": rng.random(size),
+        }
+    )
+
+
+def random_preferences(rng: np.random.Generator) -> dict:
+    return {
+        "podcast_content": list(rng.choice(GENRES, 2, replace=False)),
+        "podcast_format": rng.choice(FORMATS),
+        "podcast_duration": rng.choice(DURATIONS),
+        "content_language": rng.choice(LANGUAGES),
+        "region": rng.choice(REGIONS),
+    }
+
+
+def brute_force_top_k(catalog: PodcastCatalog, prefs: dict, k: int) -> np.ndarray:
+    weights = catalog._attribute_weights(prefs, {})
+    scores = np.zeros(len(catalog), dtype=np.float32)
+    for attr, w in zip(("genre", "format", "duration", "language", "region"), weights):
+        scores += w[catalog.codes[attr]]
+    scores += POPULARITY_WEIGHT * catalog.popularity
+    return np.lexsort((np.arange(len(catalog)), -scores))[:k]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    df = synthetic_catalog(args.size)
+    start = time.perf_counter()
+    catalog = PodcastCatalog.from_frame(df)
+    print(f"load: {time.perf_counter() - start:.2f}s for {len(catalog):,} podcasts "
+          f"({len(catalog.combos):,} combinations)")
+
+    rng = np.random.default_rng(1)
+    timings = []
+    for _ in range(args.queries):
+        prefs = random_preferences(rng)
+        start = time.perf_counter()
+        catalog.top_k(prefs, {}, args.k)
+        timings.append((time.perf_counter() - start) * 1000)
+    p50, p99 = np.percentile(timings, [50, 99])
+    print(f"top_k: p50={p50:.3f}ms p99={p99:.3f}ms over {args.queries} queries")
+
+    prefs = random_preferences(rng)
+    assert list(catalog.top_k(prefs, {}, args.k)) == list(brute_force_top_k(catalog, prefs, args.k))
+    print("top_k matches brute-force ranking")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark the fast UserPreferences decoder against plain pydantic.
+
+Run from the backend/ directory:
+
+    python -m benchmarks.decode_preferences
+
+Times decoding a raw JSON body into normalized preference dicts, with one
+preferences object per body and with 10,000 per body (a JSON array). The
+pydantic side is what FastAPI does for a model body parameter: json.loads,
+validate, then model_dump() as the endpoint does.
+"""
+
+import json
+import timeit
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.schemas.fast_decode import decode_preferences, decode_preferences_list
+from app.schemas.recommendation import UserPreferences
+
+BODY = {
+    "age": "25-34",
+    "music_genre": ["Pop", "Rock"],
+    "podcast_frequency": "Several times a week",
+    "podcast_duration": "Medium (30-60 min)",
+    "podcast_format": "Interview",
+    "podcast_content": ["Science & Technology", "History"],
+    "content_language": "English",
+    "region": "Global",
+    "listening_mood": "Learn Something New",
+}
+
+
+def _report(label: str, pydantic_fn, fast_fn, number: int) -> None:
+    slow = min(timeit.repeat(pydantic_fn, number=number, repeat=5)) / number
+    fast = min(timeit.repeat(fast_fn, number=number, repeat=5)) / number
+    print(
+        f"{label:>10}: pydantic {slow * 1e6:10.1f}us  fast {fast * 1e6:10.1f}us  "
+        f"speedup {slow / fast:4.1f}x"
+    )
+
+
+def main() -> None:
+    for label, body in (
+        ("lists", BODY),
+        ("csv strings", {**BODY, "podcast_content": "Science & Technology, History"}),
+    ):
+        print(f"-- list fields as {label}")
+        _run(body)
+
+
+def _run(body: dict) -> None:
+    single = json.dumps(body).encode()
+    _report(
+        "1 item",
+        lambda: UserPreferences.model_validate(json.loads(single)).model_dump(),
+        lambda: decode_preferences(single),
+        number=20_000,
+    )
+
+    batch = json.dumps([body] * 10_000).encode()
+    list_adapter = TypeAdapter(List[UserPreferences])
+    _report(
+        "10k items",
+        lambda: [p.model_dump() for p in list_adapter.validate_python(json.loads(batch))],
+        lambda: decode_preferences_list(batch),
+        number=5,
+    )
+
+
+if __name__ == "__main__":
+    main()
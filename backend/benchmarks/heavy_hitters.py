@@ -0,0 +1,68 @@
+"""Benchmark the heavy-hitter sketch's per-update cost and accuracy.
+
+Run from the backend/ directory:
+
+    python -m benchmarks.heavy_hitters --updates 1000000
+
+Feeds a Zipf-distributed stream of preference keys (as the request path
+would) and reports the amortized cost per ``add`` (buffer append plus the
+batched numpy fold), then compares the sketch's top-k and top-N coverage
+with exact counts.
+"""
+
+import argparse
+import hashlib
+import time
+from collections import Counter
+
+import numpy as np
+
+from app.services.heavy_hitters import CountMinTopK
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=50_000)
+    parser.add_argument("--zipf", type=float, default=1.2)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    keys = [
+        hashlib.blake2b(str(i).encode(), digest_size=16).hexdigest() for i in range(args.distinct)
+    ]
+    rng = np.random.default_rng(0)
+    ranks = np.minimum(rng.zipf(args.zipf, args.updates), args.distinct) - 1
+    segments = rng.integers(0, 3, args.updates)
+    stream = [(keys[r], int(s)) for r, s in zip(ranks.tolist(), segments.tolist())]
+
+    sketch = CountMinTopK()
+    add = sketch.add
+    start = time.perf_counter()
+    for key, segment in stream:
+        add(key, segment)
+    sketch.flush()
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key, segment in stream:
+        pass
+    loop = time.perf_counter() - start
+    per_update = (elapsed - loop) / args.updates
+    print(f"{args.updates:,} updates: {per_update * 1e9:.0f} ns/update (amortized)")
+
+    exact = Counter(stream)
+    true_top = [item for item, _ in exact.most_common(args.top)]
+    found = [(key, segment) for key, segment, _ in sketch.top_n(args.top)]
+    recall = len(set(found) & set(true_top)) / args.top
+    true_coverage = sum(c for _, c in exact.most_common(args.top)) / args.updates
+    worst = max(count - exact[(key, seg)] for key, seg, count in sketch.top_n(args.top))
+    print(f"top-{args.top} recall: {recall:.0%}; max overcount in top: {worst}")
+    print(
+        f"top-{args.top} coverage: sketch {sketch.coverage(args.top):.4f}, "
+        f"exact {true_coverage:.4f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
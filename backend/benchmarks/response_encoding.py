@@ -0,0 +1,79 @@
+"""Benchmark /recommend response encodings: JSON (pydantic) vs MessagePack vs CBOR.
+
+Run from the backend/ directory:
+
+    python -m benchmarks.response_encoding
+
+Uses the shipped model bundle's largest segment profile and five catalog
+recommendations. The JSON side is what FastAPI does for the endpoint's
+``response_model``: validate the returned model, ``jsonable_encoder`` it and
+render a JSONResponse. The binary sides encode the plain recommendation
+dicts and splice in the pre-encoded segment profile, as the endpoint does.
+"""
+
+import asyncio
+import gzip
+import timeit
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from app.core.config import settings
+from app.core.negotiation import CBOR, MSGPACK, encode, encode_map
+from app.main import app
+from app.ml.loader import load_model_bundle
+from app.schemas.recommendation import RecommendationResponse
+from app.services.llm import normalize_recommendations
+
+PREFS = {
+    "age": "25-34",
+    "music_genre": ["Pop", "Rock"],
+    "podcast_frequency": "Several times a week",
+    "podcast_duration": "Medium (30-60 min)",
+    "podcast_format": "Interview",
+    "podcast_content": ["Science & Technology", "History"],
+    "content_language": "English",
+    "region": "Global",
+    "listening_mood": "Curious",
+}
+
+
+def _response_field():
+    for route in app.routes:
+        if getattr(route, "path", None) == "/recommend":
+            return route.response_field
+    raise RuntimeError("/recommend route not found")
+
+
+def main() -> None:
+    bundle = load_model_bundle(settings.model_dir)
+    profile = max(bundle.segment_profiles.values(), key=lambda p: len(str(p)))
+    recs = normalize_recommendations(bundle.catalog.recommend(PREFS, profile), PREFS)
+    field = _response_field()
+    loop = asyncio.new_event_loop()
+
+    def as_json() -> bytes:
+        model = RecommendationResponse(segment_profile=profile, recommendations=recs)
+        content = loop.run_until_complete(serialize_response(field=field, response_content=model))
+        return JSONResponse(content).body
+
+    encoders = {"json (pydantic)": as_json}
+    for media_type in (MSGPACK, CBOR):
+        encoded_profile = encode(media_type, profile)  # once per bundle in the server
+        encoders[media_type] = lambda m=media_type, p=encoded_profile: encode_map(
+            m, {"recommendations": recs}, {"segment_profile": p}
+        )
+
+    print(f"{'encoding':>20} {'bytes':>7} {'gzip':>6} {'encode':>10}")
+    for label, fn in encoders.items():
+        body = fn()
+        number = 2000
+        seconds = min(timeit.repeat(fn, number=number, repeat=5)) / number
+        print(
+            f"{label:>20} {len(body):7d} {len(gzip.compress(body)):6d} "
+            f"{seconds * 1e6:8.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark request-path latency under N worker processes x M native threads.
+
+Run from the backend/ directory:
+
+    python -m benchmarks.thread_topology --workers 1,2,4 --threads 1,4 --seconds 5
+
+For every (workers, threads) pair, starts that many processes at once, caps
+each one's BLAS/OpenMP pools with :func:`app.core.threads.apply_thread_limits`
+(as a uvicorn worker does at startup) and has each run the CPU part of a
+/recommend call (``prepare_features`` + ``KMeans.predict``) in a closed loop.
+Reports per-call latency percentiles across all workers and the combined
+throughput. Oversubscription (workers x threads > cores) shows up in p99.
+"""
+
+import argparse
+import multiprocessing as mp
+import time
+import warnings
+from typing import List
+
+import numpy as np
+
+PREFS = {
+    "age": "25-34",
+    "music_genre": ["Pop", "Rock"],
+    "podcast_frequency": "Several times a week",
+    "podcast_duration": "Medium (30-60 min)",
+    "podcast_format": "Interview",
+    "podcast_content": ["Technology", "Educational"],
+}
+
+
+def _worker(threads: int, seconds: float, batch: int, barrier, results) -> None:
+    warnings.filterwarnings("ignore")
+    from app.core.config import settings
+    from app.core.threads import apply_thread_limits
+    from app.ml.features import prepare_feature_matrix, prepare_features
+    from app.ml.loader import load_model_bundle
+
+    bundle = load_model_bundle(settings.model_dir)
+    apply_thread_limits(native_threads=threads, threadpool_tokens=0)
+    if batch > 1:
+        import pandas as pd
+
+        frame = pd.DataFrame([PREFS] * batch)
+
+        def call():
+            return bundle.kmeans_model.predict(prepare_feature_matrix(bundle, frame))
+    else:
+
+        def call():
+            return bundle.kmeans_model.predict(prepare_features(bundle, PREFS))
+
+    for _ in range(20):
+        call()
+    latencies: List[float] = []
+    barrier.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - started)
+    results.put(latencies)
+
+
+def run(workers: int, threads: int, seconds: float, batch: int) -> dict:
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_worker, args=(threads, seconds, batch, barrier, results))
+        for _ in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    latencies = np.concatenate([np.array(results.get()) for _ in procs]) * 1000
+    for proc in procs:
+        proc.join()
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return {
+        "workers": workers,
+        "threads": threads,
+        "calls": len(latencies),
+        "throughput": len(latencies) / seconds,
+        "p50_ms": p50,
+        "p99_ms": p99,
+        "max_ms": latencies.max(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated process counts")
+    parser.add_argument("--threads", default="1,4", help="Comma-separated native thread caps")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument(
+        "--batch", type=int, default=1, help="Rows per call (1 = the /recommend path)"
+    )
+    args = parser.parse_args()
+
+    from app.core.threads import usable_cpus
+
+    print(f"{usable_cpus()} usable CPUs; {args.batch} row(s) per call")
+    print(f"{'workers':>7} {'threads':>7} {'calls/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for workers in map(int, args.workers.split(",")):
+        for threads in map(int, args.threads.split(",")):
+            r = run(workers, threads, args.seconds, args.batch)
+            print(
+                f"{r['workers']:>7} {r['threads']:>7} {r['throughput']:>9.0f} "
+                f"{r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['max_ms']:>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
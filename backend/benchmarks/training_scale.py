@@ -0,0 +1,64 @@
+"""Benchmark the full training pipeline on synthetic surveys of growing size.
+
+Run from the backend/ directory:
+
+    python -m benchmarks.training_scale --sizes 1000,100000,1000000
+
+For each size, writes a synthetic survey (``python train.py synth``: fitted
+to the survey CSV when present, otherwise to models/segment_profiles.json),
+then runs ``python train.py`` on it in a fresh process, so peak RSS is per
+size. Prints the wall time and heap peak of every stage from the resulting
+training_report.json. Reports are kept in --out for later comparison.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(*args: str) -> None:
+    subprocess.run(
+        [sys.executable, "train.py", *args], cwd=BACKEND_DIR, check=True, capture_output=True
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated row counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--load-model", help="Saved synthetic survey model (JSON) to use")
+    parser.add_argument("--out", default=tempfile.mkdtemp(prefix="training-scale-"))
+    args = parser.parse_args()
+
+    print(f"Reports in {args.out}")
+    header = None
+    for rows in map(int, args.sizes.split(",")):
+        work = os.path.join(args.out, str(rows))
+        os.makedirs(work, exist_ok=True)
+        data = os.path.join(work, "survey.csv")
+        synth = ["synth", data, "--rows", str(rows), "--seed", str(args.seed)]
+        _run(*synth, *(["--load-model", args.load_model] if args.load_model else []))
+        _run("train", "--data", data, "--model-dir", os.path.join(work, "models"))
+        with open(os.path.join(work, "models", "training_report.json")) as f:
+            report = json.load(f)
+
+        stages = report["stages"]
+        if header is None:
+            header = [stage["name"] for stage in stages]
+            print(f"{'rows':>10} " + " ".join(f"{name[:22]:>22}" for name in header), end="")
+            print(f" {'total s':>8} {'peak RSS MiB':>12}")
+        cells = [
+            f"{stage['wall_seconds']:>8.3f}s {stage['heap_peak_bytes'] / 2**20:>8.1f}MiB"
+            for stage in stages
+        ]
+        print(f"{rows:>10} " + " ".join(f"{cell:>22}" for cell in cells), end="")
+        print(f" {report['total_wall_seconds']:>8.2f} {report['peak_rss_bytes'] / 2**20:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Reference front proxy routing /recommend traffic by preference affinity.
+
+Run from the backend/ directory in front of several API replicas:
+
+    python proxy.py --upstream http://127.0.0.1:8001,http://127.0.0.1:8002 --port 8000
+
+Requests for the same preference combination go to the same replica
+(consistent hashing with bounded loads), so each replica's in-memory result
+cache sees a fixed share of the combinations instead of all of them. A
+replica that refuses connections or sheds a request is skipped for a few
+seconds and the request retried on the next one. Start the replicas with
+``--forwarded-allow-ips=<this proxy's address>`` so their per-client rate
+limits see the user's address, not the proxy's. ``GET /proxy/status`` shows
+in-flight requests per replica and the routing counters. See
+app/services/affinity.py; compare against random routing with
+``python -m benchmarks.affinity_routing``.
+"""
+
+import argparse
+
+import uvicorn
+
+from app.core.logging import configure_logging
+from app.services.affinity import create_proxy
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--upstream", required=True, help="Comma-separated replica base URLs"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--strategy",
+        choices=("affinity", "random"),
+        default="affinity",
+        help="random spreads requests uniformly (the baseline to compare against)",
+    )
+    parser.add_argument(
+        "--load-factor",
+        type=float,
+        default=1.25,
+        help="Spill a key to the next replica once its own exceeds this x average in-flight",
+    )
+    parser.add_argument(
+        "--cooldown", type=float, default=5.0, help="Seconds to skip a failed replica"
+    )
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    configure_logging()
+    proxy = create_proxy(
+        [u.strip() for u in args.upstream.split(",") if u.strip()],
+        strategy=args.strategy,
+        load_factor=args.load_factor,
+        cooldown_seconds=args.cooldown,
+    )
+    uvicorn.run(proxy, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Replay captured /recommend traffic and report latency distributions.
+
+Run from the backend/ directory against a capture written with
+CAPTURE_PATH set (see app/services/capture.py):
+
+    python replay.py capture.jsonl                  # in-process app, stub LLM
+    python replay.py capture.jsonl --speed 4        # 4x the recorded rate
+    python replay.py capture.jsonl --speed 0        # as fast as possible
+    python replay.py capture.jsonl --target http://127.0.0.1:8000
+
+Requests are sent with the recorded inter-arrival times (divided by
+--speed), mode and Accept type, so cache hit rates and queueing match what
+production saw. By default the app runs in-process with the deterministic
+stub LLM client and rate limiting off. With --target, start that instance
+with LLM_STUB=true and a RATE_LIMIT high enough for the replay.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from app.core.logging import configure_logging
+from app.services.capture import read_capture
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+async def replay(
+    records: List[Dict[str, Any]], client: httpx.AsyncClient, speed: float = 1.0
+) -> List[Dict[str, Any]]:
+    """Send every record on its (scaled) schedule; return one result per request."""
+    if not records:
+        return []
+    loop = asyncio.get_running_loop()
+    origin, start = records[0]["t"], loop.time()
+    results: List[Dict[str, Any]] = []
+
+    async def send(record: Dict[str, Any], due: float) -> None:
+        sent = loop.time()
+        try:
+            response = await client.post(
+                "/recommend",
+                params={"mode": record.get("mode", "llm")},
+                json=record["body"],
+                headers={"Accept": record.get("accept", "application/json")},
+            )
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        results.append(
+            {
+                "mode": record.get("mode", "llm"),
+                "status": status,
+                "latency_ms": (loop.time() - sent) * 1000,
+                "schedule_lag_ms": (sent - due) * 1000,
+                "recorded_latency_ms": record.get("latency_ms"),
+            }
+        )
+
+    tasks = []
+    for record in records:
+        due = start + ((record["t"] - origin) / speed if speed > 0 else 0.0)
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(record, due)))
+    await asyncio.gather(*tasks)
+    return results
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    points = np.percentile(values, PERCENTILES)
+    summary = {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, points)}
+    summary["max"] = round(max(values), 2)
+    return summary
+
+
+def summarize(results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    ok = [r for r in results if r["status"] == 200]
+    recorded = [r["recorded_latency_ms"] for r in ok if r["recorded_latency_ms"] is not None]
+    return {
+        "requests": len(results),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "statuses": dict(Counter(str(r["status"]) for r in results)),
+        "latency_ms": _percentiles([r["latency_ms"] for r in ok]),
+        "latency_ms_by_mode": {
+            mode: _percentiles([r["latency_ms"] for r in ok if r["mode"] == mode])
+            for mode in sorted({r["mode"] for r in ok})
+        },
+        "recorded_latency_ms": _percentiles(recorded),
+        "max_schedule_lag_ms": round(max((r["schedule_lag_ms"] for r in results), default=0), 2),
+    }
+
+
+async def _timed_replay(
+    records: List[Dict[str, Any]], client: httpx.AsyncClient, speed: float
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    results = await replay(records, client, speed)
+    return summarize(results, time.perf_counter() - started)
+
+
+async def _run_in_process(
+    records: List[Dict[str, Any]], speed: float, stub_latency_ms: float
+) -> Dict[str, Any]:
+    from app.core.config import settings
+    from app.core.limiter import limiter
+    from app.main import app
+
+    settings.llm_stub = True
+    settings.llm_stub_latency_ms = stub_latency_ms
+    settings.llm_stub_jitter_ms = stub_latency_ms / 4
+    settings.capture_path = ""
+    limiter.enabled = False
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+            return await _timed_replay(records, client, speed)
+
+
+async def _run_against(
+    records: List[Dict[str, Any]], speed: float, target: str, timeout: float
+) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(base_url=target, timeout=timeout, limits=limits) as client:
+        return await _timed_replay(records, client, speed)
+
+
+def run(
+    capture: str,
+    speed: float = 1.0,
+    target: Optional[str] = None,
+    limit: Optional[int] = None,
+    timeout: float = 60.0,
+    stub_latency_ms: float = 800.0,
+) -> Dict[str, Any]:
+    records = read_capture(capture)[:limit]
+    if target:
+        return asyncio.run(_run_against(records, speed, target, timeout))
+    return asyncio.run(_run_in_process(records, speed, stub_latency_ms))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Replay captured /recommend traffic.")
+    parser.add_argument("capture", help="Capture file (JSON lines) written via CAPTURE_PATH")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="Time compression factor (0 = no delays)"
+    )
+    parser.add_argument("--target", help="Base URL of a running instance (default: in-process)")
+    parser.add_argument("--limit", type=int, help="Replay only the first N records")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout (s)")
+    parser.add_argument(
+        "--stub-latency-ms",
+        type=float,
+        default=800.0,
+        help="In-process stub LLM latency (+/- 25%% jitter)",
+    )
+    parser.add_argument("--report", help="Also write the summary as JSON to this path")
+    return parser
+
+
+def main() -> None:
+    configure_logging()
+    # One log line per replayed request would drown the summary.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    args = build_parser().parse_args()
+    summary = run(
+        args.capture,
+        speed=args.speed,
+        target=args.target,
+        limit=args.limit,
+        timeout=args.timeout,
+        stub_latency_ms=args.stub_latency_ms,
+    )
+    print(json.dumps(summary, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,15 @@
 import httpx
 import pytest_asyncio
 
+from app.core.limiter import limiter
 from app.main import app
 
 
 @pytest_asyncio.fixture
 async def client():
     """An HTTP client bound to the app, with the lifespan (model load) run."""
+    # Rate-limit counters are process-global; don't let earlier tests leak in.
+    limiter.reset()
     async with app.router.lifespan_context(app):
         transport = httpx.ASGITransport(app=app)
         async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
@@ -0,0 +1,101 @@
+"""Tests for the admin-only profiling endpoints."""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.core.profiling import profiler
+from tests.test_recommend import VALID_BODY
+
+TOKEN = "test-admin-token"
+
+
+@pytest.fixture
+def admin(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "admin_token", TOKEN)
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+    return client
+
+
+async def _wait_until_idle():
+    for _ in range(200):
+        if not profiler.armed:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("profiler did not finish")
+
+
+async def test_admin_disabled_without_token(client):
+    response = await client.post("/admin/profile", json={"seconds": 1})
+    assert response.status_code == 404
+
+
+async def test_admin_rejects_wrong_token(admin):
+    response = await admin.get("/admin/profile", headers={"X-Admin-Token": "nope"})
+    assert response.status_code == 403
+
+
+async def test_profile_requires_exactly_one_window(admin):
+    headers = {"X-Admin-Token": TOKEN}
+    response = await admin.post("/admin/profile", json={}, headers=headers)
+    assert response.status_code == 422
+    response = await admin.post("/admin/profile", json={"requests": 1, "seconds": 1}, headers=headers)
+    assert response.status_code == 422
+
+
+async def test_time_window_profile_writes_folded_stacks(admin):
+    headers = {"X-Admin-Token": TOKEN}
+    response = await admin.post(
+        "/admin/profile", json={"seconds": 0.1, "interval_ms": 1}, headers=headers
+    )
+    assert response.status_code == 202
+    assert (await admin.post("/admin/profile", json={"seconds": 1}, headers=headers)).status_code == 409
+
+    deadline = time.monotonic() + 0.15
+    while time.monotonic() < deadline:  # keep the event-loop thread busy
+        sum(range(1000))
+    await _wait_until_idle()
+
+    status = (await admin.get("/admin/profile", headers=headers)).json()
+    assert status["running"] is False
+    assert status["samples"] > 0
+    with open(status["output"]) as f:
+        lines = f.read().splitlines()
+    assert any("test_time_window_profile_writes_folded_stacks" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+async def test_request_count_profile_ends_at_max_seconds_without_traffic(tmp_path):
+    profiler.start(str(tmp_path), requests=5, interval_ms=1, max_seconds=0.05)
+    await _wait_until_idle()
+
+    assert profiler.status()["remaining_requests"] == 5
+    assert profiler.status()["output"].endswith(".folded")
+
+
+async def test_failed_write_disarms_the_profiler(tmp_path):
+    path = profiler.start(str(tmp_path), seconds=0.02, interval_ms=1)
+    os.mkdir(path)  # opening the output for writing now fails
+    await _wait_until_idle()
+
+    assert profiler.status()["output"] is None
+    with profiler.track_request():
+        assert profiler._in_flight == 0
+    profiler.start(str(tmp_path / "again"), seconds=0.01, interval_ms=1)
+    await _wait_until_idle()
+
+
+async def test_request_count_profile_stops_after_n_requests(admin):
+    headers = {"X-Admin-Token": TOKEN}
+    response = await admin.post("/admin/profile", json={"requests": 1}, headers=headers)
+    assert response.json()["remaining_requests"] == 1
+
+    assert (await admin.post("/recommend", json=VALID_BODY)).status_code == 200
+    await _wait_until_idle()
+
+    status = (await admin.get("/admin/profile", headers=headers)).json()
+    assert status["remaining_requests"] == 0
+    assert status["output"].endswith(".folded")
@@ -0,0 +1,185 @@
+"""Tests for the preference-affinity routing proxy."""
+
+import json
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from app.services.affinity import AffinityProxy, AffinityRouter, HashRing, routing_key
+from app.services.prefkey import preference_key
+from tests.test_recommend import VALID_BODY
+
+NODES = ["http://a", "http://b", "http://c"]
+
+
+def _replica(name, shed=False):
+    async def recommend(request: Request):
+        if shed:
+            return JSONResponse({"detail": "overloaded"}, status_code=503)
+        return JSONResponse(
+            {
+                "replica": name,
+                "body": await request.json(),
+                "client": request.client.host,
+                "forwarded_for": request.headers.getlist("x-forwarded-for"),
+            }
+        )
+
+    async def submit(request: Request):
+        return JSONResponse(
+            {"replica": name}, status_code=202, headers={"Location": f"/recommend/jobs/job-{name[-1]}"}
+        )
+
+    async def job(request: Request):
+        return JSONResponse({"replica": name, "id": request.path_params["job_id"]})
+
+    return Starlette(
+        routes=[
+            Route("/recommend", recommend, methods=["POST"]),
+            Route("/recommend/jobs", submit, methods=["POST"]),
+            Route("/recommend/jobs/{job_id}", job),
+        ]
+    )
+
+
+class _Refused(httpx.AsyncBaseTransport):
+    async def handle_async_request(self, request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+
+class _Raises(httpx.AsyncBaseTransport):
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    async def handle_async_request(self, request):
+        self.calls += 1
+        raise self.error("upstream failed", request=request)
+
+
+def _proxy(transports, client_host="127.0.0.1", **options):
+    router = AffinityRouter(list(transports), **options)
+    upstream = httpx.AsyncClient(mounts=dict(transports))
+    proxy = AffinityProxy(router, client=upstream)
+    transport = httpx.ASGITransport(app=proxy, client=(client_host, 123))
+    client = httpx.AsyncClient(transport=transport, base_url="http://proxy")
+    return router, client
+
+
+def _asgi(app):
+    return httpx.ASGITransport(app=app)
+
+
+def _owner(key, nodes=NODES):
+    return next(HashRing(nodes).walk(key))
+
+
+def test_ring_moves_only_the_removed_nodes_keys():
+    keys = [f"key-{i}" for i in range(2000)]
+    before = {key: _owner(key) for key in keys}
+    after = {key: _owner(key, NODES[:2]) for key in keys}
+    moved = [key for key in keys if before[key] != after[key]]
+    assert moved and all(before[key] == "http://c" for key in moved)
+    shares = [list(before.values()).count(node) / len(keys) for node in NODES]
+    assert min(shares) > 0.2
+
+
+def test_bounded_load_spills_to_the_next_replica():
+    router = AffinityRouter(NODES, load_factor=1.0)
+    primary, second, _ = HashRing(NODES).walk("hot")
+    assert router.candidates("hot")[0] == primary
+    router.in_flight[primary] = 5
+    assert router.candidates("hot")[0] == second
+
+
+def test_routing_key_matches_the_servers_canonical_key():
+    reordered = {**VALID_BODY, "music_genre": ", ".join(reversed(VALID_BODY["music_genre"]))}
+    key = routing_key("POST", "/recommend", json.dumps(reordered).encode())
+    assert key == preference_key(VALID_BODY)
+    assert routing_key("POST", "/recommend", b"{not json") is None
+    assert routing_key("GET", "/segments", b"") is None
+
+
+async def test_same_preferences_reach_the_same_replica():
+    router, client = _proxy({node: _asgi(_replica(node)) for node in NODES})
+    async with client:
+        replicas = set()
+        for genres in (["Pop", "Rock"], ["Rock", "Pop"], ["Pop", "Rock", "Pop"]):
+            response = await client.post("/recommend", json={**VALID_BODY, "music_genre": genres})
+            assert response.status_code == 200
+            assert response.json()["body"]["music_genre"] == genres
+            replicas.add(response.headers["x-upstream"])
+    assert replicas == {_owner(preference_key(VALID_BODY))}
+    assert router.in_flight == {node: 0 for node in NODES}
+
+
+@pytest.mark.parametrize("failure", ["refused", "shed"])
+async def test_fails_over_to_the_next_replica(failure):
+    primary, second, _ = HashRing(NODES).walk(preference_key(VALID_BODY))
+    broken = _Refused() if failure == "refused" else _asgi(_replica(primary, shed=True))
+    transports = {node: _asgi(_replica(node)) for node in NODES}
+    transports[primary] = broken
+    router, client = _proxy(transports)
+    async with client:
+        response = await client.post("/recommend", json=VALID_BODY)
+    assert response.status_code == 200
+    assert response.headers["x-upstream"] == second
+    assert router.snapshot()["upstreams"][primary]["down_for"] > 0
+
+
+async def test_no_replica_reachable_is_a_502():
+    _, client = _proxy({node: _Refused() for node in NODES})
+    async with client:
+        response = await client.post("/recommend", json=VALID_BODY)
+    assert response.status_code == 502
+
+
+@pytest.mark.parametrize(
+    "error, status", [(httpx.ReadTimeout, 504), (httpx.RemoteProtocolError, 502)]
+)
+async def test_failure_after_connecting_is_not_retried(error, status):
+    primary = _owner(preference_key(VALID_BODY))
+    failing = _Raises(error)
+    transports = {node: _asgi(_replica(node)) for node in NODES}
+    transports[primary] = failing
+    router, client = _proxy(transports)
+    async with client:
+        response = await client.post("/recommend", json=VALID_BODY)
+    assert response.status_code == status
+    assert failing.calls == 1
+    assert router.in_flight == {node: 0 for node in NODES}
+
+
+async def test_replicas_see_the_original_client_address():
+    # What uvicorn does on a replica run with --forwarded-allow-ips=<proxy>.
+    transports = {
+        node: _asgi(ProxyHeadersMiddleware(_replica(node), trusted_hosts="127.0.0.1"))
+        for node in NODES
+    }
+    hosts = set()
+    for user in ("10.0.0.1", "10.0.0.2"):
+        _, client = _proxy(transports, client_host=user)
+        async with client:
+            response = await client.post(
+                "/recommend", json=VALID_BODY, headers={"X-Forwarded-For": "6.6.6.6"}
+            )
+        body = response.json()
+        # One header, the proxy's client last, so a spoofed entry isn't picked.
+        assert body["forwarded_for"] == [f"6.6.6.6, {user}"]
+        hosts.add(body["client"])
+    assert hosts == {"10.0.0.1", "10.0.0.2"}
+
+
+async def test_job_polls_follow_the_accepting_replica():
+    _, client = _proxy({node: _asgi(_replica(node)) for node in NODES})
+    async with client:
+        submitted = await client.post("/recommend/jobs", json=VALID_BODY)
+        assert submitted.status_code == 202
+        polled = await client.get(submitted.headers["location"])
+    assert polled.headers["x-upstream"] == submitted.headers["x-upstream"]
+    assert polled.json()["id"] == submitted.headers["location"].rsplit("/", 1)[1]
@@ -0,0 +1,50 @@
+"""Tests for the offline bulk segment-scoring pipeline."""
+
+import pandas as pd
+
+from app.core.config import settings
+from app.ml.batch_score import score_chunk, score_file
+from app.ml.loader import load_model_bundle
+
+ROWS = [
+    {
+        "user_id": f"u{i}",
+        "age": ["18-24", "25-34", "55+"][i % 3],
+        "music_genre": "Pop, Rock",
+        "podcast_frequency": "Daily",
+        "podcast_duration": "Medium (30-60 min)",
+        "podcast_format": "Interview",
+        "podcast_content": "Technology",
+    }
+    for i in range(25)
+]
+
+
+def _expected():
+    return list(score_chunk(load_model_bundle(settings.model_dir), pd.DataFrame(ROWS)))
+
+
+def test_inline_scoring_streams_in_order(tmp_path):
+    src, dst = tmp_path / "in.csv", tmp_path / "out.csv"
+    pd.DataFrame(ROWS).to_csv(src, index=False)
+
+    total = score_file(
+        settings.model_dir, str(src), str(dst), chunksize=7, workers=1, id_column="user_id"
+    )
+
+    out = pd.read_csv(dst)
+    assert total == len(ROWS)
+    assert list(out.columns) == ["user_id", "segment"]
+    assert list(out["user_id"]) == [r["user_id"] for r in ROWS]
+    assert list(out["segment"]) == _expected()
+
+
+def test_process_pool_matches_inline(tmp_path):
+    src, dst = tmp_path / "in.csv", tmp_path / "out.csv"
+    pd.DataFrame(ROWS).to_csv(src, index=False)
+
+    score_file(settings.model_dir, str(src), str(dst), chunksize=4, workers=2)
+
+    out = pd.read_csv(dst)
+    assert list(out["row"]) == list(range(len(ROWS)))
+    assert list(out["segment"]) == _expected()
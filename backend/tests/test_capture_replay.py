@@ -0,0 +1,85 @@
+"""Tests for traffic capture and the replay tool."""
+
+import json
+import secrets
+import time
+
+import httpx
+
+from app.core.config import settings
+from app.core.limiter import limiter
+from app.main import app
+from app.services.capture import anonymize, read_capture
+from app.services.stub_llm import StubGroqClient
+from replay import replay, summarize
+from tests.test_recommend import VALID_BODY
+
+
+def test_anonymize_hashes_free_text_only():
+    key = secrets.token_bytes(32)
+    body = anonymize({**VALID_BODY, "podcasts_enjoyed": "Serial, Radiolab"}, key)
+    assert body["podcasts_enjoyed"].startswith("anon-")
+    assert "Serial" not in json.dumps(body)
+    assert body == anonymize({**VALID_BODY, "podcasts_enjoyed": "Serial, Radiolab"}, key)
+    assert {k: v for k, v in body.items() if k != "podcasts_enjoyed"} == VALID_BODY
+    # Keyed: the same text under another key (another capture) gets another token.
+    other = anonymize({**VALID_BODY, "podcasts_enjoyed": "Serial, Radiolab"}, b"other")
+    assert other["podcasts_enjoyed"] != body["podcasts_enjoyed"]
+
+
+async def test_capture_records_sampled_requests(tmp_path, monkeypatch):
+    path = tmp_path / "capture.jsonl"
+    monkeypatch.setattr(settings, "capture_path", str(path))
+    monkeypatch.setattr(settings, "capture_sample_rate", 1.0)
+    limiter.reset()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/recommend?mode=fast", json=VALID_BODY)
+            await client.post(
+                "/recommend",
+                json={**VALID_BODY, "podcasts_enjoyed": "Serial"},
+                headers={"Accept": "application/msgpack"},
+            )
+            key = app.state.traffic_capture._key
+            await client.post("/recommend", json={**VALID_BODY, "region": ""})
+
+    records = read_capture(str(path))
+    assert [r["mode"] for r in records] == ["fast", "llm", "llm"]
+    assert records[1]["accept"] == "application/msgpack"
+    assert records[1]["body"]["podcasts_enjoyed"].startswith("anon-")
+    assert "Serial" not in path.read_text() and key.hex() not in path.read_text()
+    assert all(r["status"] == 200 and r["latency_ms"] > 0 for r in records)
+    assert records[0]["t"] <= records[1]["t"] <= records[2]["t"]
+
+
+async def test_stub_client_is_deterministic():
+    stub = StubGroqClient(latency_ms=1, jitter_ms=0)
+    messages = [{"role": "user", "content": "hello"}]
+    first = await stub.chat.completions.create(model="m", messages=messages)
+    second = await stub.chat.completions.create(model="m", messages=messages)
+    assert first.choices[0].message.content == second.choices[0].message.content
+    assert len(json.loads(first.choices[0].message.content)["recommendations"]) == 5
+    assert first.usage.prompt_tokens > 0
+
+
+async def test_replay_follows_recorded_schedule(client, monkeypatch):
+    monkeypatch.setattr(app.state, "llm_client", StubGroqClient(latency_ms=5, jitter_ms=0))
+    monkeypatch.setattr(limiter, "enabled", False)
+    records = [
+        {"t": 100.0 + 0.1 * i, "mode": mode, "body": VALID_BODY, "latency_ms": 3.0}
+        for i, mode in enumerate(["llm", "fast", "llm", "fast"])
+    ]
+
+    started = time.perf_counter()
+    results = await replay(records, client, speed=2.0)
+    elapsed = time.perf_counter() - started
+    summary = summarize(results, elapsed)
+
+    assert summary["requests"] == 4
+    assert summary["statuses"] == {"200": 4}
+    assert set(summary["latency_ms_by_mode"]) == {"llm", "fast"}
+    assert summary["latency_ms"]["p50"] > 0
+    assert summary["recorded_latency_ms"]["max"] == 3.0
+    # 0.3s of recorded traffic at 2x takes at least 0.15s to send.
+    assert elapsed >= 0.15
@@ -0,0 +1,80 @@
+"""Unit tests for catalog top-k scoring."""
+
+import numpy as np
+import pandas as pd
+
+from app.ml.catalog import POPULARITY_WEIGHT, PodcastCatalog
+
+ROWS = [
+    # name, genre, format, duration, language, region, popularity
+    ("A", "Comedy", "Interview", "Short (< 30 min)", "English", "Global", 0.9),
+    ("B", "Comedy", "Interview", "Short (< 30 min)", "English", "Global", 0.5),
+    ("C", "History", "Solo", "Long (> 60 min)", "English", "Europe", 1.0),
+    ("D", "History", "Solo", "Long (> 60 min)", "Spanish", "Europe", 0.2),
+    ("E", "Sports", "Interview", "Short (< 30 min)", "English", "Asia", 0.1),
+]
+
+
+def _catalog(rows=ROWS):
+    df = pd.DataFrame(
+        rows, columns=["name", "genre", "format", "duration", "language", "region", "popularity"]
+    )
+    df["creator"] = "Someone"
+    return PodcastCatalog.from_frame(df)
+
+
+def _brute_force(catalog, prefs, k):
+    weights = catalog._attribute_weights(prefs, {})
+    scores = np.zeros(len(catalog), dtype=np.float32)
+    for attr, w in zip(("genre", "format", "duration", "language", "region"), weights):
+        scores += w[catalog.codes[attr]]
+    scores += POPULARITY_WEIGHT * catalog.popularity
+    return list(np.lexsort((np.arange(len(catalog)), -scores))[:k])
+
+
+def test_genre_and_language_dominate():
+    prefs = {"podcast_content": ["History"], "content_language": "English", "region": "Europe"}
+    top = _catalog().top_k(prefs, {}, 2)
+    assert [_catalog().names[i] for i in top] == ["C", "D"]
+
+
+def test_popularity_breaks_ties_within_a_combination():
+    prefs = {"podcast_content": ["Comedy"], "podcast_format": "Interview"}
+    recs = _catalog().recommend(prefs, {}, 2)
+    assert [r["name"] for r in recs] == ["A", "B"]
+    assert "Comedy" in recs[0]["reason"]
+
+
+def test_segment_profile_boosts_related_genres():
+    segment = {"fav_pod_genre": {"Sports": 0.9}}
+    top = _catalog().top_k({"podcast_format": "Interview"}, segment, 1)
+    assert _catalog().names[top[0]] == "E"
+
+
+def test_matches_brute_force_on_random_catalog():
+    rng = np.random.default_rng(0)
+    rows = [
+        (
+            f"P{i}",
+            rng.choice(["Comedy", "History", "Sports"]),
+            rng.choice(["Interview", "Solo"]),
+            rng.choice(["Short (< 30 min)", "Long (> 60 min)"]),
+            rng.choice(["English", "Spanish"]),
+            rng.choice(["Global", "Europe"]),
+            float(rng.random()),
+        )
+        for i in range(500)
+    ]
+    catalog = _catalog(rows)
+    prefs = {
+        "podcast_content": ["History"],
+        "podcast_format": "Solo",
+        "content_language": "Spanish",
+        "region": "Europe",
+    }
+    for k in (1, 5, 50):
+        assert list(catalog.top_k(prefs, {}, k)) == _brute_force(catalog, prefs, k)
+
+
+def test_k_larger_than_catalog():
+    assert len(_catalog().top_k({}, {}, 50)) == len(ROWS)
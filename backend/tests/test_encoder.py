@@ -0,0 +1,123 @@
+"""Tests for the preference encoder shared by training and serving."""
+
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml.analyzer import SpotifyUserAnalyzer
+from app.ml.encoder import ENCODER_FILENAME, SURVEY_AGE_MAP, PreferenceEncoder
+from app.ml.features import prepare_features
+from app.ml.loader import load_model_bundle
+from tests.test_training_report import _survey
+from train import build_parser
+
+SURVEY = pd.DataFrame(
+    {
+        "Age": ["20~35", "12~20", "6~12", "60+"],
+        "Gender": ["Female", "Male", None, "Female"],
+        "fav_music_genre": ["Pop", "Rock", "Pop", "Melody"],
+        "fav_pod_genre": ["Comedy", None, "Sports", "Comedy"],
+        "pod_lis_frequency": ["Daily", "Rarely", "Daily", "Never"],
+    }
+)
+PREFS = {
+    "age": "25-34",
+    "music_genre": ["Pop", "Rock"],
+    "podcast_content": ["Comedy"],
+    "podcast_frequency": "Daily",
+    "podcast_duration": "Short",
+    "podcast_format": "Interview",
+}
+
+
+def test_fit_matches_get_dummies_layout():
+    encoder = PreferenceEncoder.fit(SURVEY)
+    categorical = ["Gender", "fav_music_genre", "fav_pod_genre", "pod_lis_frequency"]
+    expected = pd.concat(
+        [
+            SURVEY["Age"].map(SURVEY_AGE_MAP).fillna(30).rename("age_numeric"),
+            pd.get_dummies(SURVEY[categorical]),
+        ],
+        axis=1,
+    )
+    assert encoder.columns == expected.columns.tolist()
+    np.testing.assert_array_equal(encoder.encode(SURVEY), expected.to_numpy(dtype=float))
+
+
+def test_dict_list_and_frame_encode_identically():
+    encoder = PreferenceEncoder.fit(SURVEY)
+    rows = [
+        PREFS,
+        {**PREFS, "age": "12~20", "music_genre": "Rock, Melody", "podcast_content": []},
+        {**PREFS, "age": "unknown", "podcast_frequency": "Hourly"},
+        {**PREFS, "music_genre": ["Melody "]},
+        {**PREFS, "music_genre": ["Melody, Pop"]},
+        {**PREFS, "music_genre": ['"Melody"'], "podcast_content": '["Comedy"]'},
+    ]
+    singles = np.vstack([encoder.encode(row) for row in rows])
+    np.testing.assert_array_equal(encoder.encode(rows), singles)
+    np.testing.assert_array_equal(encoder.encode(pd.DataFrame(rows)), singles)
+
+    index = {name: i for i, name in enumerate(encoder.columns)}
+    first, second, third, padded, joined, quoted = singles
+    assert first[index["age_numeric"]] == 30
+    assert first[index["fav_music_genre_Pop"]] == first[index["fav_music_genre_Rock"]] == 1
+    assert second[index["age_numeric"]] == 16
+    assert second[index["fav_music_genre_Melody"]] == 1
+    assert third[index["age_numeric"]] == 30
+    assert third[index["pod_lis_frequency_Daily"]] == 0
+    assert not singles[:, index["Gender_Female"]].any()
+    melody = index["fav_music_genre_Melody"]
+    assert padded[melody] == joined[melody] == quoted[melody] == 1
+    assert joined[index["fav_music_genre_Pop"]] == 1
+
+
+def test_survey_and_api_names_encode_the_same_preferences():
+    encoder = PreferenceEncoder.fit(SURVEY)
+    survey_row = pd.DataFrame(
+        [{"Age": "12~20", "fav_music_genre": "Rock", "pod_lis_frequency": "Rarely"}]
+    )
+    api_row = {"age": "12~20", "music_genre": ["Rock"], "podcast_frequency": "Rarely"}
+    np.testing.assert_array_equal(encoder.encode(survey_row), encoder.encode(api_row))
+
+
+def test_round_trip_and_derived_encoder():
+    encoder = PreferenceEncoder.fit(SURVEY)
+    restored = PreferenceEncoder.from_dict(json.loads(json.dumps(encoder.to_dict())))
+    np.testing.assert_array_equal(restored.encode(PREFS), encoder.encode(PREFS))
+    # Without a saved encoder, the API fields still encode from the columns alone.
+    derived = PreferenceEncoder.from_columns(encoder.columns)
+    np.testing.assert_array_equal(derived.encode(PREFS), encoder.encode(PREFS))
+
+
+def test_trained_artifacts_share_the_encoder(tmp_path):
+    _survey(tmp_path / "survey.csv")
+    model_dir = tmp_path / "models"
+    args = build_parser().parse_args(
+        ["train", "--data", str(tmp_path / "survey.csv"), "--model-dir", str(model_dir)]
+    )
+    args.func(args)
+    assert (model_dir / ENCODER_FILENAME).exists()
+
+    bundle = load_model_bundle(str(model_dir))
+    analyzer = SpotifyUserAnalyzer(model_dir=str(model_dir))
+    assert analyzer.load_models()
+    prefs = {**PREFS, "music_genre": ["Rap"], "podcast_content": ["Health"]}
+    segment, _ = analyzer.predict_segment(prefs)
+    assert segment == bundle.kmeans_model.predict(prepare_features(bundle, prefs))[0]
+
+
+def test_loader_rejects_an_encoder_for_other_features(tmp_path):
+    _survey(tmp_path / "survey.csv")
+    model_dir = tmp_path / "models"
+    args = build_parser().parse_args(
+        ["train", "--data", str(tmp_path / "survey.csv"), "--model-dir", str(model_dir)]
+    )
+    args.func(args)
+    with open(model_dir / "valid_features.pkl", "wb") as f:
+        pickle.dump(["age_numeric"], f)
+    with pytest.raises(RuntimeError, match="does not match"):
+        load_model_bundle(str(model_dir))
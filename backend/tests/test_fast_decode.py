@@ -0,0 +1,117 @@
+"""The fast UserPreferences decoder must be indistinguishable from pydantic."""
+
+import json
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+
+from app.schemas.fast_decode import (
+    decode_preferences,
+    decode_preferences_list,
+    fast_preferences,
+    pydantic_preferences,
+)
+from app.schemas.recommendation import UserPreferences
+from tests.test_recommend import VALID_BODY
+
+_app = FastAPI()
+
+
+@_app.post("/pydantic")
+async def _pydantic(preferences: UserPreferences):
+    return preferences.model_dump()
+
+
+@_app.post("/fast")
+async def _fast(prefs=Depends(fast_preferences)):
+    return prefs
+
+
+@_app.post("/pydantic-dependency")
+async def _pydantic_dependency(prefs=Depends(pydantic_preferences)):
+    return prefs
+
+
+CASES = [
+    VALID_BODY,
+    {**VALID_BODY, "podcasts_enjoyed": "Serial"},
+    {**VALID_BODY, "music_genre": "Pop, Rock , ,Jazz"},
+    {**VALID_BODY, "music_genre": '["Pop", "Rock"]'},
+    {**VALID_BODY, "music_genre": "  [\"Pop\"]"},
+    {**VALID_BODY, "music_genre": "[not json"},
+    {**VALID_BODY, "music_genre": "Pop"},
+    {**VALID_BODY, "music_genre": ""},
+    {**VALID_BODY, "music_genre": []},
+    {**VALID_BODY, "music_genre": None},
+    {**VALID_BODY, "music_genre": [1, 2]},
+    {**VALID_BODY, "music_genre": "[1, 2]"},
+    {**VALID_BODY, "music_genre": {"a": 1}},
+    {**VALID_BODY, "age": 25},
+    {**VALID_BODY, "age": None},
+    {**VALID_BODY, "podcasts_enjoyed": None},
+    {**VALID_BODY, "extra": "ignored"},
+    {k: v for k, v in VALID_BODY.items() if k != "region"},
+    {k: v for k, v in VALID_BODY.items() if k != "podcast_content"},
+    {},
+    [],
+    "a string",
+    42,
+]
+
+
+async def _post_both(content, headers=None):
+    transport = httpx.ASGITransport(app=_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        slow = await c.post("/pydantic", content=content, headers=headers)
+        fast = await c.post("/fast", content=content, headers=headers)
+    return slow, fast
+
+
+@pytest.mark.parametrize("body", CASES)
+async def test_same_result_as_pydantic(body):
+    slow, fast = await _post_both(json.dumps(body), {"content-type": "application/json"})
+    assert fast.status_code == slow.status_code
+    assert fast.json() == slow.json()
+
+
+@pytest.mark.parametrize(
+    "content, content_type",
+    [
+        (b"", "application/json"),
+        (b"{not json", "application/json"),
+        (b"null", "application/json"),
+        (b"\xff\xfe\xfa", "application/json"),
+        (json.dumps(VALID_BODY).encode(), None),
+        (json.dumps(VALID_BODY).encode(), "application/vnd.api+json; charset=utf-8"),
+        (json.dumps(VALID_BODY).encode(), "text/plain"),
+    ],
+)
+async def test_same_result_for_unusual_bodies(content, content_type):
+    headers = {"content-type": content_type} if content_type else {}
+    slow, fast = await _post_both(content, headers)
+    assert fast.status_code == slow.status_code
+    assert fast.json() == slow.json()
+
+
+async def test_pydantic_dependency_is_equivalent():
+    transport = httpx.ASGITransport(app=_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        response = await c.post("/pydantic-dependency", json=VALID_BODY)
+    assert response.json() == UserPreferences(**VALID_BODY).model_dump()
+
+
+def test_decode_functions_match_pydantic():
+    bodies = [VALID_BODY, {**VALID_BODY, "music_genre": "Pop, Rock"}]
+    expected = [UserPreferences(**b).model_dump() for b in bodies]
+    assert [decode_preferences(json.dumps(b).encode()) for b in bodies] == expected
+    assert decode_preferences_list(json.dumps(bodies).encode()) == expected
+    # A deferred item still decodes through pydantic.
+    mixed = bodies + [{**VALID_BODY, "music_genre": '["Jazz"]'}]
+    assert decode_preferences_list(json.dumps(mixed).encode())[-1]["music_genre"] == ["Jazz"]
+
+
+async def test_recommend_documents_request_body(client):
+    schema = (await client.get("/openapi.json")).json()
+    body = schema["paths"]["/recommend"]["post"]["requestBody"]
+    assert "music_genre" in body["content"]["application/json"]["schema"]["properties"]
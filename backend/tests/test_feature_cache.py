@@ -0,0 +1,79 @@
+"""Tests for the training feature-matrix cache."""
+
+import json
+import logging
+import pickle
+
+import numpy as np
+
+from app.ml.analyzer import SpotifyUserAnalyzer
+from app.ml.feature_cache import FeatureCache
+from tests.test_training_report import _survey
+from train import FEATURE_CACHE_DIR, build_parser
+
+
+def _train(tmp_path, *extra):
+    model_dir = tmp_path / "models"
+    args = build_parser().parse_args(
+        ["train", "--data", str(tmp_path / "survey.csv"), "--model-dir", str(model_dir), *extra]
+    )
+    args.func(args)
+    report = json.loads((model_dir / "training_report.json").read_text())
+    return report["stages"][1]["feature_cache"]
+
+
+def _artifacts(model_dir):
+    with open(model_dir / "scaler.pkl", "rb") as f:
+        scaler = pickle.load(f)
+    with open(model_dir / "kmeans_model.pkl", "rb") as f:
+        kmeans = pickle.load(f)
+    profiles = json.loads((model_dir / "segment_profiles.json").read_text())
+    return scaler, kmeans, profiles
+
+
+def test_second_run_memory_maps_identical_features(tmp_path, caplog):
+    _survey(tmp_path / "survey.csv")
+    assert _train(tmp_path) == "miss"
+    scaler, kmeans, profiles = _artifacts(tmp_path / "models")
+
+    with caplog.at_level(logging.INFO, logger="app.ml.feature_cache"):
+        assert _train(tmp_path) == "hit"
+    assert "Feature cache hit" in caplog.text
+    cached_scaler, cached_kmeans, cached_profiles = _artifacts(tmp_path / "models")
+    np.testing.assert_array_equal(cached_scaler.mean_, scaler.mean_)
+    np.testing.assert_array_equal(cached_scaler.scale_, scaler.scale_)
+    assert list(cached_scaler.feature_names_in_) == list(scaler.feature_names_in_)
+    np.testing.assert_array_equal(cached_kmeans.cluster_centers_, kmeans.cluster_centers_)
+    assert cached_profiles == profiles
+
+
+def test_changed_data_invalidates_the_entry(tmp_path, caplog):
+    _survey(tmp_path / "survey.csv")
+    _train(tmp_path)
+    _survey(tmp_path / "survey.csv", rows=80)
+
+    with caplog.at_level(logging.INFO, logger="app.ml.feature_cache"):
+        assert _train(tmp_path) == "invalidated"
+    assert "survey data changed" in caplog.text
+    assert _train(tmp_path) == "hit"
+
+
+def test_changed_config_invalidates_the_entry(tmp_path, caplog):
+    _survey(tmp_path / "survey.csv")
+    cache_dir = str(tmp_path / "cache")
+    analyzer = SpotifyUserAnalyzer(data_path=str(tmp_path / "survey.csv"), model_dir=str(tmp_path))
+    analyzer.load_data()
+    analyzer.preprocess_data(cache_dir=cache_dir)
+
+    config = {**analyzer.preprocessing_config(), "default_age": 40}
+    with caplog.at_level(logging.INFO, logger="app.ml.feature_cache"):
+        cache = FeatureCache(cache_dir, analyzer.data_path, config)
+        assert cache.load() is None
+    assert cache.status == "invalidated"
+    assert "preprocessing config changed" in caplog.text
+
+
+def test_no_feature_cache_option(tmp_path):
+    _survey(tmp_path / "survey.csv")
+    assert _train(tmp_path, "--no-feature-cache") == "off"
+    assert not (tmp_path / "models" / FEATURE_CACHE_DIR).exists()
@@ -72,3 +72,57 @@ def test_unknown_age_defaults_to_30():
     vec = prepare_features(_bundle(), prefs)[0]
     idx = {name: i for i, name in enumerate(VALID_FEATURES)}
     assert vec[idx["age_numeric"]] == 30
+
+
+def test_feature_matrix_matches_single_row_encoding():
+    import pandas as pd
+
+    from app.ml.features import prepare_feature_matrix
+
+    rows = [
+        BASE_PREFS,
+        {**BASE_PREFS, "age": "55+", "music_genre": ["Pop", "Rock"], "podcast_frequency": "Weekly"},
+        {**BASE_PREFS, "age": "nope", "podcast_content": ["Unknown"]},
+    ]
+    expected = [prepare_features(_bundle(), r)[0] for r in rows]
+
+    frame = pd.DataFrame(rows)
+    assert (prepare_feature_matrix(_bundle(), frame) == expected).all()
+
+    # Tabular input: comma-separated and JSON-array strings instead of lists.
+    frame["music_genre"] = ["Pop", "Pop, Rock", '["Pop"]']
+    frame["podcast_content"] = ["Technology", "Technology", "Unknown"]
+    assert (prepare_feature_matrix(_bundle(), frame) == expected).all()
+
+
+def test_incremental_features_track_full_encoding_and_segment():
+    import random
+
+    import numpy as np
+
+    from app.core.config import settings
+    from app.ml.features import AGE_MAP, IncrementalFeatures
+    from app.ml.loader import load_model_bundle
+
+    bundle = load_model_bundle(settings.model_dir)
+    prefs = dict(BASE_PREFS)
+    features = IncrementalFeatures(bundle, prefs)
+    rng = random.Random(7)
+    for age in rng.choices(list(AGE_MAP) + ["unknown"], k=50):
+        prefs["age"] = age
+        features.update("age", age)
+        expected = prepare_features(bundle, prefs)
+        np.testing.assert_allclose(features.vector(), expected)
+        assert features.segment == bundle.kmeans_model.predict(expected)[0]
+
+
+def test_incremental_update_reports_whether_the_row_changed():
+    from app.core.config import settings
+    from app.ml.features import IncrementalFeatures
+    from app.ml.loader import load_model_bundle
+
+    features = IncrementalFeatures(load_model_bundle(settings.model_dir), BASE_PREFS)
+
+    assert features.update("age", "45-54") is True
+    assert features.update("age", "45-54") is False
+    assert features.update("listening_mood", "Relaxed") is False
@@ -1,5 +1,10 @@
 """Smoke tests for the health/root endpoints."""
 
+import pytest_asyncio
+from anyio.to_thread import current_default_thread_limiter
+
+from app.core.threads import _controller_for_process, apply_thread_limits
+
 
 async def test_root(client):
     response = await client.get("/")
@@ -13,3 +18,35 @@ async def test_health_reports_models_loaded(client):
     body = response.json()
     assert body["status"] == "ok"
     assert body["models_loaded"] is True
+
+
+async def test_metrics_snapshot(client):
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert set(response.json()) == {"counters", "gauges"}
+
+
+async def test_usage_snapshot(client):
+    response = await client.get("/metrics/usage")
+    assert response.status_code == 200
+    assert set(response.json()) == {"budget", "groups"}
+
+
+@pytest_asyncio.fixture
+async def restore_thread_limits():
+    """Undo apply_thread_limits afterwards; the native pools are process-wide."""
+    tokens = current_default_thread_limiter().total_tokens
+    with _controller_for_process().limit(limits=None):
+        yield
+    current_default_thread_limiter().total_tokens = tokens
+
+
+async def test_thread_topology_reports_applied_limits(restore_thread_limits, client):
+    apply_thread_limits(native_threads=1, threadpool_tokens=7)
+    response = await client.get("/metrics/threads")
+
+    body = response.json()
+    assert response.status_code == 200
+    assert body["threadpool_tokens"] == 7
+    assert body["usable_cpus"] >= 1
+    assert all(pool["num_threads"] == 1 for pool in body["native_pools"])
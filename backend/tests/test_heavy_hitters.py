@@ -0,0 +1,118 @@
+"""Tests for the count-min heavy-hitter sketch and its admin endpoint."""
+
+import asyncio
+import hashlib
+import json
+from collections import Counter
+
+import pytest
+
+from app.core.config import settings
+from app.services.heavy_hitters import (
+    CountMinTopK,
+    heavy_hitters,
+    merge_snapshots,
+    publish_snapshots,
+    write_snapshot,
+)
+from app.services.prefkey import canonical_preferences, preference_key
+from tests.test_admin import TOKEN
+from tests.test_recommend import VALID_BODY
+
+KEYS = [hashlib.blake2b(str(i).encode(), digest_size=16).hexdigest() for i in range(200)]
+
+
+def _stream():
+    # 20 heavy keys requested 100, 95, ..., 5 times, then a long tail of singles.
+    heavy = [(KEYS[i], i % 2) for i in range(20) for _ in range(100 - 5 * i)]
+    return heavy + [(key, 0) for key in KEYS[20:]]
+
+
+def test_top_n_matches_exact_counts():
+    sketch = CountMinTopK(width=1024, depth=4, k=20, batch_size=64)
+    stream = _stream()
+    for key, segment in stream:
+        sketch.add(key, segment)
+
+    exact = Counter(stream)
+    assert [(k, s) for k, s, _ in sketch.top_n(5)] == [item for item, _ in exact.most_common(5)]
+    for key, segment, count in sketch.top_n(20):
+        assert count >= exact[(key, segment)]  # never undercounts
+    expected = sum(c for _, c in exact.most_common(10)) / len(stream)
+    assert sketch.coverage(10) == pytest.approx(expected, abs=0.01)
+
+
+def test_merge_equals_single_stream():
+    stream = _stream()
+    whole, left, right = (CountMinTopK(width=1024, k=20) for _ in range(3))
+    for i, (key, segment) in enumerate(stream):
+        whole.add(key, segment)
+        (left if i % 2 else right).add(key, segment)
+
+    merged = CountMinTopK.from_dict(json.loads(json.dumps(left.to_dict())))
+    merged.merge(right)
+
+    assert merged.total == whole.total
+    assert merged.top_n(20) == whole.top_n(20)
+
+
+def test_merge_snapshots_skips_own_and_stale_files(tmp_path):
+    mine, other = CountMinTopK(), CountMinTopK()
+    mine.add(KEYS[0], 0)
+    other.add(KEYS[1], 1)
+    other.add(KEYS[1], 1)
+    write_snapshot(mine.to_dict(), str(tmp_path))  # this worker's own file
+    (tmp_path / f"999999{'.sketch.json'}").write_text(json.dumps(other.to_dict()))
+
+    merged, workers = merge_snapshots(mine.to_dict(), str(tmp_path), max_age=60)
+    assert (workers, merged.total) == (2, 3)
+    assert merged.top_n(1) == [(KEYS[1], 1, 2)]
+
+    merged, workers = merge_snapshots(mine.to_dict(), str(tmp_path), max_age=-1)
+    assert (workers, merged.total) == (1, 1)
+
+
+async def test_admin_lists_recommend_traffic(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", TOKEN)
+    before = heavy_hitters.total
+    for _ in range(3):
+        await client.post("/recommend?mode=fast", json=VALID_BODY)
+
+    response = await client.get("/admin/heavy-hitters?n=5", headers={"X-Admin-Token": TOKEN})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == before + 3
+    assert body["workers"] == 1
+    assert body["top"][0]["count"] >= 3
+    assert 0 < body["coverage"] <= 1
+    top = next(hit for hit in body["top"] if hit["preference_key"] == preference_key(VALID_BODY))
+    assert top["preferences"] == canonical_preferences(VALID_BODY)
+
+
+def test_candidates_keep_their_preferences_through_merge_and_snapshot():
+    prefs = [{"age": f"{i}", "music_genre": ["Rock", "Pop"]} for i in range(3)]
+    keys = [preference_key(p) for p in prefs]
+    left, right = CountMinTopK(k=2), CountMinTopK(k=2)
+    for _ in range(5):
+        left.add(keys[0], 0, prefs[0])
+    for _ in range(3):
+        right.add(keys[1], 0, prefs[1])
+    right.add(keys[2], 0, prefs[2])
+
+    left.merge(CountMinTopK.from_dict(json.loads(json.dumps(right.to_dict()))))
+
+    assert set(left.preferences) == {keys[0], keys[1]}  # keys[2] fell out of the top 2
+    assert left.preferences[keys[1]]["music_genre"] == ["Pop", "Rock"]
+
+
+async def test_publisher_writes_a_final_snapshot_when_cancelled(tmp_path):
+    sketch = CountMinTopK()
+    publisher = asyncio.create_task(publish_snapshots(sketch, str(tmp_path), interval=3600))
+    await asyncio.sleep(0)
+    sketch.add(KEYS[0], 0)
+    publisher.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await publisher
+
+    [snapshot] = tmp_path.glob("*.sketch.json")
+    assert json.loads(snapshot.read_text())["total"] == 1
@@ -0,0 +1,165 @@
+"""Asynchronous recommendation jobs: the queue, and the /recommend/jobs API."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.main import app
+from app.services.jobs import DONE, FAILED, UTILIZATION_WINDOW_SECONDS, JobQueue
+from tests.test_llm import _recs, _ScriptedClient
+from tests.test_recommend import VALID_BODY
+
+
+async def test_workers_take_jobs_by_priority_then_fifo():
+    queue = JobQueue(workers=1, max_depth=10)
+    gate = asyncio.Event()
+    order = []
+
+    def work(name):
+        async def run():
+            if name == "blocker":
+                await gate.wait()
+            order.append(name)
+            return {}
+
+        return run
+
+    await queue.start()
+    blocker = queue.submit(work("blocker"), priority=1)
+    await asyncio.sleep(0)
+    jobs = [
+        queue.submit(work("low"), priority=2),
+        queue.submit(work("normal-1"), priority=1),
+        queue.submit(work("high"), priority=0),
+        queue.submit(work("normal-2"), priority=1),
+    ]
+    gate.set()
+    for job in [blocker, *jobs]:
+        await queue.wait(job, 1)
+    await queue.close()
+
+    assert order == ["blocker", "high", "normal-1", "normal-2", "low"]
+    assert all(job.status == DONE for job in jobs)
+    snapshot = queue.snapshot()
+    assert snapshot["queue_wait_ms"]["samples"] == 5
+    assert 0 < snapshot["utilization"] <= 1
+
+
+async def test_full_queue_rejects_and_failures_are_contained():
+    queue = JobQueue(workers=1, max_depth=1)
+
+    async def boom():
+        raise RuntimeError("boom")
+
+    failing = queue.submit(boom)
+    with pytest.raises(asyncio.QueueFull):
+        queue.submit(boom)
+    await queue.start()
+    await queue.wait(failing, 1)
+    await queue.close()
+
+    assert failing.status == FAILED
+    assert failing.error == "Error generating recommendations"
+
+
+async def test_utilization_covers_the_recent_window_and_running_jobs():
+    queue = JobQueue(workers=2, max_depth=10)
+    now = queue._started_at + 10 * UTILIZATION_WINDOW_SECONDS
+    # Busy long ago, idle for the last window, then one job running for 30s.
+    queue._busy_spans.append((queue._started_at, now - 2 * UTILIZATION_WINDOW_SECONDS))
+    assert queue.utilization(now) == 0
+    queue._running["job"] = now - 30
+    assert queue.utilization(now) == pytest.approx(30 / (2 * UTILIZATION_WINDOW_SECONDS))
+    assert not queue._busy_spans  # spans older than the window are dropped
+
+
+async def test_retained_jobs_are_capped():
+    queue = JobQueue(workers=1, max_depth=2, max_retained=3)
+
+    async def work():
+        return {}
+
+    await queue.start()
+    jobs = []
+    for _ in range(5):
+        jobs.append(queue.submit(work))
+        await queue.wait(jobs[-1], 1)
+    await queue.close()
+
+    assert len(queue._jobs) == 3
+    assert queue.get(jobs[0].id) is None and queue.get(jobs[-1].id) is jobs[-1]
+
+
+async def test_rejected_submit_evicts_nothing():
+    queue = JobQueue(workers=1, max_depth=1, max_retained=2)
+
+    async def work():
+        return {}
+
+    await queue.start()
+    finished = queue.submit(work)
+    await queue.wait(finished, 1)
+    await queue.close()
+    queued = queue.submit(work)
+
+    with pytest.raises(asyncio.QueueFull):
+        queue.submit(work)
+    assert queue.get(finished.id) is finished and queue.get(queued.id) is queued
+
+
+async def test_submit_then_long_poll_for_the_result(client):
+    app.state.llm_client = _ScriptedClient(json.dumps({"recommendations": _recs(1, 6)}))
+
+    submitted = await client.post("/recommend/jobs?priority=high", json=VALID_BODY)
+    job = submitted.json()
+    finished = await client.get(f"/recommend/jobs/{job['id']}?wait=5")
+
+    assert submitted.status_code == 202
+    assert submitted.headers["Location"] == f"/recommend/jobs/{job['id']}"
+    assert job["status"] == "queued" and job["priority"] == 0
+    body = finished.json()
+    assert body["status"] == "done"
+    assert body["result"]["recommendations"][0]["name"] == "Podcast 1"
+    assert body["result"]["segment_profile"]
+    assert body["queue_wait_ms"] is not None
+    metrics = (await client.get("/metrics/jobs")).json()
+    assert metrics["workers"] == settings.job_workers
+    assert metrics["queue_wait_ms"]["samples"] >= 1
+
+
+async def test_unknown_job_and_disallowed_callback(client):
+    missing = await client.get("/recommend/jobs/nope")
+    callback = await client.post(
+        "/recommend/jobs?callback_url=http://169.254.169.254/latest", json=VALID_BODY
+    )
+
+    assert missing.status_code == 404
+    assert callback.status_code == 422
+
+
+async def test_finished_job_is_posted_to_the_callback(client, monkeypatch):
+    monkeypatch.setattr(settings, "job_callback_hosts", "hooks.example")
+    delivered = asyncio.Event()
+    received = []
+
+    def handler(request):
+        received.append(json.loads(request.content))
+        delivered.set()
+        return httpx.Response(204)
+
+    queue = app.state.job_queue
+    await queue._http.aclose()
+    queue._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    submitted = await client.post(
+        "/recommend/jobs?callback_url=https://hooks.example/done", json=VALID_BODY
+    )
+    await asyncio.wait_for(delivered.wait(), 5)
+
+    [payload] = received
+    assert payload["id"] == submitted.json()["id"]
+    assert payload["status"] == "done"
+    assert len(payload["result"]["recommendations"]) == 5
@@ -0,0 +1,44 @@
+"""Unit tests for salvaging recommendations from malformed LLM JSON."""
+
+import json
+
+from app.services.json_salvage import salvage_recommendations, strip_trailing_commas
+
+RECS = [{"name": f"Podcast {i}", "creator": f"Creator {i}"} for i in range(1, 6)]
+
+
+def test_valid_payload_is_intact():
+    recs, intact = salvage_recommendations(json.dumps({"recommendations": RECS}))
+    assert recs == RECS
+    assert intact is True
+
+
+def test_trailing_commas_are_repaired():
+    content = '{"recommendations": [{"name": "A", "creator": "B",}, {"name": "C",},],}'
+    recs, intact = salvage_recommendations(content)
+    assert [r["name"] for r in recs] == ["A", "C"]
+    assert intact is False
+
+
+def test_truncated_payload_keeps_complete_objects():
+    full = json.dumps({"recommendations": RECS})
+    # Cut in the middle of the fourth object, as a max_tokens stop would.
+    cut = full.index('"Podcast 4"') + 5
+    recs, intact = salvage_recommendations(full[:cut])
+    assert recs == RECS[:3]
+    assert intact is False
+
+
+def test_bare_array_is_accepted():
+    recs, _ = salvage_recommendations(json.dumps(RECS[:2]) + "garbage")
+    assert recs == RECS[:2]
+
+
+def test_unrecoverable_payload_returns_empty():
+    assert salvage_recommendations("I'm sorry, I can't help with that.") == ([], False)
+    assert salvage_recommendations("") == ([], False)
+
+
+def test_strip_trailing_commas_leaves_strings_alone():
+    text = '{"reason": "fans of a, ] and b,}", "x": [1, 2,]}'
+    assert json.loads(strip_trailing_commas(text)) == {"reason": "fans of a, ] and b,}", "x": [1, 2]}
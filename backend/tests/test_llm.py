@@ -0,0 +1,282 @@
+"""Unit tests for generate_podcast_recommendations' salvage and follow-up
+path, and for refine_recommendations' delta prompts.
+"""
+
+import json
+
+import groq
+import httpx
+
+from app.core.metrics import metrics
+from app.services import llm
+from app.services.llm import (
+    _build_prompt,
+    generate_podcast_recommendations,
+    normalize_recommendations,
+    refine_recommendations,
+)
+from app.services.usage import CallUsage, usage_tracker
+
+PREFS = {
+    "age": "25-34",
+    "music_genre": ["Pop"],
+    "podcast_frequency": "Daily",
+    "podcast_duration": "Medium (30-60 min)",
+    "podcast_format": "Interview",
+    "podcast_content": ["Technology"],
+    "content_language": "English",
+    "region": "Global",
+    "listening_mood": "Curious",
+}
+
+
+def _recs(start, stop):
+    return [{"name": f"Podcast {i}", "creator": f"Creator {i}"} for i in range(start, stop)]
+
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content):
+        self.message = _Message(content)
+
+
+class _Usage:
+    prompt_tokens = 400
+    completion_tokens = 100
+
+
+class _Response:
+    def __init__(self, content):
+        self.choices = [_Choice(content)]
+        self.usage = _Usage()
+
+
+class _ScriptedClient:
+    """Returns the queued payloads in order and records every call's kwargs."""
+
+    def __init__(self, *contents):
+        self._contents = list(contents)
+        self.calls = []
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = self._contents.pop(0)
+        if isinstance(content, Exception):
+            raise content
+        return _Response(content)
+
+
+async def test_truncated_response_requests_only_missing_items():
+    metrics.reset()
+    truncated = json.dumps({"recommendations": _recs(1, 6)})
+    truncated = truncated[: truncated.index('"Podcast 4"')]
+    client = _ScriptedClient(truncated, json.dumps({"recommendations": _recs(4, 6)}))
+
+    recs = await generate_podcast_recommendations(client, PREFS, {}, "test-model")
+
+    assert [r["name"] for r in recs] == [f"Podcast {i}" for i in range(1, 6)]
+    assert len(client.calls) == 2
+    follow_up = client.calls[1]["messages"][-1]["content"]
+    assert "exactly 2 more" in follow_up
+    assert client.calls[1]["max_tokens"] < client.calls[0]["max_tokens"]
+    assert "3 of the 5" in follow_up and "cut off" not in follow_up
+    assert metrics.counter("llm.parse.salvaged") == 1
+    assert metrics.counter("llm.parse.total") == 1
+    assert metrics.counter("llm.followup.parse.ok") == 1
+    assert metrics.counter("llm.followup.requests") == 1
+
+
+async def test_failed_follow_up_keeps_partial_result():
+    metrics.reset()
+    partial = '{"recommendations": [{"name": "A", "creator": "B"},'
+    client = _ScriptedClient(partial, RuntimeError("boom"))
+
+    recs = await generate_podcast_recommendations(client, PREFS, {}, "test-model")
+
+    assert [r["name"] for r in recs] == ["A"]
+    assert metrics.counter("llm.followup.failed") == 1
+
+
+class _RecordingStore:
+    def __init__(self):
+        self.puts = {}
+
+    async def get(self, key):
+        return None
+
+    def put(self, key, value):
+        self.puts[key] = value
+
+
+async def test_only_complete_results_are_stored():
+    store = _RecordingStore()
+    partial = '{"recommendations": [{"name": "A", "creator": "B"},'
+    client = _ScriptedClient(
+        partial, RuntimeError("boom"), json.dumps({"recommendations": _recs(1, 6)})
+    )
+
+    short = await generate_podcast_recommendations(
+        client, PREFS, {}, "test-model", store=store, cache_key="k"
+    )
+    assert len(short) == 1 and store.puts == {}
+
+    full = await generate_podcast_recommendations(
+        client, PREFS, {}, "test-model", store=store, cache_key="k"
+    )
+    assert store.puts == {"k": full}
+
+
+async def test_unparseable_response_falls_back():
+    metrics.reset()
+    client = _ScriptedClient("not json at all")
+
+    recs = await generate_podcast_recommendations(client, PREFS, {}, "test-model")
+
+    assert recs[0]["name"] == "The Daily"
+    assert len(client.calls) == 1
+    assert metrics.counter("llm.parse.failed") == 1
+
+
+async def test_usage_accumulates_tokens_across_follow_up():
+    usage_tracker.reset()
+    truncated = json.dumps({"recommendations": _recs(1, 6)})
+    truncated = truncated[: truncated.index('"Podcast 4"')]
+    client = _ScriptedClient(truncated, json.dumps({"recommendations": _recs(4, 6)}))
+    usage = CallUsage(segment=2)
+
+    await generate_podcast_recommendations(client, PREFS, {}, "test-model", usage=usage)
+
+    assert (usage.llm_calls, usage.followups) == (2, 1)
+    assert (usage.prompt_tokens, usage.completion_tokens) == (800, 200)
+    assert usage.source == "llm" and usage.fallback_reason is None
+    [group] = usage_tracker.snapshot()["groups"]
+    assert (group["segment"], group["model"]) == (2, "test-model")
+    assert group["prompt_tokens"] == 800
+    assert group["cost_usd"] > 0
+    # Per call: the average of two calls can't exceed the slowest one.
+    assert usage.latency_ms_max <= usage.latency_ms
+    assert group["latency_ms_avg"] <= group["latency_ms_max"]
+
+
+async def test_fallback_reason_is_recorded():
+    usage_tracker.reset()
+    usage = CallUsage()
+
+    await generate_podcast_recommendations(
+        _ScriptedClient(TimeoutError("slow")), PREFS, {}, "test-model", usage=usage
+    )
+
+    assert usage.source == "fallback"
+    assert usage.fallback_reason == "TimeoutError"
+    assert (usage.llm_calls, usage.failed_calls) == (1, 1) and usage.latency_ms > 0
+    [group] = usage_tracker.snapshot()["groups"]
+    assert group["fallback_reasons"] == {"TimeoutError": 1}
+    assert group["failed_calls"] == 1 and group["llm_calls"] == 1
+
+
+def _status_error(cls, status, headers=None):
+    request = httpx.Request("POST", "https://api.groq.test/chat/completions")
+    response = httpx.Response(status, headers=headers, request=request)
+    return cls("error", response=response, body=None)
+
+
+async def test_transient_errors_are_retried_and_counted(monkeypatch):
+    usage_tracker.reset()
+    monkeypatch.setattr(llm, "_RETRY_BASE_DELAY", 0.0)
+    usage = CallUsage()
+    client = _ScriptedClient(
+        _status_error(groq.InternalServerError, 503),
+        groq.APIConnectionError(request=httpx.Request("POST", "https://api.groq.test")),
+        json.dumps({"recommendations": _recs(1, 6)}),
+    )
+
+    recs = await generate_podcast_recommendations(client, PREFS, {}, "test-model", usage=usage)
+
+    assert len(recs) == 5 and usage.source == "llm"
+    assert (usage.llm_calls, usage.failed_calls, usage.retries) == (3, 2, 2)
+    [group] = usage_tracker.snapshot()["groups"]
+    assert group["retries"] == 2
+
+
+async def test_client_errors_and_exhausted_retries_give_up(monkeypatch):
+    monkeypatch.setattr(llm, "_RETRY_BASE_DELAY", 0.0)
+    bad_request = CallUsage()
+    client = _ScriptedClient(_status_error(groq.BadRequestError, 400))
+    await generate_podcast_recommendations(client, PREFS, {}, "test-model", usage=bad_request)
+    assert (bad_request.llm_calls, bad_request.retries) == (1, 0)
+
+    limited = CallUsage()
+    errors = [_status_error(groq.RateLimitError, 429, {"retry-after": "0"}) for _ in range(3)]
+    await generate_podcast_recommendations(
+        _ScriptedClient(*errors), PREFS, {}, "test-model", usage=limited
+    )
+    assert limited.source == "fallback" and limited.fallback_reason == "RateLimitError"
+    assert (limited.llm_calls, limited.retries) == (1 + llm.LLM_MAX_RETRIES, 2)
+
+
+async def test_token_budget_switches_to_fallback(monkeypatch):
+    usage_tracker.reset()
+    monkeypatch.setattr(usage_tracker, "tokens_per_minute", 500)
+    content = json.dumps({"recommendations": _recs(1, 6)})
+    client = _ScriptedClient(content, content)
+
+    first = await generate_podcast_recommendations(client, PREFS, {}, "test-model")
+    usage = CallUsage()
+    second = await generate_podcast_recommendations(client, PREFS, {}, "test-model", usage=usage)
+
+    assert first[0]["name"] == "Podcast 1"
+    assert second[0]["name"] == "The Daily"
+    assert usage.fallback_reason == "token_budget"
+    assert len(client.calls) == 1
+    assert usage_tracker.snapshot()["budget"]["exhausted"] is True
+
+
+async def test_refine_replaces_only_the_indexed_items():
+    usage_tracker.reset()
+    previous = normalize_recommendations(_recs(0, 5), PREFS)
+    prefs = {**PREFS, "podcast_duration": "Short (< 30 min)"}
+    replacement = {**_recs(9, 10)[0], "replaces": 3}
+    client = _ScriptedClient(json.dumps({"recommendations": [replacement]}))
+    usage = CallUsage()
+
+    recs, replaced = await refine_recommendations(
+        client,
+        prefs,
+        previous,
+        {"podcast_duration": ("Medium (30-60 min)", "Short (< 30 min)")},
+        "test-model",
+        usage=usage,
+    )
+
+    assert replaced == [3]
+    assert [r["name"] for r in recs] == ["Podcast 0", "Podcast 1", "Podcast 2", "Podcast 9", "Podcast 4"]
+    assert recs[3]["duration"] == "Short (< 30 min)"
+    [call] = client.calls
+    prompt = call["messages"][-1]["content"]
+    assert "podcast_duration from 'Medium (30-60 min)' to 'Short (< 30 min)'" in prompt
+    assert "3. Podcast 3" in prompt
+    assert len(prompt) < len(_build_prompt(prefs, {}))
+    assert usage.llm_calls == 1 and usage.source == "llm"
+
+
+async def test_refine_keeps_previous_items_on_error():
+    previous = normalize_recommendations(_recs(0, 5), PREFS)
+    usage = CallUsage()
+
+    recs, replaced = await refine_recommendations(
+        _ScriptedClient(TimeoutError("slow")),
+        PREFS,
+        previous,
+        {"region": ("Global", "Europe")},
+        "test-model",
+        usage=usage,
+    )
+
+    assert (recs, replaced) == (previous, [])
+    assert usage.fallback_reason == "TimeoutError"
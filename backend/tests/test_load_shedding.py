@@ -0,0 +1,64 @@
+"""Tests for ingress load shedding."""
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.load_shedding import SaturationMonitor
+from app.main import app
+from tests.test_recommend import VALID_BODY
+
+
+@pytest.fixture
+def monitor():
+    monitor = app.state.saturation
+    saved = (monitor.max_in_flight, monitor.max_loop_lag_ms, monitor.in_flight, monitor.loop_lag_ms)
+    yield monitor
+    (monitor.max_in_flight, monitor.max_loop_lag_ms, monitor.in_flight, monitor.loop_lag_ms) = saved
+
+
+async def test_health_reports_saturation_signals(client):
+    body = (await client.get("/health")).json()
+    assert body["saturation"]["saturated"] is False
+    assert {"in_flight", "loop_lag_ms", "threadpool_busy", "threadpool_queued"} <= set(
+        body["saturation"]
+    )
+
+
+async def test_sheds_recommend_when_in_flight_limit_reached(client, monitor):
+    monitor.max_in_flight = 1
+    monitor.in_flight = 1
+
+    response = await client.post("/recommend", json=VALID_BODY)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(monitor.retry_after_seconds)
+
+    # Cheap endpoints stay reachable, and /health tells the balancer why.
+    assert (await client.get("/")).status_code == 200
+    health = await client.get("/health")
+    assert health.status_code == 503
+    assert health.json()["saturation"]["reason"] == "in_flight"
+
+
+async def test_sheds_on_loop_lag(client, monitor):
+    monitor.max_loop_lag_ms = 50
+    monitor.loop_lag_ms = 120.0
+    response = await client.get("/segments")
+    assert response.status_code == 503
+
+
+async def test_in_flight_count_returns_to_zero(client, monitor):
+    response = await client.post("/recommend", json=VALID_BODY)
+    assert response.status_code == 200
+    assert monitor.in_flight == 0
+
+
+async def test_lag_probe_measures_blocked_loop():
+    monitor = SaturationMonitor(lag_interval_ms=10)
+    monitor.start()
+    await asyncio.sleep(0.02)
+    time.sleep(0.1)  # block the loop
+    await asyncio.sleep(0.02)
+    await monitor.stop()
+    assert monitor.loop_lag_ms >= 50
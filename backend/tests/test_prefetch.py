@@ -0,0 +1,116 @@
+"""Speculative prefetch: the registry, and POST /recommend/prefetch + X-Prefetch-Token."""
+
+import asyncio
+import json
+
+from app.core.metrics import metrics
+from app.main import app
+from app.services.prefetch import PrefetchRegistry
+from app.services.usage import CallUsage
+from tests.test_llm import _recs, _ScriptedClient
+from tests.test_recommend import VALID_BODY
+
+
+async def _result(value):
+    return value
+
+
+async def _forever():
+    await asyncio.Event().wait()
+
+
+async def test_claim_returns_the_speculation_once():
+    registry = PrefetchRegistry(ttl_seconds=30)
+    token = registry.speculate("1.2.3.4", "key", _result(["rec"]), CallUsage())
+
+    speculation = registry.claim(token, "1.2.3.4", "key")
+
+    assert await speculation.task == ["rec"]
+    assert registry.claim(token, "1.2.3.4", "key") is None
+
+
+async def test_mismatched_preferences_or_client_do_not_claim():
+    registry = PrefetchRegistry(ttl_seconds=30)
+    token = registry.speculate("1.2.3.4", "key", _forever(), CallUsage())
+
+    assert registry.claim(token, "5.6.7.8", "key") is None
+    assert len(registry) == 1
+    assert registry.claim(token, "1.2.3.4", "other-key") is None
+    assert len(registry) == 0
+
+
+async def test_per_client_cap_cancels_the_oldest():
+    metrics.reset()
+    registry = PrefetchRegistry(ttl_seconds=30, max_per_client=2)
+    first = registry.speculate("a", "k1", _forever(), CallUsage())
+    registry.speculate("a", "k2", _forever(), CallUsage())
+    registry.speculate("b", "k1", _forever(), CallUsage())
+    registry.speculate("a", "k3", _forever(), CallUsage())
+
+    assert len(registry) == 3
+    assert registry.find("a", "k1") is None and registry.find("b", "k1") is not None
+    assert registry.claim(first, "a", "k1") is None
+    assert metrics.snapshot()["counters"]["prefetch.evicted"] == 1
+    await registry.close()
+
+
+async def test_unclaimed_speculations_expire():
+    registry = PrefetchRegistry(ttl_seconds=0.01)
+    token = registry.speculate("a", "key", _forever(), CallUsage())
+    await asyncio.sleep(0.02)
+
+    assert registry.claim(token, "a", "key") is None
+    assert len(registry) == 0
+
+
+async def test_partial_preferences_report_segment_and_missing_fields(client):
+    segment_fields = {
+        k: VALID_BODY[k]
+        for k in ("age", "music_genre", "podcast_frequency", "podcast_duration")
+    }
+    partial = await client.post("/recommend/prefetch", json=segment_fields)
+    segment_known = await client.post(
+        "/recommend/prefetch",
+        json={**segment_fields, "podcast_format": "Interview", "podcast_content": "Technology"},
+    )
+
+    assert partial.status_code == 200
+    assert partial.json()["segment"] is None
+    assert partial.json()["token"] is None
+    assert "podcast_format" in partial.json()["missing"]
+    assert isinstance(segment_known.json()["segment"], int)
+    assert segment_known.json()["missing"] == ["content_language", "region", "listening_mood"]
+
+
+async def test_recommend_reuses_the_speculative_call(client):
+    llm = _ScriptedClient(json.dumps({"recommendations": _recs(1, 6)}))
+    app.state.llm_client = llm
+
+    prefetch = (await client.post("/recommend/prefetch", json=VALID_BODY)).json()
+    again = (await client.post("/recommend/prefetch", json=VALID_BODY)).json()
+    response = await client.post(
+        "/recommend", json=VALID_BODY, headers={"X-Prefetch-Token": prefetch["token"]}
+    )
+
+    assert prefetch["token"] and again["token"] == prefetch["token"]
+    assert prefetch["expires_in"] > 0
+    assert response.status_code == 200
+    assert response.headers["X-Prefetch"] == "hit"
+    assert [r["name"] for r in response.json()["recommendations"]][0] == "Podcast 1"
+    assert len(llm.calls) == 1
+
+
+async def test_changed_preferences_miss_and_call_the_llm(client):
+    content = json.dumps({"recommendations": _recs(1, 6)})
+    llm = _ScriptedClient(content, content)
+    app.state.llm_client = llm
+
+    token = (await client.post("/recommend/prefetch", json=VALID_BODY)).json()["token"]
+    response = await client.post(
+        "/recommend",
+        json={**VALID_BODY, "region": "Europe"},
+        headers={"X-Prefetch-Token": token},
+    )
+
+    assert response.headers["X-Prefetch"] == "miss"
+    assert len(llm.calls) == 2
@@ -2,8 +2,13 @@
 
 import json
 
+import cbor2
+import msgspec
+import pytest
 import pytest_asyncio
 
+from app.core.config import settings
+from app.core.negotiation import CBOR, JSON, MSGPACK, choose_media_type
 from app.main import app
 
 VALID_BODY = {
@@ -113,3 +118,83 @@ async def test_recommend_missing_field_returns_422(client):
     body = {k: v for k, v in VALID_BODY.items() if k != "region"}
     response = await client.post("/recommend", json=body)
     assert response.status_code == 422
+
+
+async def test_recommend_fast_mode_ranks_catalog(client):
+    body = {**VALID_BODY, "podcast_content": ["True Crime"], "podcast_format": "Narrative/Storytelling"}
+    response = await client.post("/recommend?mode=fast", json=body)
+    assert response.status_code == 200
+    recs = response.json()["recommendations"]
+    assert len(recs) == 5
+    assert recs[0]["name"] == "Serial"
+    assert all(r["link"].startswith("https://") for r in recs)
+
+
+async def test_cache_key_is_opt_in_and_canonical(client, monkeypatch):
+    plain = await client.post("/recommend?mode=fast", json=VALID_BODY)
+    assert "x-cache-key" not in plain.headers
+
+    headers = {"Prefer": "return-cache-key"}
+    first = await client.post("/recommend?mode=fast", json=VALID_BODY, headers=headers)
+    # Same preferences, list items reordered: same key.
+    reordered = {**VALID_BODY, "music_genre": ["Rock", "Pop"]}
+    second = await client.post("/recommend?mode=fast", json=reordered, headers=headers)
+    assert first.headers["preference-applied"] == "return-cache-key"
+    assert first.headers["x-cache-key"] == second.headers["x-cache-key"]
+    assert first.headers["x-cache-key"].startswith(f"{app.state.bundle.version}:fast:")
+
+    changed = await client.post(
+        "/recommend?mode=fast", json={**VALID_BODY, "region": "Europe"}, headers=headers
+    )
+    assert changed.headers["x-cache-key"] != first.headers["x-cache-key"]
+
+    llm = await client.post("/recommend", json=VALID_BODY, headers=headers)
+    assert llm.headers["x-cache-key"].startswith(
+        f"{app.state.bundle.version}:llm:{settings.groq_model}:"
+    )
+    monkeypatch.setattr(settings, "groq_model", "other-model")
+    other = await client.post("/recommend", json=VALID_BODY, headers=headers)
+    assert other.headers["x-cache-key"] != llm.headers["x-cache-key"]
+
+
+async def test_usage_header_is_opt_in(client, monkeypatch):
+    plain = await client.post("/recommend", json=VALID_BODY)
+    assert "x-llm-usage" not in plain.headers
+
+    monkeypatch.setattr(settings, "llm_usage_header", True)
+    response = await client.post("/recommend", json=VALID_BODY)
+    usage = response.headers["x-llm-usage"]
+    assert "source=fallback" in usage
+    assert "fallback_reason=no_client" in usage
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, JSON),
+        ("*/*", JSON),
+        ("application/msgpack", MSGPACK),
+        ("application/x-msgpack, application/json;q=0.5", MSGPACK),
+        ("application/json, application/cbor", JSON),
+        ("application/json;q=0.2, application/cbor;q=0.9", CBOR),
+        ("application/cbor;q=0", JSON),
+    ],
+)
+def test_choose_media_type(accept, expected):
+    assert choose_media_type(accept) == expected
+
+
+@pytest.mark.parametrize("media_type, decode", [(MSGPACK, msgspec.msgpack.decode), (CBOR, cbor2.loads)])
+async def test_binary_encodings_match_json(client, media_type, decode):
+    as_json = await client.post("/recommend?mode=fast", json=VALID_BODY)
+    response = await client.post(
+        "/recommend?mode=fast",
+        json=VALID_BODY,
+        headers={"Accept": media_type, "Prefer": "return-cache-key"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == media_type
+    assert "x-cache-key" in response.headers
+    assert "Accept" in response.headers["vary"]
+    assert decode(response.content) == as_json.json()
+    assert len(response.content) < len(as_json.content)
@@ -0,0 +1,128 @@
+"""Tests for the persistent SQLite-backed LLM result store."""
+
+import json
+import time
+
+import pytest_asyncio
+
+from app.core.config import settings
+from app.main import app
+from app.services.result_store import ResultStore
+from tests.test_recommend import _FAKE_RECS, VALID_BODY, _FakeClient
+
+RESULT = [{"name": "Stored Podcast", "creator": "Someone"}]
+
+
+@pytest_asyncio.fixture
+async def store(tmp_path):
+    s = ResultStore(str(tmp_path / "results.db"), memory_entries=4)
+    await s.start()
+    yield s
+    await s.close()
+
+
+async def test_put_then_get_from_memory(store):
+    assert await store.get("k") is None
+    store.put("k", RESULT)
+    assert await store.get("k") == RESULT
+
+
+async def test_results_survive_restart_and_warm_start(tmp_path):
+    path = str(tmp_path / "results.db")
+    first = ResultStore(path)
+    await first.start()
+    first.put("popular", RESULT)
+    first.put("rare", RESULT)
+    await first.close()
+
+    # A new worker (or a redeploy) sees the data, and preloads hot keys.
+    second = ResultStore(path, warm_keys=1)
+    await second.start()
+    try:
+        assert await second.get("popular") == RESULT  # from disk
+        await second._queue.join()  # let the hit count land
+    finally:
+        await second.close()
+
+    third = ResultStore(path, warm_keys=1)
+    await third.start()
+    try:
+        assert list(third._memory) == ["popular"]
+    finally:
+        await third.close()
+
+
+async def test_expired_entries_are_not_served(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"), ttl_seconds=60)
+    await store.start()
+    try:
+        store.put("k", RESULT)
+        await store._queue.join()
+        # Age the entry past its TTL in both layers.
+        store._memory["k"] = (RESULT, time.time() - 120)
+        with store._db_lock, store._conn:
+            store._conn.execute("UPDATE results SET created = created - 120")
+        assert await store.get("k") is None
+        assert store.evict() == 1
+    finally:
+        await store.close()
+
+
+async def test_size_eviction_keeps_most_recently_used(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"), max_entries=2)
+    await store.start()
+    try:
+        for i in range(4):
+            store.put(f"k{i}", RESULT)
+            await store._queue.join()
+        assert store.evict() == 2
+        rows = store._conn.execute("SELECT key FROM results ORDER BY key").fetchall()
+        assert [r[0] for r in rows] == ["k2", "k3"]
+    finally:
+        await store.close()
+
+
+class _CountingClient(_FakeClient):
+    def __init__(self, recs):
+        super().__init__(recs)
+        self.calls = 0
+        original = self.chat.completions.create
+
+        async def create(**kwargs):
+            self.calls += 1
+            return await original(**kwargs)
+
+        self.chat.completions.create = create
+
+
+async def test_recommend_reuses_stored_llm_result(client, tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path / "results.db"))
+    await store.start()
+    fake = _CountingClient(_FAKE_RECS)
+    monkeypatch.setattr(app.state, "result_store", store)
+    monkeypatch.setattr(app.state, "llm_client", fake)
+    try:
+        first = await client.post("/recommend", json=VALID_BODY)
+        reordered = {**VALID_BODY, "music_genre": list(reversed(VALID_BODY["music_genre"]))}
+        second = await client.post("/recommend", json=reordered)
+        assert first.json() == second.json()
+        assert fake.calls == 1
+
+        await store._queue.join()
+        (value,) = store._conn.execute("SELECT value FROM results").fetchone()
+        assert json.loads(value)[0]["name"] == "Test Podcast 1"
+        assert settings.groq_model in store._conn.execute("SELECT key FROM results").fetchone()[0]
+    finally:
+        await store.close()
+
+
+async def test_fallback_results_are_not_stored(client, tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path / "results.db"))
+    await store.start()
+    monkeypatch.setattr(app.state, "result_store", store)
+    try:
+        assert (await client.post("/recommend", json=VALID_BODY)).status_code == 200
+        await store._queue.join()
+        assert store._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 0
+    finally:
+        await store.close()
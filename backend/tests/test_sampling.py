@@ -0,0 +1,123 @@
+"""Tests for sample-based KMeans training and its quality checks."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+from sklearn.cluster import KMeans
+
+from app.ml.sampling import (
+    SampleQualityError,
+    check_quality,
+    evaluate,
+    lightweight_coreset,
+    stratified_sample,
+)
+from tests.test_training_report import _survey
+from train import REJECTED_REPORT, build_parser
+
+
+def _blobs(rows=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = np.array([[0.0, 0.0], [8.0, 0.0], [0.0, 8.0]])
+    return centers[rng.integers(0, 3, rows)] + rng.normal(size=(rows, 2))
+
+
+def test_coreset_weights_estimate_the_row_count():
+    features = _blobs()
+    rows, weights = lightweight_coreset(features, 500, np.random.default_rng(1))
+    assert len(rows) == len(weights) == 500
+    assert (weights > 0).all()
+    assert weights.sum() == pytest.approx(len(features), rel=0.15)
+
+
+def test_stratified_sample_keeps_every_stratum():
+    strata = np.array([0] * 900 + [1] * 95 + [2] * 5)
+    rows, weights = stratified_sample(strata, 100, np.random.default_rng(0))
+    assert set(strata[rows]) == {0, 1, 2}
+    assert len(set(rows.tolist())) == len(rows)
+    assert weights.sum() == pytest.approx(len(strata))
+
+
+def test_sample_model_close_to_full_model_passes():
+    features = _blobs()
+    rows, weights = lightweight_coreset(features, 300, np.random.default_rng(0))
+    model = KMeans(n_clusters=3, random_state=42, n_init=10)
+    model.fit(features[rows], sample_weight=weights)
+
+    quality = evaluate(model, features[:2400], features[2400:])
+    assert quality["train_rows"] == 2400 and quality["eval_rows"] == 600
+    assert quality["inertia_ratio"] < 1.05
+    assert quality["adjusted_rand_index"] > 0.95
+    check_quality(quality, max_inertia_ratio=1.05, min_ari=0.9)
+
+
+def test_check_quality_rejects_a_distant_model():
+    quality = {"inertia_ratio": 1.3, "adjusted_rand_index": 0.5}
+    with pytest.raises(SampleQualityError, match="inertia ratio.*adjusted Rand index"):
+        check_quality(quality, max_inertia_ratio=1.05, min_ari=0.9)
+
+
+@pytest.mark.parametrize("mode", ["coreset", "stratified"])
+def test_train_with_sample_records_quality(tmp_path, mode):
+    _survey(tmp_path / "survey.csv", rows=300)
+    model_dir = tmp_path / "models"
+    args = build_parser().parse_args(
+        [
+            "train",
+            "--data",
+            str(tmp_path / "survey.csv"),
+            "--model-dir",
+            str(model_dir),
+            "--sample",
+            mode,
+            "--sample-size",
+            "100",
+            "--max-inertia-ratio",
+            "10",
+            "--min-ari",
+            "0",
+        ]
+    )
+    args.func(args)
+
+    report = json.loads((model_dir / "training_report.json").read_text())
+    stages = {stage["name"]: stage for stage in report["stages"]}
+    assert stages["train_cluster_model"]["sample"] == mode
+    assert stages["validate_sample"]["full_inertia"] > 0
+    assert report["sample_quality"]["eval_rows"] > 0
+    assert (model_dir / "kmeans_model.pkl").exists()
+
+
+def test_train_rejects_sample_and_keeps_artifacts(tmp_path):
+    _survey(tmp_path / "survey.csv", rows=300)
+    model_dir = tmp_path / "models"
+    args = build_parser().parse_args(
+        [
+            "train",
+            "--data",
+            str(tmp_path / "survey.csv"),
+            "--model-dir",
+            str(model_dir),
+            "--sample",
+            "coreset",
+            "--sample-size",
+            "20",
+            "--max-inertia-ratio",
+            "0.5",
+        ]
+    )
+    with pytest.raises(SystemExit, match="rejected"):
+        args.func(args)
+
+    assert os.path.exists(model_dir / REJECTED_REPORT)
+    assert not os.path.exists(model_dir / "kmeans_model.pkl")
+
+
+def test_sample_options_before_the_subcommand_are_kept():
+    args = build_parser().parse_args(
+        ["--sample", "coreset", "--sample-size", "500", "--min-ari", "0.8", "--seed", "3", "train"]
+    )
+    assert (args.sample, args.sample_size, args.min_ari, args.seed) == ("coreset", 500, 0.8, 3)
+    assert args.max_inertia_ratio == 1.05
@@ -0,0 +1,80 @@
+"""Tests for the cacheable /segments API and response compression."""
+
+from app.core.compression import choose_encoding
+from app.main import app
+
+
+async def test_list_segments_has_strong_etag(client):
+    response = await client.get("/segments", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body["segments"]) == set(app.state.bundle.segment_profiles)
+    assert response.headers["etag"] == f'"{app.state.bundle.version}"'
+    assert "max-age=" in response.headers["cache-control"]
+
+
+async def test_if_none_match_returns_304(client):
+    etag = (await client.get("/segments")).headers["etag"]
+    response = await client.get("/segments", headers={"If-None-Match": f'"other", {etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    stale = await client.get("/segments", headers={"If-None-Match": '"stale"'})
+    assert stale.status_code == 200
+
+
+async def test_single_segment(client):
+    response = await client.get("/segments/0")
+    assert response.status_code == 200
+    assert response.json() == app.state.bundle.segment_profiles["Segment_0"]
+    etag = response.headers["etag"]
+    assert etag != (await client.get("/segments/1")).headers["etag"]
+    again = await client.get("/segments/0", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+
+async def test_unknown_segment_is_404(client):
+    assert (await client.get("/segments/99")).status_code == 404
+
+
+async def test_large_responses_are_compressed(client):
+    plain = (await client.get("/segments", headers={"Accept-Encoding": "identity"})).content
+
+    response = await client.get("/segments", headers={"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "br"
+    assert "Accept-Encoding" in response.headers["vary"]
+    # httpx transparently decodes brotli when the brotli package is installed.
+    assert response.content == plain
+
+    response = await client.get("/segments", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == plain
+    assert int(response.headers["content-length"]) < len(plain)
+
+
+async def test_compressed_responses_have_weak_etag(client):
+    plain = await client.get("/segments", headers={"Accept-Encoding": "identity"})
+    encoded = await client.get("/segments", headers={"Accept-Encoding": "br"})
+    assert encoded.headers["etag"] == f"W/{plain.headers['etag']}"
+
+    for etag in (plain.headers["etag"], encoded.headers["etag"]):
+        again = await client.get(
+            "/segments", headers={"Accept-Encoding": "br", "If-None-Match": etag}
+        )
+        assert again.status_code == 304
+        assert again.headers["etag"] == encoded.headers["etag"]
+
+
+async def test_small_responses_are_not_compressed(client):
+    response = await client.get("/health", headers={"Accept-Encoding": "gzip, br"})
+    assert "content-encoding" not in response.headers
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("br;q=0.5, gzip") == "gzip"
+    assert choose_encoding("br;q=0, gzip;q=0") is None
+    assert choose_encoding("*") == "br"
+    assert choose_encoding("identity") is None
+    assert choose_encoding("") is None
@@ -0,0 +1,150 @@
+"""WebSocket session: full first answer, then incremental delta refinements."""
+
+import asyncio
+import json
+
+import pytest_asyncio
+
+from app.core.limiter import limiter
+from app.main import app
+from tests.test_llm import _ScriptedClient
+from tests.test_recommend import VALID_BODY
+
+
+class _WebSocket:
+    """Minimal ASGI WebSocket client (starlette 0.27's TestClient predates httpx 0.28)."""
+
+    def __init__(self, path, headers=()):
+        self.scope = {
+            "type": "websocket",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+            "client": ("127.0.0.1", 50000),
+            "server": ("test", 80),
+            "scheme": "ws",
+            "subprotocols": [],
+        }
+        self._inbox = asyncio.Queue()
+        self._outbox = asyncio.Queue()
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(app(self.scope, self._inbox.get, self._outbox.put))
+        await self._inbox.put({"type": "websocket.connect"})
+        self.handshake = await self._outbox.get()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._inbox.put({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(self._task, 5)
+
+    async def send_text(self, text):
+        await self._inbox.put({"type": "websocket.receive", "text": text})
+
+    async def send_json(self, data):
+        await self.send_text(json.dumps(data))
+
+    async def receive_json(self):
+        message = await asyncio.wait_for(self._outbox.get(), 5)
+        return json.loads(message["text"])
+
+
+def _recs(start, stop, **extra):
+    return [
+        {"name": f"Podcast {i}", "creator": f"Creator {i}", **extra} for i in range(start, stop)
+    ]
+
+
+def _client(*payloads):
+    return _ScriptedClient(*(json.dumps({"recommendations": recs}) for recs in payloads))
+
+
+def _prompts(client):
+    return [call["messages"][-1]["content"] for call in client.calls]
+
+
+@pytest_asyncio.fixture
+async def ws_app():
+    limiter.reset()
+    async with app.router.lifespan_context(app):
+        yield
+
+
+async def test_start_then_update_sends_only_a_delta_prompt(ws_app):
+    client = _client(_recs(0, 5), _recs(7, 8, replaces=1))
+    app.state.llm_client = client
+
+    async with _WebSocket("/ws/session") as ws:
+        await ws.send_json({"type": "start", "preferences": VALID_BODY})
+        first = await ws.receive_json()
+        await ws.send_json({"type": "update", "changes": {"podcast_format": "Narrative"}})
+        second = await ws.receive_json()
+
+    assert first["type"] == "recommendations"
+    assert [r["name"] for r in first["recommendations"]] == [f"Podcast {i}" for i in range(5)]
+    assert isinstance(first["segment"], int) and first["segment_profile"]
+    assert second["changed"] == ["podcast_format"]
+    assert second["replaced"] == [1]
+    assert [r["name"] for r in second["recommendations"]] == [
+        "Podcast 0", "Podcast 7", "Podcast 2", "Podcast 3", "Podcast 4"
+    ]
+    assert len(_prompts(client)) == 2
+    assert "podcast_format from 'Interview' to 'Narrative'" in _prompts(client)[1]
+    assert len(_prompts(client)[1]) < len(_prompts(client)[0])
+
+
+async def test_unchanged_update_skips_the_llm(ws_app):
+    client = _client(_recs(0, 5))
+    app.state.llm_client = client
+
+    async with _WebSocket("/ws/session") as ws:
+        await ws.send_json({"type": "start", "preferences": VALID_BODY})
+        await ws.receive_json()
+        await ws.send_json({"type": "update", "changes": {"region": VALID_BODY["region"]}})
+        reply = await ws.receive_json()
+
+    assert (reply["changed"], reply["replaced"]) == ([], [])
+    assert len(_prompts(client)) == 1
+
+
+async def test_invalid_messages_get_errors_and_keep_the_session(ws_app):
+    app.state.llm_client = _client(_recs(0, 5))
+
+    async with _WebSocket("/ws/session") as ws:
+        await ws.send_json({"type": "update", "changes": {"age": "18-24"}})
+        assert "start" in (await ws.receive_json())["detail"]
+        await ws.send_text("not json")
+        assert (await ws.receive_json())["type"] == "error"
+        await ws.send_json({"type": "start", "preferences": VALID_BODY})
+        assert (await ws.receive_json())["type"] == "recommendations"
+        await ws.send_json({"type": "update", "changes": {"music_genre": []}})
+        error = await ws.receive_json()
+
+    assert error["type"] == "error"
+    assert error["detail"][0]["loc"] == ["music_genre"]
+
+
+async def test_foreign_origin_is_refused(ws_app):
+    async with _WebSocket("/ws/session", [("Origin", "https://evil.example")]) as ws:
+        assert ws.handshake["type"] == "websocket.close"
+        assert ws.handshake["code"] == 1008
+
+
+async def test_session_rate_limit_is_separate_from_recommend(client):
+    app.state.llm_client = _client(_recs(0, 5))
+    same = {"type": "update", "changes": {"region": VALID_BODY["region"]}}
+
+    async with _WebSocket("/ws/session") as ws:
+        await ws.send_json({"type": "start", "preferences": VALID_BODY})
+        await ws.receive_json()
+        for _ in range(9):
+            await ws.send_json(same)
+            assert (await ws.receive_json())["type"] == "recommendations"
+        await ws.send_json(same)
+        limited = await ws.receive_json()
+
+    assert limited == {"type": "error", "detail": "Rate limit exceeded: 10/minute"}
+    # The session's own bucket is spent; the /recommend one is untouched.
+    response = await client.post("/recommend?mode=fast", json=VALID_BODY)
+    assert response.status_code == 200
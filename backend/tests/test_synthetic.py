@@ -0,0 +1,78 @@
+"""Synthetic survey generator: fitted distributions, determinism and the training path."""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.ml.analyzer import SpotifyUserAnalyzer
+from app.ml.synthetic import SurveyModel, write_synthetic
+from train import build_parser
+
+
+def _survey(rows=4000, seed=0):
+    """A toy survey where fav_pod_genre depends strongly on Age."""
+    rng = np.random.default_rng(seed)
+    age = rng.choice(["12~20", "20~35", "35~60"], rows, p=[0.2, 0.5, 0.3])
+    genre = np.where(age == "12~20", "Comedy", np.where(age == "20~35", "Technology", "Sports"))
+    flip = rng.random(rows) < 0.1
+    genre[flip] = "None"
+    gender = rng.choice(["Female", "Male", None], rows, p=[0.45, 0.45, 0.1])
+    return pd.DataFrame({"Age": age, "fav_pod_genre": genre, "Gender": gender})
+
+
+def test_fit_reproduces_marginals_and_dependent_pairs():
+    survey = _survey()
+    model = SurveyModel.fit(survey, smoothing=0)
+    synthetic = model.sample(20_000, np.random.default_rng(1))
+
+    for column in ("Age", "Gender"):
+        expected = survey[column].value_counts(normalize=True, dropna=False)
+        actual = synthetic[column].value_counts(normalize=True, dropna=False)
+        assert np.allclose(expected.sort_index(), actual.sort_index(), atol=0.02)
+    joint = pd.crosstab(survey.Age, survey.fav_pod_genre, normalize=True)
+    synthetic_joint = pd.crosstab(synthetic.Age, synthetic.fav_pod_genre, normalize=True)
+    assert np.allclose(joint, synthetic_joint.loc[joint.index, joint.columns], atol=0.02)
+    parents = {node["name"]: node["parent"] for node in model.nodes}
+    assert parents["fav_pod_genre"] == "Age" or parents["Age"] == "fav_pod_genre"
+
+
+def test_same_seed_same_rows_and_json_round_trip():
+    model = SurveyModel.fit(_survey())
+    restored = SurveyModel.from_dict(json.loads(json.dumps(model.to_dict())))
+
+    first = pd.concat(model.generate(2500, seed=7, chunksize=1000))
+    second = pd.concat(restored.generate(2500, seed=7, chunksize=1000))
+    other = pd.concat(model.generate(2500, seed=8, chunksize=1000))
+
+    assert len(first) == 2500
+    pd.testing.assert_frame_equal(first, second)
+    assert not first.equals(other)
+
+
+def test_segment_profile_model_trains_end_to_end(tmp_path):
+    with open(f"{settings.model_dir}/segment_profiles.json") as f:
+        profiles = json.load(f)
+    model = SurveyModel.from_segment_profiles(profiles)
+    path = str(tmp_path / "survey.csv")
+
+    write_synthetic(model, path, rows=3000, seed=0, chunksize=1000)
+    survey = pd.read_csv(path)
+    assert len(survey) == 3000
+    assert "__segment__" not in survey.columns
+    assert set(survey["Age"]) <= set().union(*(p["Age"] for p in profiles.values()))
+
+    analyzer = SpotifyUserAnalyzer(data_path=path, model_dir=str(tmp_path / "models"))
+    analyzer.load_data()
+    analyzer.preprocess_data()
+    analyzer.train_cluster_model(n_clusters=3)
+    assert len(analyzer.create_segment_profiles()) == 3
+
+
+def test_synth_seed_before_or_after_the_subcommand():
+    parser = build_parser()
+    for argv in (["--seed", "5", "synth", "out.csv"], ["synth", "out.csv", "--seed", "5"]):
+        args = parser.parse_args(argv)
+        assert (args.seed, args.func.__name__, args.load_model) == (5, "synth", None)
+    assert parser.parse_args(["synth", "out.csv"]).seed == 0
@@ -0,0 +1,81 @@
+"""Tests for the training pipeline's instrumentation report."""
+
+import json
+import random
+
+import pandas as pd
+
+from app.ml.instrumentation import REPORT_FILENAME
+from train import build_parser
+
+STAGES = [
+    "load_data",
+    "preprocess_data",
+    "train_cluster_model",
+    "create_segment_profiles",
+    "save_models",
+]
+
+
+def _survey(path, rows=60):
+    rng = random.Random(0)
+    pd.DataFrame(
+        {
+            "Age": [rng.choice(["12~20", "20~35", "35~60", "60+"]) for _ in range(rows)],
+            "Gender": [rng.choice(["Female", "Male"]) for _ in range(rows)],
+            "fav_music_genre": [rng.choice(["Pop", "Rock", "Rap"]) for _ in range(rows)],
+            "fav_pod_genre": [rng.choice(["Comedy", "Health", "Sports"]) for _ in range(rows)],
+        }
+    ).to_csv(path, index=False)
+
+
+def test_train_writes_stage_report(tmp_path):
+    _survey(tmp_path / "survey.csv")
+    model_dir = tmp_path / "models"
+    args = build_parser().parse_args(
+        ["train", "--data", str(tmp_path / "survey.csv"), "--model-dir", str(model_dir)]
+    )
+    args.func(args)
+
+    report = json.loads((model_dir / REPORT_FILENAME).read_text())
+    assert [s["name"] for s in report["stages"]] == STAGES
+    for stage in report["stages"]:
+        assert stage["wall_seconds"] >= 0
+        assert stage["cpu_seconds"] >= 0
+        assert stage["heap_peak_bytes"] >= 0
+        assert "profile" not in stage
+    load, preprocess, kmeans = report["stages"][:3]
+    assert load["rows"] == 60 and load["data_bytes"] > 0
+    assert preprocess["features_bytes"] > 0
+    assert kmeans["n_clusters"] == 3 and kmeans["n_iter"] >= 1
+    assert report["stages"][3]["segments"] == 3
+
+
+def test_profile_flag_dumps_each_stage(tmp_path):
+    _survey(tmp_path / "survey.csv")
+    profile_dir = tmp_path / "profiles"
+    args = build_parser().parse_args(
+        [
+            "--data",
+            str(tmp_path / "survey.csv"),
+            "--model-dir",
+            str(tmp_path / "models"),
+            "--profile",
+            str(profile_dir),
+        ]
+    )
+    args.func(args)
+
+    assert sorted(p.stem for p in profile_dir.glob("*.prof")) == sorted(STAGES)
+
+
+def test_train_options_before_or_after_the_subcommand():
+    parser = build_parser()
+    for argv in (
+        ["--data", "big.csv", "--model-dir", "out", "train"],
+        ["train", "--data", "big.csv", "--model-dir", "out"],
+        ["--data", "big.csv", "--model-dir", "out"],
+    ):
+        args = parser.parse_args(argv)
+        assert (args.data, args.model_dir, args.func.__name__) == ("big.csv", "out", "train")
+    assert build_parser().parse_args(["--model-dir", "out", "score", "a", "b"]).model_dir == "out"
@@ -5,30 +5,281 @@ Run from the backend/ directory:
     python train.py
 
 This trains the KMeans segmentation model on data/Spotify_user_research.csv
-and writes the artifacts consumed at serving time into backend/models/.
+and writes the artifacts consumed at serving time into backend/models/
+(encoder.json holds the preference encoding that serving reuses),
+along with training_report.json (per-stage wall/CPU time, peak memory,
+DataFrame sizes and KMeans iterations). Add --profile to also dump a cProfile
+file per stage (inspect with `python -m pstats` or snakeviz).
+
+The preprocessed and scaled feature matrix is cached in models/.feature-cache,
+keyed by the survey file's hash and the preprocessing config, so reruns on the
+same data (e.g. with other sampling options) memory-map it instead of
+re-encoding; pass --no-feature-cache to skip it.
+
+For large surveys, fit KMeans on a weighted sample instead of every row; the
+result is checked against a full-data fit on held-out rows, and the run fails
+(leaving the existing artifacts alone) if it is not close enough:
+
+    python train.py --data big.csv --sample coreset --sample-size 20000
+
+To assign segments to a large file of user preferences (CSV or Parquet, with
+columns named like the /recommend request fields) using those artifacts:
+
+    python train.py score prefs.csv segments.csv --workers 8
+
+To write synthetic survey rows for scale tests (learned from the survey CSV
+when present, otherwise from models/segment_profiles.json):
+
+    python train.py synth synthetic.csv --rows 1000000 --seed 1
 
 Security note: the resulting .pkl files are loaded via pickle at startup, which
 executes arbitrary code in the file. Only ever load artifacts produced by this
 script from trusted data — never load a .pkl from an untrusted source.
 """
 
+import argparse
 import os
+from typing import Optional, Tuple
+
+import numpy as np
 
+from app.core.logging import configure_logging
 from app.ml.analyzer import SpotifyUserAnalyzer
+from app.ml.batch_score import score_file
+from app.ml.instrumentation import REPORT_FILENAME, TrainingReport, dataframe_bytes
+from app.ml.sampling import (
+    SampleQualityError,
+    check_quality,
+    evaluate,
+    lightweight_coreset,
+    stratified_sample,
+)
+from app.ml.synthetic import survey_model, write_synthetic
 
 BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BACKEND_DIR, "..", "data", "Spotify_user_research.csv")
 MODEL_DIR = os.path.join(BACKEND_DIR, "models")
+PROFILE_DIR = os.path.join(BACKEND_DIR, "training-profiles")
+N_CLUSTERS = 3
+STRATA = "Age,fav_music_genre,fav_pod_genre"
+REJECTED_REPORT = f"rejected_{REPORT_FILENAME}"
+FEATURE_CACHE_DIR = ".feature-cache"
+
+
+def _split_and_sample(
+    args: argparse.Namespace, analyzer: SpotifyUserAnalyzer
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Held-out rows, training rows, and the sampled training rows with weights."""
+    rng = np.random.default_rng(args.seed)
+    n = len(analyzer.features)
+    held_out = rng.random(n) < args.holdout
+    holdout_rows, train_rows = np.flatnonzero(held_out), np.flatnonzero(~held_out)
+    if args.sample == "coreset":
+        features = analyzer.features.to_numpy(dtype=float)[train_rows]
+        picked, weights = lightweight_coreset(features, args.sample_size, rng)
+    else:
+        columns = [c.strip() for c in args.strata.split(",") if c.strip()]
+        strata = analyzer.data.groupby(columns, dropna=False, sort=False).ngroup().to_numpy()
+        picked, weights = stratified_sample(strata[train_rows], args.sample_size, rng)
+    return holdout_rows, train_rows, train_rows[picked], weights
+
+
+def _cache_dir(args: argparse.Namespace) -> str:
+    return args.feature_cache or os.path.join(args.model_dir, FEATURE_CACHE_DIR)
+
+
+def train(args: argparse.Namespace) -> None:
+    analyzer = SpotifyUserAnalyzer(data_path=args.data, model_dir=args.model_dir)
+    report = TrainingReport(profile_dir=args.profile)
+
+    with report.stage("load_data") as stage:
+        analyzer.load_data()
+        stage["rows"], stage["columns"] = analyzer.data.shape
+        stage["data_bytes"] = dataframe_bytes(analyzer.data)
+    with report.stage("preprocess_data") as stage:
+        analyzer.preprocess_data(cache_dir=None if args.no_feature_cache else _cache_dir(args))
+        stage["feature_cache"] = analyzer.feature_cache_status or "off"
+        stage["features"] = analyzer.features.shape[1]
+        stage["data_bytes"] = dataframe_bytes(analyzer.data)
+        stage["features_bytes"] = dataframe_bytes(analyzer.features)
+    with report.stage("train_cluster_model") as stage:
+        rows: Optional[np.ndarray] = None
+        weights: Optional[np.ndarray] = None
+        if args.sample:
+            holdout_rows, train_rows, rows, weights = _split_and_sample(args, analyzer)
+            stage["sample"] = args.sample
+            stage["sample_rows"] = len(rows)
+        kmeans = analyzer.train_cluster_model(
+            n_clusters=N_CLUSTERS, rows=rows, sample_weight=weights
+        )
+        stage["n_clusters"] = N_CLUSTERS
+        stage["n_init"] = kmeans.n_init
+        stage["n_iter"] = int(kmeans.n_iter_)
+        stage["inertia"] = float(kmeans.inertia_)
+    if args.sample:
+        with report.stage("validate_sample") as stage:
+            scaled = analyzer.scaled_features
+            eval_rows = holdout_rows if len(holdout_rows) else train_rows
+            quality = evaluate(kmeans, scaled[train_rows], scaled[eval_rows])
+            quality["max_inertia_ratio"] = args.max_inertia_ratio
+            quality["min_adjusted_rand_index"] = args.min_ari
+            stage.update(quality)
+            report.info["sample_quality"] = quality
+        try:
+            check_quality(quality, args.max_inertia_ratio, args.min_ari)
+        except SampleQualityError as exc:
+            report.write(os.path.join(args.model_dir, REJECTED_REPORT))
+            raise SystemExit(f"{exc}. Existing artifacts in {args.model_dir} were kept.") from exc
+        print(
+            f"Sample model accepted: inertia ratio {quality['inertia_ratio']:.4f}, "
+            f"adjusted Rand index {quality['adjusted_rand_index']:.4f}"
+        )
+    with report.stage("create_segment_profiles") as stage:
+        analyzer.create_segment_profiles()
+        stage["segments"] = len(analyzer.segment_profiles)
+        stage["data_bytes"] = dataframe_bytes(analyzer.data)
+    with report.stage("save_models"):
+        analyzer.save_models()
+
+    report.write(os.path.join(args.model_dir, REPORT_FILENAME))
+    print(f"Model artifacts written to {args.model_dir}")
+    if args.profile:
+        print(f"Per-stage cProfile dumps written to {args.profile}")
+
+
+def score(args: argparse.Namespace) -> None:
+    rows = score_file(
+        args.model_dir,
+        args.input,
+        args.output,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        id_column=args.id_column,
+    )
+    print(f"Wrote segments for {rows:,} rows to {args.output}")
+
+
+def synth(args: argparse.Namespace) -> None:
+    model = survey_model(args.data, args.model_dir, args.load_model)
+    if args.save_model:
+        model.save(args.save_model)
+        print(f"Synthetic survey model saved to {args.save_model}")
+    rows = write_synthetic(
+        model, args.output, args.rows, seed=args.seed, chunksize=args.chunksize
+    )
+    print(f"Wrote {rows:,} synthetic survey rows to {args.output}")
+
+
+# Defaults of the train options, set on the top-level parser only: the
+# subcommands leave options they weren't given unset, so a value given before
+# the subcommand (`train.py --data big.csv train`) isn't overwritten by theirs.
+TRAIN_DEFAULTS = {
+    "data": DATA_PATH,
+    "model_dir": MODEL_DIR,
+    "no_feature_cache": False,
+    "sample_size": 10_000,
+    "strata": STRATA,
+    "holdout": 0.2,
+    "max_inertia_ratio": 1.05,
+    "min_ari": 0.9,
+    "seed": 0,
+}
+
+
+def _add_train_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--data", help="Survey CSV to train on")
+    parser.add_argument("--model-dir", help="Where to write the artifacts")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=PROFILE_DIR,
+        metavar="DIR",
+        help=f"Write a cProfile dump per stage to DIR (default {PROFILE_DIR})",
+    )
+    parser.add_argument(
+        "--feature-cache",
+        metavar="DIR",
+        help=f"Feature matrix cache directory (default <model-dir>/{FEATURE_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--no-feature-cache",
+        action="store_true",
+        default=argparse.SUPPRESS,
+        help="Always preprocess the survey, and don't write the cache",
+    )
+    parser.add_argument(
+        "--sample",
+        choices=("coreset", "stratified"),
+        help="Fit KMeans on a weighted sample instead of every row",
+    )
+    parser.add_argument("--sample-size", type=int, help="Rows to sample")
+    parser.add_argument("--strata", help="Comma-separated columns for --sample stratified")
+    parser.add_argument("--holdout", type=float, help="Share of rows held out for validation")
+    parser.add_argument(
+        "--max-inertia-ratio",
+        type=float,
+        help="Fail if the sample model's held-out inertia exceeds the full model's by more",
+    )
+    parser.add_argument(
+        "--min-ari",
+        type=float,
+        help="Fail if its segments agree with the full model's less (adjusted Rand index)",
+    )
+    parser.add_argument("--seed", type=int, help="Sampling seed")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Train or apply the segmentation model.")
+    _add_train_options(parser)
+    parser.set_defaults(func=train, **TRAIN_DEFAULTS)
+    commands = parser.add_subparsers(dest="command")
+
+    train_cmd = commands.add_parser(
+        "train", help="Train the model (default)", argument_default=argparse.SUPPRESS
+    )
+    _add_train_options(train_cmd)
+    train_cmd.set_defaults(func=train)
+
+    score_cmd = commands.add_parser(
+        "score",
+        help="Bulk-assign segments to a preferences file",
+        argument_default=argparse.SUPPRESS,
+    )
+    score_cmd.add_argument("input", help="Input .csv or .parquet file")
+    score_cmd.add_argument("output", help="Output .csv or .parquet file")
+    score_cmd.add_argument("--model-dir")
+    score_cmd.add_argument("--chunksize", type=int, default=100_000)
+    score_cmd.add_argument("--workers", type=int, default=0, help="Processes (0 = one per CPU)")
+    score_cmd.add_argument(
+        "--id-column", default=None, help="Input column to copy to the output as the row id"
+    )
+    score_cmd.set_defaults(func=score)
+
+    synth_cmd = commands.add_parser(
+        "synth",
+        help="Write synthetic survey rows for scale tests",
+        argument_default=argparse.SUPPRESS,
+    )
+    synth_cmd.add_argument("output", help="Output .csv or .parquet file")
+    synth_cmd.add_argument("--rows", type=int, default=100_000)
+    synth_cmd.add_argument("--seed", type=int, help="Generator seed")
+    synth_cmd.add_argument("--chunksize", type=int, default=100_000)
+    synth_cmd.add_argument("--data", help="Survey CSV to learn from")
+    synth_cmd.add_argument("--model-dir", help="Segment profiles to fall back on without --data")
+    synth_cmd.add_argument(
+        "--load-model", default=None, help="Use a saved synthetic model (JSON) instead"
+    )
+    synth_cmd.add_argument(
+        "--save-model", default=None, help="Save the synthetic model (JSON) for reuse"
+    )
+    synth_cmd.set_defaults(func=synth)
+    return parser
 
 
 def main() -> None:
-    analyzer = SpotifyUserAnalyzer(data_path=DATA_PATH, model_dir=MODEL_DIR)
-    analyzer.load_data()
-    analyzer.preprocess_data()
-    analyzer.train_cluster_model(n_clusters=3)
-    analyzer.create_segment_profiles()
-    analyzer.save_models()
-    print(f"Model artifacts written to {MODEL_DIR}")
+    configure_logging()
+    args = build_parser().parse_args()
+    args.func(args)
 
 
 if __name__ == "__main__":